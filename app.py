@@ -1,27 +1,135 @@
 import flask
+import io
+import itertools
+import operator
 import os
 from flask import session
-from collections import defaultdict
 from http import HTTPStatus
+from sqlalchemy import literal_column
 from werkzeug.security import check_password_hash
 import schema
 import source.controller.furniture_inventory as furniture_inventory
 import source.controller.user as user
 import source.controller.cart as cart
 import source.controller.order as order
+import source.controller.catalog_cache as catalog_cache
+import source.controller.pagination as pagination
+import source.controller.fieldsets as fieldsets
+import source.controller.versions as versions
+import source.controller.search as search
+import source.controller.facets as facets
+import source.controller.streaming as streaming
+import source.controller.compression as compression
+import source.controller.export as export
+import source.controller.catalog_import as catalog_import
+import source.controller.pricing as pricing
+import source.controller.instrumentation as instrumentation
 from decorators import login_required, admin_required
 from source.controller.payment_gateway import get_payment_strategy
 from source.controller.checkout_service import CheckoutService
 
 
+ORDER_PAGE_KEY = (schema.Order.creation_time, schema.Order.order_num)
+
+# Most model numbers a single /items/batch request may ask for
+MAX_BATCH_SIZE = 200
+
+# Most items a single bulk update request may list
+MAX_BULK_ITEMS = 10_000
+
+
+def _number_arg(name: str, type_=float):
+    """Read an optional numeric query parameter, rejecting malformed values with 400."""
+    value = flask.request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return type_(value)
+    except ValueError:
+        flask.abort(HTTPStatus.BAD_REQUEST, description=f"Invalid value for '{name}': {value}")
+
+
+def _order_options(query, fields: set | None):
+    """Apply the `fields` projection to an order query, joining the customer in whenever to_dict needs it."""
+    if fields is not None:
+        query = query.options(fieldsets.load_only_option(schema.Order, fields, schema.Order.COMPUTED_FIELDS, ORDER_PAGE_KEY))
+    if fields is None or fields & {'user_id', *schema.Order.COMPUTED_FIELDS}:
+        query = query.options(schema.Order.with_customer())
+    return query
+
+
+def _bulk_request(field: str, check) -> tuple:
+    """
+    Reads a bulk update payload: either `items`, a list of objects with a `model_num` and
+    the new `field`, or a `filter` (see `furniture_inventory.selection_condition`) and one
+    new `field` value. An empty filter, selecting every item, also needs `"all": true`.
+    `check` returns an error message for an invalid value, or None.
+
+    Returns:
+        tuple: (values by model number, None) for a list, or (value, selection) for a filter.
+    """
+    data = flask.request.get_json(silent=True)
+    if not isinstance(data, dict) or ('items' in data) == ('filter' in data):
+        flask.abort(HTTPStatus.BAD_REQUEST, description=f"Either 'items' or 'filter' and '{field}' are required")
+
+    if 'filter' in data:
+        error = check(data.get(field))
+        if error:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=error)
+        try:
+            furniture_inventory.selection_condition(data['filter'])
+        except ValueError as exception:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=str(exception))
+        # A filter without criteria selects the whole catalog, which has to be asked for explicitly
+        if not any(value is not None and value != {} for value in data['filter'].values()) and data.get('all') is not True:
+            flask.abort(HTTPStatus.BAD_REQUEST, description="'filter' selects every item; add \"all\": true to update the whole catalog")
+        return data[field], data['filter']
+
+    items = data['items']
+    if not isinstance(items, list) or not items or len(items) > MAX_BULK_ITEMS:
+        flask.abort(HTTPStatus.BAD_REQUEST, description=f"'items' must be a list of 1 to {MAX_BULK_ITEMS} items")
+    values = {}
+    for item in items:
+        if not isinstance(item, dict) or not isinstance(item.get('model_num'), str) or field not in item:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"Every item needs a 'model_num' and a '{field}'")
+        error = check(item[field])
+        if error:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"{item['model_num']}: {error}")
+        values[item['model_num']] = item[field]
+    return values, None
+
+
+def _discount_error(discount) -> str | None:
+    if isinstance(discount, bool) or not isinstance(discount, (int, float)):
+        return "Discount must be a number"
+    if discount >= 100 or discount <= 0:
+        return "Discount must be between 0 to 100"
+    return None
+
+
+def _quantity_error(quantity) -> str | None:
+    if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 0:
+        return "Stock quantity must be a non-negative integer"
+    return None
+
+
 def create_app(config: dict=None):
     if config is None:
         config = {}
     app = flask.Flask(__name__)
     app.secret_key = os.urandom(24)
+    app.json.sort_keys = False  # keep the order chosen by the query, e.g. /items?sort=final_price
 
     database_url = config.get('database_url', 'sqlite:///./default.db')
-    schema.create(database_url)
+    schema.create(
+        database_url,
+        echo=config.get('sql_echo', False),
+        read_database_url=config.get('read_database_url'),
+        sqlite_profile=config.get('sqlite_profile', 'default'),
+    )
+    schema.install(app)
+    compression.install(app, min_size=config.get('compression_min_size', compression.DEFAULT_MIN_SIZE))
+    instrumentation.install(app, debug_headers=config.get('sql_debug_headers', False))
 
     @app.route('/items', methods=['GET'])
     def get_items():
@@ -32,6 +140,13 @@ def create_app(config: dict=None):
         - `category`: Filters items by category.
         - `max_price`: Returns only items priced below the given value.
         - `model_num`: Retrieves a specific item by model number.
+        - `model_name`: Retrieves items by model name.
+        - `min_final_price` / `max_final_price`: Filter on the price customers pay (after discount and tax).
+        - `details.<key>` / `dimensions.<key>`: Filter on an attribute, e.g. `details.material=wood`;
+          `<key>_min` / `<key>_max` bound numeric attributes, e.g. `dimensions.width_max=40`.
+        - `sort`: `final_price`, `-final_price` or `model_num`.
+        - `limit` / `cursor`: Page through the results, see "Pagination" below.
+        - `fields`: Comma-separated list of fields to return, e.g. `fields=model_num,model_name,final_price`.
 
         If `model_num` is provided, the response includes an `is_available` field:
         - `is_available: True` if the item has stock (stock_quantity > 0).
@@ -47,37 +162,237 @@ def create_app(config: dict=None):
             - GET /items?category=Chair (retrieves only chairs)
             - GET /items?max_price=500 (retrieves all items under $500)
             - GET /items?model_num=BD-5005 (retrieves a specific item, including `is_available`)
+            - GET /items?max_final_price=300&sort=final_price&limit=20 (20 cheapest items up to 300)
+            - GET /items?category=Sofa&sort=final_price&fields=model_num,final_price (price list only)
+            - GET /items?category=Chair&details.material=wood&dimensions.width_max=40 (wood chairs up to 40cm wide)
+
+        Pagination:
+            When `limit` is given the response also carries `next_cursor`. Passing it back as
+            `cursor` (with the same filters and sort) returns the next page; it is null on the
+            last page. Pages are ordered by `sort`, or by model number when no sort is given.
 
         This implementation ensures that the API response remains clean and context-aware,
         only including stock availability when relevant.
         """
-        s = schema.session()
-        query = s.query(schema.Furniture)
-
         category = flask.request.args.get('category')
         price = flask.request.args.get('max_price')
         model_num = flask.request.args.get('model_num')
         model_name = flask.request.args.get('model_name')
+        min_final_price = _number_arg('min_final_price')
+        max_final_price = _number_arg('max_final_price')
+        attributes = furniture_inventory.attribute_filters(flask.request.args)
+        sort = flask.request.args.get('sort')
+        limit = _number_arg('limit', int)
+        cursor = flask.request.args.get('cursor')
+        paged = limit is not None or cursor is not None
+        fields = fieldsets.requested_fields(schema.Furniture, schema.Furniture.COMPUTED_FIELDS)
 
-        if category is not None:
-            query = query.filter_by(category=category)
         if price is not None:
             price = float(price)
-            query = query.filter(schema.Furniture.price < price)
-        if model_num is not None:
-            query = query.filter_by(model_num=model_num)
-        if model_name is not None:
-            query = query.filter(schema.Furniture.model_name == model_name)
+        if sort is not None and sort not in furniture_inventory.ITEM_SORTS:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"Invalid sort: {sort}. Must be one of {list(furniture_inventory.ITEM_SORTS)}")
+
+        # Pollers that already hold the current catalog get a 304 without the catalog being read or serialized
+        tag = versions.etag(versions.catalog())
+        not_modified = versions.not_modified(tag)
+        if not_modified:
+            return not_modified
+
+        filters = dict(category=category, max_price=price, model_num=model_num, model_name=model_name)
+        if min_final_price is None and max_final_price is None and not attributes and sort is None and not paged:
+            # Browse traffic is answered from the in-memory catalog snapshot, see catalog_cache.py
+            results = catalog_cache.get_items(**filters).items()
+        else:
+            # Final price ranges, attributes, price ordering and pages run in SQL on indexed columns.
+            # A session of its own, since a streamed listing is read after the request has ended
+            s = schema.new_session()
+            filters.update(min_final_price=min_final_price, max_final_price=max_final_price, attributes=attributes)
+            query = furniture_inventory.filter_items(s.query(schema.Furniture), filters)
+            ordering = sort or 'model_num'
+            columns, descending = furniture_inventory.ITEM_SORTS[ordering]
+            if fields is not None:
+                # Only select the requested columns (plus the sort key), so `details` and friends are never read
+                extra_columns = columns + (schema.Furniture.stock_quantity,) if model_num else columns
+                query = query.options(fieldsets.load_only_option(schema.Furniture, fields, schema.Furniture.COMPUTED_FIELDS, extra_columns))
+            if paged:
+                rows, next_cursor = pagination.paginate(query, ordering, columns, descending, limit, cursor)
+                results = [(result.model_num, result.to_dict()) for result in rows]
+                s.close()
+            else:
+                query = pagination.ordered(query, columns, descending)
+                results = streaming.rows(s, query, lambda result: (result.model_num, result.to_dict()))
+
+        def items():
+            for key, item in results:
+                # conditionally add "is_available" only if a specific model_num is requested
+                if model_num:
+                    item = {**item, "is_available": item['stock_quantity'] > 0}
+                if fields is not None:
+                    item = fieldsets.project(item, fields)
+                yield key, item
+
+        if paged:
+            return versions.tagged(flask.jsonify({'items': dict(items()), 'next_cursor': next_cursor}), tag)
+        # Unpaged listings can be the whole catalog: stream them instead of building the full body in memory
+        return versions.tagged(streaming.response({'items': streaming.Members(items())}), tag)
+
+    @app.route('/items/search', methods=['GET'])
+    def search_items():
+        """
+        Full-text search over item names, descriptions, categories and the material, color and upholstery details.
 
-        results = query.all()
+        Every word of `q` is matched as a prefix, all words must match, and the best
+        matches (BM25) come first. Results are paged with `limit` / `cursor` like the
+        other listings, and `fields` selects the returned fields.
+
+        Returns:
+            JSON response with the matching `items`, keyed by model number in rank order, and `next_cursor`.
+
+        Example API Requests:
+            - GET /items/search?q=leather sofa
+            - GET /items/search?q=oak&limit=10
+        """
+        match = search.match_expression(flask.request.args.get('q', ''))
+        if match is None:
+            flask.abort(HTTPStatus.BAD_REQUEST, description="Search query 'q' is missing")
+        limit = _number_arg('limit', int)
+        if limit is None:
+            limit = pagination.DEFAULT_PAGE_SIZE
+        if limit <= 0:
+            flask.abort(HTTPStatus.BAD_REQUEST, description="limit must be a positive integer")
+        cursor = flask.request.args.get('cursor')
+        fields = fieldsets.requested_fields(schema.Furniture)
+
+        # BM25 scores have no stable keyset, so the search cursor carries the offset into the ranking
+        offset = 0
+        if cursor is not None:
+            (offset,) = pagination.decode_cursor(cursor, 'search', (int,))
+            if not isinstance(offset, int) or offset < 0:
+                flask.abort(HTTPStatus.BAD_REQUEST, description="Invalid cursor")
+
+        tag = versions.etag(versions.catalog())
+        not_modified = versions.not_modified(tag)
+        if not_modified:
+            return not_modified
+
+        s = schema.session()
+        results = search.search_items(s, match, limit + 1, offset)
+        next_cursor = pagination.encode_cursor('search', [offset + limit]) if len(results) > limit else None
+        items = {result.model_num: fieldsets.serialize(result, fields) for result in results[:limit]}
+        return versions.tagged(flask.jsonify({'items': items, 'next_cursor': next_cursor}), tag)
 
-        # conditionally add "is_available" only if a specific model_num is requested
-        if model_num:
-            items = {result.model_num: {**result.to_dict(), "is_available": result.stock_quantity > 0} for result in results}
+    @app.route('/items/facets', methods=['GET'])
+    def get_item_facets():
+        """
+        Returns facet counts for category navigation.
+
+        Accepts the same filters as `/items` (`category`, `max_price`, `model_num`,
+        `model_name`, `min_final_price`, `max_final_price`, `details.<key>` and
+        `dimensions.<key>`) and counts the matching
+        items per category, material, color, upholstery and final-price bucket.
+
+        Returns:
+            JSON response with `total`, one count dictionary per facet and the `final_price` min/max.
+
+        Example API Requests:
+            - GET /items/facets
+            - GET /items/facets?category=Sofa&max_final_price=2000
+        """
+        filters = dict(
+            category=flask.request.args.get('category'),
+            max_price=_number_arg('max_price'),
+            model_num=flask.request.args.get('model_num'),
+            model_name=flask.request.args.get('model_name'),
+            min_final_price=_number_arg('min_final_price'),
+            max_final_price=_number_arg('max_final_price'),
+            attributes=furniture_inventory.attribute_filters(flask.request.args),
+        )
+
+        tag = versions.etag(versions.catalog())
+        not_modified = versions.not_modified(tag)
+        if not_modified:
+            return not_modified
+
+        return versions.tagged(flask.jsonify(facets.get_facets(filters)), tag)
+
+    @app.route('/items/batch', methods=['GET', 'POST'])
+    def get_items_batch():
+        """
+        Returns the items with the given model numbers, for pages that show many specific items at once.
+
+        The model numbers are given as repeated `model_num` query parameters (GET),
+        or as a `model_nums` list in the JSON body (POST), at most `MAX_BATCH_SIZE`
+        of them. They are resolved together, from the catalog cache or with one query.
+
+        Returns:
+            JSON response with the found `items`, keyed by model number in request order and
+            including `is_available`, and the `missing` model numbers.
+
+        Example API Requests:
+            - GET /items/batch?model_num=chair-0&model_num=SF-3003
+            - POST /items/batch with {"model_nums": ["chair-0", "SF-3003"]}
+        """
+        if flask.request.method == 'POST':
+            data = flask.request.get_json(silent=True)
+            model_nums = data.get('model_nums') if isinstance(data, dict) else None
+            if not isinstance(model_nums, list) or not all(isinstance(model_num, str) for model_num in model_nums):
+                flask.abort(HTTPStatus.BAD_REQUEST, description="'model_nums' must be a list of model numbers")
         else:
-            items = {result.model_num: result.to_dict() for result in results}
+            model_nums = flask.request.args.getlist('model_num')
+
+        model_nums = list(dict.fromkeys(model_nums))
+        if not model_nums:
+            flask.abort(HTTPStatus.BAD_REQUEST, description="No model numbers given")
+        if len(model_nums) > MAX_BATCH_SIZE:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"At most {MAX_BATCH_SIZE} model numbers can be requested at once")
+
+        tag = None
+        if flask.request.method == 'GET':
+            tag = versions.etag(versions.catalog())
+            not_modified = versions.not_modified(tag)
+            if not_modified:
+                return not_modified
+
+        found = catalog_cache.get_many(model_nums)
+        items = {model_num: {**item, "is_available": item['stock_quantity'] > 0} for model_num, item in found.items()}
+        missing = [model_num for model_num in model_nums if model_num not in found]
+        response = flask.jsonify({'items': items, 'missing': missing})
+        return versions.tagged(response, tag) if tag else response
+
+    @app.route('/items/availability', methods=['GET'])
+    def get_items_availability():
+        """
+        Returns only the stock of the given items, for storefronts that poll availability.
 
-        return flask.jsonify({'items': items})
+        Takes repeated `model_num` query parameters (at most `MAX_BATCH_SIZE`), or a
+        `category`, or both. Nothing but the model numbers and stock quantities is read,
+        and the response carries the catalog ETag, so polls with `If-None-Match` get an
+        empty 304 until the stock changes.
+
+        Returns:
+            JSON response with `availability`, mapping each model number to its `stock_quantity`
+            and `is_available`, and the `missing` model numbers.
+
+        Example API Requests:
+            - GET /items/availability?model_num=chair-0&model_num=SF-3003
+            - GET /items/availability?category=Sofa
+        """
+        model_nums = list(dict.fromkeys(flask.request.args.getlist('model_num'))) or None
+        category = flask.request.args.get('category')
+        if model_nums is None and category is None:
+            flask.abort(HTTPStatus.BAD_REQUEST, description="Give 'model_num' or 'category'")
+        if model_nums is not None and len(model_nums) > MAX_BATCH_SIZE:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"At most {MAX_BATCH_SIZE} model numbers can be requested at once")
+
+        tag = versions.etag(versions.catalog())
+        not_modified = versions.not_modified(tag)
+        if not_modified:
+            return not_modified
+
+        stock = catalog_cache.get_stock(model_nums, category)
+        availability = {model_num: {'stock_quantity': quantity, 'is_available': quantity > 0} for model_num, quantity in stock.items()}
+        missing = [model_num for model_num in model_nums or () if model_num not in stock]
+        return versions.tagged(flask.jsonify({'availability': availability, 'missing': missing}), tag)
 
     @app.route('/admin/add_item', methods=['POST'])
     @admin_required
@@ -90,6 +405,58 @@ def create_app(config: dict=None):
         furniture_inventory.add_item(s, data)  # call add_item from services.py
         return flask.jsonify({})
 
+    @app.route('/admin/import_items', methods=['POST'])
+    @admin_required
+    def import_items_endpoint():
+        """
+        Adds many furniture items at once from an NDJSON or CSV request body.
+
+        Every row is checked with the `/admin/add_item` rules; invalid rows and
+        model numbers that already exist are skipped and reported, the others are
+        inserted in batches. The format is taken from the `format` query parameter,
+        or from the `text/csv` content type, and defaults to NDJSON.
+
+        Returns:
+            JSON response with the import report, see `catalog_import.import_items`.
+
+        Example API Requests:
+            - POST /admin/import_items with an `application/x-ndjson` body, one item per line
+            - POST /admin/import_items?format=csv with the columns of the furniture CSV export
+        """
+        file_format = flask.request.args.get('format', 'csv' if flask.request.mimetype == 'text/csv' else 'ndjson')
+        if file_format not in catalog_import.FORMATS:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"Invalid format: {file_format}. Must be one of {list(catalog_import.FORMATS)}")
+
+        # The body is read line by line as the import goes, never as a whole
+        lines = io.TextIOWrapper(flask.request.stream, encoding='utf-8', newline='')
+        return flask.jsonify(catalog_import.import_items(lines, file_format))
+
+    @app.route('/admin/sync_items', methods=['POST'])
+    @admin_required
+    def sync_items_endpoint():
+        """
+        Brings the catalog in line with a full supplier feed (NDJSON or CSV body), writing only what changed.
+
+        Takes the same body and `format` as `/admin/import_items`. Items missing
+        from the feed are deleted unless `delete_missing=false` is given.
+
+        Returns:
+            JSON response with the change summary, see `catalog_import.sync_items`.
+
+        Example API Requests:
+            - POST /admin/sync_items with an `application/x-ndjson` body, one item per line
+            - POST /admin/sync_items?format=csv&delete_missing=false
+        """
+        file_format = flask.request.args.get('format', 'csv' if flask.request.mimetype == 'text/csv' else 'ndjson')
+        if file_format not in catalog_import.FORMATS:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"Invalid format: {file_format}. Must be one of {list(catalog_import.FORMATS)}")
+        delete_missing = flask.request.args.get('delete_missing', 'true').lower()
+        if delete_missing not in ('true', 'false'):
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"Invalid value for 'delete_missing': {delete_missing}")
+
+        lines = io.TextIOWrapper(flask.request.stream, encoding='utf-8', newline='')
+        return flask.jsonify(catalog_import.sync_items(lines, file_format, delete_missing=delete_missing == 'true'))
+
     @app.route('/admin/update_item', methods=['POST'])
     @admin_required
     def update_item_endpoint():
@@ -139,11 +506,98 @@ def create_app(config: dict=None):
         furniture_inventory.update_item_discount(s, data)
         return flask.jsonify({})
 
+    @app.route('/admin/bulk_update_discount', methods=['POST'])
+    @admin_required
+    def bulk_update_discount_endpoint():
+        """
+        API endpoint for an admin to update the discounts of many furniture items in one transaction.
+
+        Examples of expected payloads:
+        {"items": [{"model_num": "chair-0", "discount": 15.0}, {"model_num": "chair-1", "discount": 20.0}]}
+        {"filter": {"category": "Chair", "attributes": {"details.material": "fabric"}}, "discount": 30.0}
+
+        Discounts follow the rules of `/admin/update_discount`.
+
+        Returns:
+        - 200 OK with the number of items `updated` and the `missing` model numbers
+        - 400 BAD REQUEST if the payload is malformed or a discount is out of range
+        """
+        discounts, selection = _bulk_request('discount', _discount_error)
+        s = schema.session()
+        if selection is None:
+            return flask.jsonify(furniture_inventory.update_item_discounts(s, discounts))
+        return flask.jsonify(furniture_inventory.update_selection_discount(s, selection, discounts))
+
+    @app.route('/admin/bulk_update_quantity', methods=['POST'])
+    @admin_required
+    def bulk_update_quantity_endpoint():
+        """
+        API endpoint for an admin to update the stock quantities of many furniture items in one transaction.
+
+        Examples of expected payloads:
+        {"items": [{"model_num": "chair-0", "stock_quantity": 12}, {"model_num": "chair-1", "stock_quantity": 0}]}
+        {"filter": {"category": "Sofa"}, "stock_quantity": 0}
+
+        Returns:
+        - 200 OK with the number of items `updated` and the `missing` model numbers
+        - 400 BAD REQUEST if the payload is malformed or a quantity is not a non-negative integer
+        """
+        quantities, selection = _bulk_request('stock_quantity', _quantity_error)
+        s = schema.session()
+        if selection is None:
+            return flask.jsonify(furniture_inventory.update_item_quantities(s, quantities))
+        return flask.jsonify(furniture_inventory.update_selection_quantity(s, selection, quantities))
+
+    @app.route('/admin/reprice', methods=['POST'])
+    @admin_required
+    def reprice_endpoint():
+        """
+        Previews, or applies, discount rules across the whole catalog.
+
+        Example of an expected payload:
+        {
+            "rules": [
+                {"category": "Sofa", "discount": 15.0},
+                {"category": "Chair", "attributes": {"details.material": "fabric"}, "discount": 15.0}
+            ],
+            "apply": false
+        }
+
+        Returns:
+        - 200 OK with the matched and changed items and the margin deltas, see `pricing.reprice`
+        - 400 BAD REQUEST if the rules are malformed
+        """
+        data = flask.request.get_json(silent=True)
+        if not isinstance(data, dict):
+            flask.abort(HTTPStatus.BAD_REQUEST, description="A JSON object with 'rules' is required")
+        try:
+            rules = pricing.parse_rules(data.get('rules'))
+        except ValueError as error:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=str(error))
+        if not isinstance(data.get('apply', False), bool):
+            flask.abort(HTTPStatus.BAD_REQUEST, description="'apply' must be true or false")
+
+        return flask.jsonify(pricing.reprice(rules, apply=data.get('apply', False)))
+
+    @app.route('/admin/metrics/sql', methods=['GET'])
+    @admin_required
+    def sql_metrics():
+        """
+        Returns the SQL statistics of the requests served so far, see `instrumentation.metrics`.
+
+        `?reset=true` starts the statistics over after returning them.
+        """
+        result = instrumentation.metrics()
+        if flask.request.args.get('reset', 'false').lower() == 'true':
+            instrumentation.reset()
+        return flask.jsonify(result)
+
     # ================ User ====================
     @app.route('/admin/users', methods=['GET'])
     @admin_required
     def get_users():
-        s = schema.session()
+        # Admin reports read from the replica, so long listings never hold up checkout writes
+        s = schema.read_session()
         query = s.query(schema.User)
 
         user_id = flask.request.args.get('user_id')
@@ -151,8 +605,19 @@ def create_app(config: dict=None):
             user_id = int(user_id)
             query = query.filter(schema.User.user_id == user_id)
 
+        fields = fieldsets.requested_fields(schema.User)
+        if fields is not None:
+            query = query.options(fieldsets.load_only_option(schema.User, fields))
+
+        limit = _number_arg('limit', int)
+        cursor = flask.request.args.get('cursor')
+        if limit is not None or cursor is not None:
+            results, next_cursor = pagination.paginate(query, 'user_id', (schema.User.user_id,), False, limit, cursor)
+            users = {result.user_id: fieldsets.serialize(result, fields) for result in results}
+            return flask.jsonify({'users': users, 'next_cursor': next_cursor})
+
         results = query.all()
-        users = {result.user_id: result.to_dict() for result in results}
+        users = {result.user_id: fieldsets.serialize(result, fields) for result in results}
         return flask.jsonify({'users': users})
 
     @app.route('/add_user', methods=['POST'])
@@ -260,9 +725,6 @@ def create_app(config: dict=None):
     # ============== Shopping Cart ====================
     @app.route('/carts', methods=['GET'])
     def get_cart_items():
-        s = schema.session()
-        query = s.query(schema.CartItem)
-
         user_id = flask.request.args.get('user_id')
         model_num = flask.request.args.get('model_num')
 
@@ -270,31 +732,25 @@ def create_app(config: dict=None):
         if user_id is None:
             flask.abort(HTTPStatus.BAD_REQUEST, description="user ID is missing")
 
-        query = query.filter(schema.CartItem.user_id == user_id)
-        if model_num is not None:
-            query = query.filter(schema.CartItem.model_num == model_num)
-
-        results = query.all()
-        cart_items = defaultdict(list)
-        total_price = 0  # Only needed if filtering by user_id
-
-        for result in results:
-            cart_items[result.user_id].append(result.to_dict())
-            total_price += result.to_dict().get('price', 0)
+        # Cart lines show catalog names and prices, so the tag covers both the cart and the catalog
+        tag = versions.etag(versions.cart(user_id), versions.catalog())
+        not_modified = versions.not_modified(tag)
+        if not_modified:
+            return not_modified
 
-        s.close()  # Properly close session
-        return flask.jsonify({'carts': dict(cart_items), 'total_price': total_price})
+        # Lines, prices and total come from one query joining the cart with the catalog
+        return versions.tagged(flask.jsonify(cart.get_carts(schema.session(), user_id, model_num)), tag)
 
     @app.route('/admin/carts', methods=['GET'])
     @admin_required
     def get_all_cart_items():
-        s = schema.session()
-        query = s.query(schema.CartItem)
-        results = query.all()
-        cart_items = defaultdict(list)
-        for result in results:
-            cart_items[result.user_id].append(result.to_dict())
-        return flask.jsonify({'carts': dict(cart_items)})
+        # Streamed after the view returns, so on a session of its own that streaming.rows closes
+        s = schema.new_read_session()
+        # One user's cart at a time: users in ID order, each cart in the order its items were added
+        query = cart.lines_query(s).order_by(schema.CartItem.user_id, literal_column('"CartItem".rowid'))
+        results = streaming.rows(s, query, lambda row: (row.user_id, cart.line_dict(row)))
+        carts = ((user_id, [item for _, item in group]) for user_id, group in itertools.groupby(results, key=operator.itemgetter(0)))
+        return streaming.response({'carts': streaming.Members(carts)})
 
     @app.route('/user/add_item_to_cart', methods=['POST'])
     @login_required
@@ -331,6 +787,11 @@ def create_app(config: dict=None):
     @app.route('/user/orders/<user_id>', methods=['GET'])
     @login_required
     def get_order_items(user_id: int):
+        tag = versions.etag(versions.orders(user_id))
+        not_modified = versions.not_modified(tag)
+        if not_modified:
+            return not_modified
+
         s = schema.session()
         query = s.query(schema.Order)
 
@@ -340,17 +801,28 @@ def create_app(config: dict=None):
         if order_num is not None:
             query = query.filter(schema.Order.order_num == order_num)
 
+        fields = fieldsets.requested_fields(schema.Order, schema.Order.COMPUTED_FIELDS)
+        query = _order_options(query, fields)
+
+        limit = _number_arg('limit', int)
+        cursor = flask.request.args.get('cursor')
+        if limit is not None or cursor is not None:
+            # Newest first, keyed on (creation_time, order_num) so pages stay stable while new orders arrive
+            results, next_cursor = pagination.paginate(query, 'creation_time', ORDER_PAGE_KEY, True, limit, cursor)
+            orders = {result.order_num: fieldsets.serialize(result, fields) for result in results}
+            return versions.tagged(flask.jsonify({'orders': orders, 'next_cursor': next_cursor}), tag)
+
         # Order by creation_time in descending order
         query = query.order_by(schema.Order.creation_time.desc())
 
         results = query.all()
-        orders = {result.order_num: result.to_dict() for result in results}
-        return flask.jsonify({'orders': orders})
+        orders = {result.order_num: fieldsets.serialize(result, fields) for result in results}
+        return versions.tagged(flask.jsonify({'orders': orders}), tag)
 
     @app.route('/admin/orders', methods=['GET'])
     @admin_required
     def get_order_items_admin():
-        s = schema.session()
+        s = schema.read_session()
         query = s.query(schema.Order)
 
         user_id = flask.request.args.get('user_id')
@@ -362,12 +834,56 @@ def create_app(config: dict=None):
         if order_num is not None:
             query = query.filter(schema.Order.order_num == order_num)
 
-        # Order by creation_time in descending order
+        fields = fieldsets.requested_fields(schema.Order, schema.Order.COMPUTED_FIELDS)
+        query = _order_options(query, fields)
+
+        limit = _number_arg('limit', int)
+        cursor = flask.request.args.get('cursor')
+        if limit is not None or cursor is not None:
+            # Newest first, keyed on (creation_time, order_num) so pages stay stable while new orders arrive
+            results, next_cursor = pagination.paginate(query, 'creation_time', ORDER_PAGE_KEY, True, limit, cursor)
+            orders = {result.order_num: fieldsets.serialize(result, fields) for result in results}
+            return flask.jsonify({'orders': orders, 'next_cursor': next_cursor})
+
+        # Order by creation_time in descending order; all orders can be many, so they are streamed
         query = query.order_by(schema.Order.creation_time.desc())
 
-        results = query.all()
-        orders = {result.order_num: result.to_dict() for result in results}
-        return flask.jsonify({'orders': orders})
+        # Streamed after the view returns, so on a session of its own that streaming.rows closes
+        stream_session = schema.new_read_session()
+        query = query.with_session(stream_session)
+        orders = streaming.rows(stream_session, query, lambda result: (result.order_num, fieldsets.serialize(result, fields)))
+        return streaming.response({'orders': streaming.Members(orders)})
+
+    @app.route('/admin/export/<dataset>', methods=['GET'])
+    @admin_required
+    def export_dataset(dataset):
+        """
+        Streams a whole table for offline analysis, in constant memory.
+
+        `dataset` is `furniture`, `orders` (one record per line item), `users`
+        (without password hashes) or `cart_items`. The `format` query parameter
+        selects `ndjson` (default) or `csv`, and `since` (ISO 8601, UTC unless
+        given) keeps only the rows inserted or updated from that time on.
+
+        Example API Requests:
+            - GET /admin/export/furniture?format=csv
+            - GET /admin/export/orders?since=2025-03-01T00:00:00
+        """
+        if dataset not in export.DATASETS:
+            flask.abort(HTTPStatus.NOT_FOUND, description=f"Unknown dataset: {dataset}. Must be one of {list(export.DATASETS)}")
+        file_format = flask.request.args.get('format', 'ndjson')
+        if file_format not in export.FORMATS:
+            flask.abort(HTTPStatus.BAD_REQUEST, description=f"Invalid format: {file_format}. Must be one of {list(export.FORMATS)}")
+        since = flask.request.args.get('since')
+        if since is not None:
+            try:
+                since = export.parse_since(since)
+            except ValueError:
+                flask.abort(HTTPStatus.BAD_REQUEST, description=f"Invalid value for 'since': {since}")
+
+        response = flask.Response(export.export(dataset, file_format, since), mimetype=export.FORMATS[file_format])
+        response.headers['Content-Disposition'] = f'attachment; filename="{dataset}.{file_format}"'
+        return response
 
     @app.route('/admin/update_order_status', methods=['POST'])
     @admin_required
@@ -383,8 +899,9 @@ def create_app(config: dict=None):
         if "order_num" not in data:
             flask.abort(HTTPStatus.BAD_REQUEST, description="order num  is missing")
 
-        s = schema.session()
-        order.update_order_status(s, data)
+        # The new status and, for a cancellation, the returned stock are committed together
+        with schema.transaction() as s:
+            order.update_order_status(s, data)
         return flask.jsonify({})
 
     # -------------checkout---------------
@@ -410,7 +927,9 @@ def create_app(config: dict=None):
             return flask.jsonify({"error": "Invalid payment method"}), 400
 
         checkout = CheckoutService(payment_strategy=payment_strategy)
-        result = checkout.checkout(user_id, address)
+        # Order, stock and cart changes are committed together, or not at all if a step fails
+        with schema.transaction():
+            result = checkout.checkout(user_id, address)
         return flask.jsonify(result)
 
     return app
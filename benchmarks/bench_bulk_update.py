@@ -0,0 +1,77 @@
+"""
+Times discount and stock updates of many items: one transaction per item against the bulk variants.
+
+Run from the project root:
+    python -m benchmarks.bench_bulk_update [--items 10000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import insert
+import schema
+import source.controller.furniture_inventory as furniture_inventory
+
+# Items updated one by one; the per-item time is the same for any number of items
+PER_ITEM_SAMPLE = 1000
+
+
+def populate(items: int) -> None:
+    rows = [
+        dict(
+            model_num=f"CH-{i}",
+            model_name=f"model-{i}",
+            price=100.0 + i % 900,
+            dimensions={"width": 45},
+            stock_quantity=i % 20,
+            details={"material": "fabric" if i % 2 else "wood", "weight": 5, "color": "white"},
+            category="Chair",
+            image_filename="chair.jpg",
+            discount=0.0,
+            final_price=schema.customer_price(100.0 + i % 900, 0.0),
+        )
+        for i in range(items)
+    ]
+    s = schema.session()
+    s.execute(insert(schema.Furniture.__table__), rows)
+    s.commit()
+    s.close()
+
+
+def timed(name: str, function, count: int) -> None:
+    s = schema.session()
+    started = time.perf_counter()
+    function(s)
+    elapsed = time.perf_counter() - started
+    s.close()
+    print(f"{name:<34} {elapsed * 1000:9.1f} ms  ({elapsed / count * 1e6:7.1f} us per item)")
+
+
+def run(items: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        populate(items)
+        model_nums = [f"CH-{i}" for i in range(items)]
+        sample = model_nums[:PER_ITEM_SAMPLE]
+        print(f"{items}-item catalog\n")
+
+        def one_by_one(s):
+            for model_num in sample:
+                furniture_inventory.update_item_discount(s, {"model_num": model_num, "discount": 15.0})
+
+        timed(f"update_item_discount x{len(sample)}", one_by_one, len(sample))
+        timed(f"update_item_discounts ({items})", lambda s: furniture_inventory.update_item_discounts(s, dict.fromkeys(model_nums, 20.0)), items)
+        timed("update_selection_discount", lambda s: furniture_inventory.update_selection_discount(s, {"category": "Chair"}, 25.0), items)
+        timed(f"update_item_quantities ({items})", lambda s: furniture_inventory.update_item_quantities(s, dict.fromkeys(model_nums, 7)), items)
+        timed("update_selection_quantity", lambda s: furniture_inventory.update_selection_quantity(s, {"category": "Chair"}, 3), items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    run(parser.parse_args().items)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Times reading a cart with a catalog query per line, as CartItem.to_dict did, against the single joined query.
+
+Run from the project root:
+    python -m benchmarks.bench_cart [--lines 30] [--repeat 200]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import flask
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+import schema
+import source.controller.cart as cart
+
+USER_ID = 1
+
+
+def populate(lines: int) -> None:
+    s = schema.session()
+    s.execute(
+        insert(schema.Furniture.__table__),
+        [
+            dict(
+                model_num=f"CH-{i}",
+                model_name=f"model-{i}",
+                price=100.0 + i,
+                dimensions={"width": 45},
+                stock_quantity=20,
+                details={"material": "wood", "weight": 5, "color": "white"},
+                category="Chair",
+                image_filename="chair.jpg",
+                discount=10.0,
+                final_price=schema.customer_price(100.0 + i, 10.0),
+            )
+            for i in range(lines)
+        ],
+    )
+    s.execute(insert(schema.CartItem.__table__), [dict(user_id=USER_ID, model_num=f"CH-{i}", quantity=1 + i % 3) for i in range(lines)])
+    s.commit()
+    s.close()
+
+
+def _line(item) -> dict:
+    # CartItem.to_dict before the join: a catalog query and a copy of the whole item per line
+    furniture = schema.session().query(schema.Furniture).filter_by(model_num=item.model_num).first()
+    furniture.to_dict()
+    result = {'user_id': item.user_id, 'model_num': item.model_num, 'quantity': item.quantity, 'model_name': furniture.model_name}
+    result['price_per_unit'] = furniture.calculate_final_price()
+    result['price'] = result['price_per_unit'] * item.quantity
+    return result
+
+
+def per_line() -> dict:
+    # The cart read before the join, which serialized every line twice to add up the total
+    lines, total_price = [], 0
+    for item in schema.session().query(schema.CartItem).filter(schema.CartItem.user_id == USER_ID):
+        lines.append(_line(item))
+        total_price += _line(item)['price']
+    return {'carts': {USER_ID: lines}, 'total_price': total_price}
+
+
+def joined() -> dict:
+    return cart.get_carts(schema.session(), USER_ID)
+
+
+def timed(app: flask.Flask, name: str, function, repeat: int) -> None:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    event.listen(Engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        for _ in range(repeat):
+            # One app context per read, like a request: schema.session() is shared within it and closed after
+            with app.app_context():
+                function()
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    elapsed = time.perf_counter() - started
+    print(f"{name:<10} {elapsed / repeat * 1000:8.2f} ms per cart  {statements // repeat:4} statements")
+
+
+def run(lines: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        populate(lines)
+        print(f"{lines}-line cart, {repeat} reads\n")
+        app = flask.Flask(__name__)
+        schema.install(app)
+        timed(app, "per line", per_line, repeat)
+        timed(app, "joined", joined, repeat)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--lines", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    run(args.lines, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
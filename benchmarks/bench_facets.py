@@ -0,0 +1,50 @@
+"""
+Times the /items/facets aggregate against a large catalog, uncached and cached.
+
+Run from the project root:
+    python -m benchmarks.bench_facets [--rows 100000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import schema
+import source.controller.facets as facets
+from benchmarks.bench_search import populate
+
+FILTERS = {
+    "all items": {},
+    "category=Sofa": {"category": "Sofa"},
+    "max_final_price=500": {"max_final_price": 500.0},
+}
+
+
+def run(rows: int, repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        populate(rows)
+        print(f"{rows} furniture rows\n")
+
+        for name, filters in FILTERS.items():
+            started = time.perf_counter()
+            for _ in range(repeat):
+                result = facets.compute_facets(filters)
+            uncached_ms = (time.perf_counter() - started) / repeat * 1000
+
+            facets.get_facets(filters)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                facets.get_facets(filters)
+            cached_ms = (time.perf_counter() - started) / repeat * 1000
+            print(f"{name:<22} query {uncached_ms:9.2f} ms  cached {cached_ms:7.3f} ms  {result['total']} items")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    run(parser.parse_args().rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Compares SQLite query plans and timings for the listing queries with and without the declared indexes.
+
+Run from the project root:
+    python -m benchmarks.bench_indexes [--rows 100000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+import schema
+from source.models.OrderStatus import OrderStatus
+
+CATEGORIES = ["Bed", "Chair", "Book Shelf", "Sofa", "Table"]
+
+# name -> (SQL, parameters); these mirror the queries issued by the /items, /admin/orders and /add_user paths
+QUERIES = {
+    "/items?category=&max_price=": ("SELECT * FROM furniture WHERE category = ? AND price < ?", ("Chair", 150.0)),
+    "/items?model_name=": ("SELECT * FROM furniture WHERE model_name = ?", ("model-4242",)),
+    "/admin/orders?user_id=": ('SELECT * FROM "order" WHERE user_id = ? ORDER BY creation_time DESC', (4242,)),
+    "/admin/orders (first 50)": ('SELECT * FROM "order" ORDER BY creation_time DESC LIMIT 50', ()),
+    "orders by status (first 50)": ('SELECT * FROM "order" WHERE status = ? ORDER BY creation_time DESC LIMIT 50', ("PENDING",)),
+    "add_new_user email lookup": ("SELECT * FROM users WHERE user_id = ? OR email = ?", (4242, "user4242@example.com")),
+}
+
+
+def populate(rows: int) -> None:
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    with schema._engine.begin() as connection:
+        connection.execute(
+            insert(schema.Furniture),
+            [
+                dict(
+                    model_num=f"M-{i}",
+                    model_name=f"model-{i}",
+                    description="benchmark item",
+                    price=rng.uniform(20, 3000),
+                    final_price=0.0,
+                    dimensions={"width": rng.randint(30, 250)},
+                    stock_quantity=rng.randint(0, 20),
+                    details={"material": "wood", "color": "white"},
+                    category=rng.choice(CATEGORIES),
+                    image_filename="item.jpg",
+                    discount=0.0,
+                )
+                for i in range(rows)
+            ],
+        )
+        connection.execute(
+            insert(schema.User),
+            [dict(user_id=i, user_name=f"user{i}", email=f"user{i}@example.com", role="user") for i in range(rows)],
+        )
+        connection.execute(
+            insert(schema.Order),
+            [
+                dict(
+                    user_id=rng.randrange(rows),
+                    items={f"M-{rng.randrange(rows)}": 1},
+                    total_price=100.0,
+                    status=rng.choice(list(OrderStatus)),
+                    creation_time=start + timedelta(minutes=i),
+                )
+                for i in range(rows * 2)
+            ],
+        )
+
+
+def measure(connection, sql: str, params: tuple, repeat: int = 5):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        connection.exec_driver_sql(sql, params).fetchall()
+    elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+    plan = " | ".join(row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params))
+    return plan, elapsed_ms
+
+
+def run(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        populate(rows)
+
+        indexes = [index for table in schema.Base.metadata.sorted_tables for index in table.indexes]
+        results = {}
+        for label in ("without indexes", "with indexes"):
+            with schema._engine.begin() as connection:
+                for index in indexes:
+                    if label == "without indexes":
+                        index.drop(connection, checkfirst=True)
+                    else:
+                        index.create(connection, checkfirst=True)
+                connection.exec_driver_sql("ANALYZE")
+            # Cached EXPLAIN statements are never re-prepared after a schema change, so start from fresh connections
+            schema._engine.dispose()
+            with schema._engine.connect() as connection:
+                for name, (sql, params) in QUERIES.items():
+                    results.setdefault(name, {})[label] = measure(connection, sql, params)
+
+    print(f"{rows} furniture rows, {rows} users, {rows * 2} orders\n")
+    for name, by_label in results.items():
+        print(name)
+        for label, (plan, ms) in by_label.items():
+            print(f"  {label:<16} {ms:9.2f} ms  {plan}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    run(parser.parse_args().rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Times serializing an order listing with a customer query per order against loading the customers in the same query.
+
+Run from the project root:
+    python -m benchmarks.bench_orders [--orders 10000] [--users 1000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import event, insert
+from sqlalchemy.engine import Engine
+import schema
+from source.models.OrderStatus import OrderStatus
+
+
+def populate(orders: int, users: int) -> None:
+    s = schema.session()
+    s.execute(
+        insert(schema.User.__table__),
+        [
+            dict(
+                user_id=i, user_name=f"user-{i}", user_full_name=f"User {i}", user_phone_num=f"555-{i:04}", email=f"user{i}@example.com", role="user"
+            )
+            for i in range(users)
+        ],
+    )
+    s.execute(
+        insert(schema.Order.__table__),
+        [
+            dict(user_id=i % users, user_email=f"user{i % users}@example.com", items={"CH-1": 1}, total_price=118.0, status=OrderStatus.PENDING)
+            for i in range(orders)
+        ],
+    )
+    s.commit()
+    s.close()
+
+
+def timed(name: str, options: tuple) -> None:
+    statements = 0
+
+    def count(*args):
+        nonlocal statements
+        statements += 1
+
+    s = schema.new_session()
+    event.listen(Engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        orders = [order.to_dict() for order in s.query(schema.Order).options(*options)]
+    finally:
+        event.remove(Engine, "before_cursor_execute", count)
+    elapsed = time.perf_counter() - started
+    s.close()
+    print(f"{name:<22} {elapsed * 1000:9.1f} ms  {statements:6} statements  ({len(orders)} orders)")
+
+
+def run(orders: int, users: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        populate(orders, users)
+        print(f"{orders} orders of {users} users\n")
+        timed("customer per order", ())
+        timed("customer joined", (schema.Order.with_customer(),))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=10_000)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.orders, args.users)
+
+
+if __name__ == "__main__":
+    main()
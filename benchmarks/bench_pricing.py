@@ -0,0 +1,80 @@
+"""
+Times previewing and applying discount rules across a 100k-item catalog.
+
+Run from the project root:
+    python -m benchmarks.bench_pricing [--rows 100000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from sqlalchemy import insert
+import schema
+import source.controller.pricing as pricing
+
+CATEGORIES = (
+    ("Sofa", {"width": 200}, ({"upholstery": "fabric", "color": "gray"}, {"upholstery": "leather", "color": "gray"})),
+    ("Chair", {"width": 45}, ({"material": "fabric", "weight": 5, "color": "white"}, {"material": "wood", "weight": 5, "color": "white"})),
+    ("Table", {"shape": "circular", "width": 90}, ({"material": "oak"},)),
+)
+
+RULES = [
+    {"category": "Sofa", "discount": 15},
+    {"category": "Chair", "attributes": {"details.material": "fabric"}, "discount": 15},
+]
+
+
+def populate(rows: int) -> None:
+    items = []
+    for i in range(rows):
+        category, dimensions, variants = CATEGORIES[i % len(CATEGORIES)]
+        price = 100.0 + i % 900
+        discount = float(i % 4 * 5)
+        items.append(
+            dict(
+                model_num=f"M-{i}",
+                model_name=f"model-{i}",
+                price=price,
+                dimensions=dimensions,
+                stock_quantity=i % 20,
+                details=variants[i // len(CATEGORIES) % len(variants)],
+                category=category,
+                image_filename="item.jpg",
+                discount=discount,
+                final_price=schema.customer_price(price, discount),
+            )
+        )
+    s = schema.session()
+    s.execute(insert(schema.Furniture.__table__), items)
+    s.commit()
+    s.close()
+
+
+def timed(name: str, function):
+    started = time.perf_counter()
+    report = function()
+    print(
+        f"{name:<10} {(time.perf_counter() - started) * 1000:8.1f} ms  {report['matched']} matched, {report['changed']} changed, {report['applied']} applied"
+    )
+
+
+def run(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        populate(rows)
+        print(f"{rows}-item catalog, rules: {RULES}\n")
+        rules = pricing.parse_rules(RULES)
+        timed("preview", lambda: pricing.reprice(rules))
+        timed("apply", lambda: pricing.reprice(rules, apply=True))
+        timed("re-apply", lambda: pricing.reprice(rules, apply=True))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    run(parser.parse_args().rows)
+
+
+if __name__ == "__main__":
+    main()
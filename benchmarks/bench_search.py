@@ -0,0 +1,81 @@
+"""
+Times /items/search queries against a large catalog and shows their SQLite query plans.
+
+Run from the project root:
+    python -m benchmarks.bench_search [--rows 100000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from sqlalchemy import insert
+import schema
+import source.controller.search as search
+
+CATEGORIES = ["Bed", "Chair", "Book Shelf", "Sofa", "Table"]
+MATERIALS = ["wood", "oak", "pine wood", "metal", "glass", "solid wood"]
+COLORS = ["white", "black", "natural oak", "dark gray", "walnut", "red"]
+UPHOLSTERY = ["leather", "top-grain leather", "fabric", "velvet", "linen"]
+WORDS = ["comfortable", "modern", "classic", "luxurious", "sturdy", "compact", "elegant", "rustic", "frame", "living", "room", "office"]
+
+QUERIES = ["leather", "oak", "modern sofa", "velv", "model-4242", "rustic walnut table"]
+
+
+def populate(rows: int) -> None:
+    rng = random.Random(0)
+    with schema._engine.begin() as connection:
+        connection.execute(
+            insert(schema.Furniture),
+            [
+                dict(
+                    model_num=f"M-{i}",
+                    model_name=f"model-{i}",
+                    description=" ".join(rng.sample(WORDS, 5)),
+                    price=rng.uniform(20, 3000),
+                    final_price=0.0,
+                    dimensions={"width": rng.randint(30, 250)},
+                    stock_quantity=rng.randint(0, 20),
+                    details={"material": rng.choice(MATERIALS), "color": rng.choice(COLORS), "upholstery": rng.choice(UPHOLSTERY)},
+                    category=rng.choice(CATEGORIES),
+                    image_filename="item.jpg",
+                    discount=0.0,
+                )
+                for i in range(rows)
+            ],
+        )
+
+
+def run(rows: int, repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        started = time.perf_counter()
+        populate(rows)
+        print(f"{rows} furniture rows inserted (with index maintenance) in {time.perf_counter() - started:.1f} s\n")
+
+        s = schema.session()
+        for query in QUERIES:
+            match = search.match_expression(query)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                results = search.search_items(s, match, limit=50)
+            elapsed_ms = (time.perf_counter() - started) / repeat * 1000
+            print(f"{query!r:<24} {elapsed_ms:9.2f} ms  {len(results)} results")
+
+        statement = search._SEARCH.bindparams(query=search.match_expression("leather"), limit=50, offset=0)
+        compiled = statement.compile(schema._engine)
+        with schema._engine.connect() as connection:
+            plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), tuple(compiled.params[name] for name in compiled.positiontup))
+            print("\nplan: " + " | ".join(row[3] for row in plan))
+        s.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    run(parser.parse_args().rows)
+
+
+if __name__ == "__main__":
+    main()
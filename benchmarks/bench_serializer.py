@@ -0,0 +1,55 @@
+"""
+Compares the column serializer behind to_dict() with the deepcopy-based one it replaced.
+
+Run from the project root:
+    python -m benchmarks.bench_serializer [--rows 10000]
+"""
+
+import argparse
+import copy
+import os
+import tempfile
+import time
+import schema
+from benchmarks.bench_search import populate
+
+
+def deepcopy_to_dict(row) -> dict:
+    # The previous Base.to_dict
+    phase1 = {key: value for (key, value) in row.__dict__.items() if not key.startswith('_')}
+    return copy.deepcopy(phase1)
+
+
+def timed(function, rows: list, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for row in rows:
+            function(row)
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def run(rows: int, repeat: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        populate(rows)
+        s = schema.session()
+        loaded = s.query(schema.Furniture).all()
+
+        assert all(deepcopy_to_dict(row) == schema.Base.to_dict(row) for row in loaded)
+        print(f"{len(loaded)} furniture rows, ms per pass over all rows\n")
+        before = timed(deepcopy_to_dict, loaded, repeat)
+        after = timed(schema.Base.to_dict, loaded, repeat)
+        print(f"{'deepcopy':<22} {before:9.2f} ms")
+        print(f"{'column serializer':<22} {after:9.2f} ms  ({before / after:.1f}x)")
+        print(f"{'Furniture.to_dict':<22} {timed(schema.Furniture.to_dict, loaded, repeat):9.2f} ms  (with final_price)")
+        s.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    run(parser.parse_args().rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Measures a mixed browse / checkout load against a file database, once per SQLite profile.
+
+Browser threads page through the catalog in SQL (`/items?sort=final_price&limit=20`); shopper
+threads log in, add an item to their cart and check out. Every profile gets a fresh database.
+
+Run from the project root:
+    python -m benchmarks.bench_sqlite_profiles [--seconds 10] [--browsers 4] [--shoppers 2]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import time
+from sqlalchemy import insert
+from werkzeug.security import generate_password_hash
+import app
+import schema
+
+ITEMS = 5000
+PASSWORD = "benchmark"
+
+
+def populate(shoppers: int) -> None:
+    s = schema.new_session()
+    s.execute(
+        insert(schema.Furniture.__table__),
+        [
+            dict(
+                model_num=f"CH-{i}",
+                model_name=f"model-{i}",
+                price=100.0 + i % 900,
+                dimensions={"width": 45},
+                stock_quantity=1_000_000,
+                details={"material": "wood", "weight": 5, "color": "white"},
+                category="Chair",
+                image_filename="chair.jpg",
+                discount=0.0,
+                final_price=schema.customer_price(100.0 + i % 900, 0.0),
+            )
+            for i in range(ITEMS)
+        ],
+    )
+    # A cheap hash: logging in is not what is measured
+    password = generate_password_hash(PASSWORD, method="pbkdf2:sha256:1000")
+    s.add_all(
+        schema.User(user_id=i, user_name=f"shopper-{i}", email=f"shopper-{i}@example.com", address="1 Bench Street", password=password)
+        for i in range(1, shoppers + 1)
+    )
+    s.commit()
+    s.close()
+
+
+def browse(client, stop: threading.Event, counts: dict) -> None:
+    cursor = None
+    while not stop.is_set():
+        query = {"sort": "final_price", "limit": 20, "category": "Chair"}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get("/items", query_string=query)
+        counts["ok" if response.status_code == 200 else "failed"] += 1
+        cursor = response.get_json()["next_cursor"] if response.status_code == 200 else None
+
+
+def shop(client, user_id: int, stop: threading.Event, counts: dict) -> None:
+    client.post("/login", json={"user_name": f"shopper-{user_id}", "password": PASSWORD})
+    i = 0
+    while not stop.is_set():
+        i += 1
+        cart_item = {"user_id": user_id, "model_num": f"CH-{(user_id * 7919 + i) % ITEMS}", "quantity": 1}
+        response = client.post("/user/add_item_to_cart", json=cart_item)
+        if response.status_code == 200:
+            order = {"user_id": user_id, "address": "1 Bench Street", "payment_method": "credit_card"}
+            response = client.post("/checkout", json=order)
+        # The mock payment gateway declines about 1% of payments at random
+        counts["ok" if response.status_code == 200 else "failed"] += 1
+
+
+def run_profile(profile: str, seconds: float, browsers: int, shoppers: int) -> tuple:
+    with tempfile.TemporaryDirectory() as directory:
+        # create_app echoes its SQL
+        with contextlib.redirect_stdout(io.StringIO()):
+            application = app.create_app({"database_url": f"sqlite:///{os.path.join(directory, 'bench.db')}", "sqlite_profile": profile})
+        schema._engine.echo = False
+        # Declined payments are logged with a traceback; they are counted instead
+        application.logger.disabled = True
+        populate(shoppers)
+
+        stop = threading.Event()
+        browse_counts = [{"ok": 0, "failed": 0} for _ in range(browsers)]
+        shop_counts = [{"ok": 0, "failed": 0} for _ in range(shoppers)]
+        threads = [threading.Thread(target=browse, args=(application.test_client(), stop, counts)) for counts in browse_counts]
+        threads += [
+            threading.Thread(target=shop, args=(application.test_client(), user_id, stop, counts)) for user_id, counts in enumerate(shop_counts, 1)
+        ]
+        # The controllers print to stdout; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            time.sleep(seconds)
+            stop.set()
+            for thread in threads:
+                thread.join()
+        schema._engine.dispose()
+
+    total = lambda counts, key: sum(count[key] for count in counts)  # noqa: E731
+    return total(browse_counts, "ok") / seconds, total(shop_counts, "ok") / seconds, total(browse_counts, "failed") + total(shop_counts, "failed")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--browsers", type=int, default=4)
+    parser.add_argument("--shoppers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.browsers} browsing and {args.shoppers} shopping threads, {args.seconds:g} s per profile\n")
+    print(f"{'profile':<12} {'pages/s':>9} {'checkouts/s':>12} {'failed':>7}")
+    for profile in schema.SQLITE_PROFILES:
+        pages, checkouts, failed = run_profile(profile, args.seconds, args.browsers, args.shoppers)
+        print(f"{profile:<12} {pages:9.1f} {checkouts:12.1f} {failed:7d}")
+
+
+if __name__ == "__main__":
+    main()
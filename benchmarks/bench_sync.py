@@ -0,0 +1,70 @@
+"""
+Times a full supplier feed sync: the initial load, a daily feed with 1% of the rows changed, and an unchanged feed.
+
+Run from the project root:
+    python -m benchmarks.bench_sync [--rows 100000]
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import schema
+import source.controller.catalog_import as catalog_import
+
+
+def feed(rows: int, changed: float = 0.0, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    lines = []
+    for i in range(rows):
+        price = 100.0 + i % 900
+        if rng.random() < changed:
+            price += 1
+        lines.append(
+            json.dumps(
+                dict(
+                    model_num=f"SF-{i}",
+                    model_name=f"model-{i}",
+                    description="A comfortable modern sofa",
+                    price=price,
+                    dimensions={"width": 200 + i % 50},
+                    stock_quantity=i % 20,
+                    details={"upholstery": "leather", "color": "dark gray"},
+                    image_filename="sofa.jpg",
+                    discount=0.0,
+                    category="Sofa",
+                )
+            )
+        )
+    return "\n".join(lines) + "\n"
+
+
+def timed_sync(name: str, text: str) -> None:
+    started = time.perf_counter()
+    report = catalog_import.sync_items(io.StringIO(text), 'ndjson')
+    elapsed = time.perf_counter() - started
+    counts = ", ".join(f"{report[kind]} {kind}" for kind in ('inserted', 'updated', 'unchanged', 'deleted'))
+    print(f"{name:<22} {elapsed:7.2f} s  {counts}")
+
+
+def run(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        schema.create(f"sqlite:///{os.path.join(directory, 'bench.db')}", echo=False)
+        print(f"{rows}-row feed\n")
+        timed_sync("initial load", feed(rows))
+        timed_sync("1% changed", feed(rows, changed=0.01))
+        timed_sync("unchanged", feed(rows, changed=0.01))
+        timed_sync("1% removed", feed(rows - rows // 100, changed=0.01))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    run(parser.parse_args().rows)
+
+
+if __name__ == "__main__":
+    main()
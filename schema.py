@@ -1,27 +1,86 @@
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, sessionmaker
-from sqlalchemy import String, Float, Integer, JSON, create_engine, PrimaryKeyConstraint, DateTime
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, foreign, joinedload, mapped_column, relationship, sessionmaker
+from sqlalchemy import String, Float, Integer, JSON, Column, Computed, create_engine, PrimaryKeyConstraint, DateTime, Index, event, inspect, select, text
+from sqlalchemy.schema import CreateColumn
 from typing import Optional, Dict
-import copy
 import abc
+import contextlib
+import flask
+import functools
 from datetime import datetime, UTC
 import source.controller.cart as cart
 import source.controller.user as user
+import source.controller.catalog_cache as catalog_cache
+import source.controller.versions as versions
+import source.controller.search as search
 from source.models.OrderStatus import OrderStatus
 from sqlalchemy import Enum as SQLAlchemyEnum
 
 
+def _copy_json(value):
+    """Copies a JSON column value; only dicts and lists can be nested in one, so no deepcopy is needed."""
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+# Per mapped class: the (key, is_json) pair of every column attribute, in table order
+_serialized_columns = {}
+
+
+def _columns_of(class_) -> tuple:
+    columns = _serialized_columns.get(class_)
+    if columns is None:
+        columns = tuple((prop.key, isinstance(prop.columns[0].type, JSON)) for prop in inspect(class_).column_attrs)
+        _serialized_columns[class_] = columns
+    return columns
+
+
 class Base(DeclarativeBase):
     def to_dict(self):
-        phase1 = {key: value for (key, value) in self.__dict__.items() if not key.startswith('_')}
-        phase2 = copy.deepcopy(phase1)
-        return phase2
+        """
+        Returns the loaded column values of the row as a new dict.
+
+        Columns that were not loaded (see fieldsets.py) or are expired are left out.
+        JSON values are copied, so changing the result never changes the row.
+        """
+        state = self.__dict__
+        return {key: _copy_json(state[key]) if is_json else state[key] for key, is_json in _columns_of(type(self)) if key in state}
+
+
+def _change_time() -> Column:
+    """
+    Time of the row's last insert or update (UTC, ISO 8601), for incremental exports.
+
+    Set by the triggers `create` installs, so every write path, including bulk SQL,
+    keeps it current. Like the attribute columns it is not mapped.
+    """
+    return Column("updated_at", String, index=True)
+
+
+def _json_attribute(source: str, key: str, type_, index: bool = True) -> Column:
+    """Virtual column holding one key of a JSON column, so it can be indexed and filtered in SQL."""
+    return Column(f"{source}_{key}", type_, Computed(f"json_extract({source}, '$.{key}')", persisted=False), index=index)
+
+
+def apply_tax(price: float, tax_rate: float = 18) -> float:
+    """Apply a tax rate to the price and return the new price."""
+    return round(price * (1 + tax_rate / 100), 1)
+
+
+def customer_price(price: float, discount: float) -> float:
+    """Return the price the customer pays for an item of this price and discount (in percent), after tax."""
+    if discount > 0.0:
+        return apply_tax(price * (1 - discount / 100))
+    return apply_tax(price)
 
 
 class Furniture(Base):
     __tablename__ = "furniture"
 
     model_num: Mapped[str] = mapped_column(String, primary_key=True)
-    model_name: Mapped[str] = mapped_column(String, nullable=False)
+    model_name: Mapped[str] = mapped_column(String, nullable=False, index=True)
     description: Mapped[Optional[str]] = mapped_column(String, nullable=True)
     price: Mapped[float] = mapped_column(Float, nullable=False)
     dimensions: Mapped[Optional[Dict]] = mapped_column(JSON, nullable=True)
@@ -30,20 +89,59 @@ class Furniture(Base):
     category: Mapped[str] = mapped_column(String, nullable=False)
     image_filename: Mapped[str] = mapped_column(String, nullable=False)
     discount: Mapped[float] = mapped_column(Float, nullable=False)
+    # Maintained copy of calculate_final_price(), kept in the table so /items can filter and sort on it in SQL
+    final_price: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+    # The attributes the valid() methods below treat as canonical, mirrored into indexed virtual columns
+    # for the /items `details.<key>` / `dimensions.<key>` filters. They are query-only: not mapped, never written.
+    details_material = _json_attribute('details', 'material', String(collation='NOCASE'))
+    details_frame_material = _json_attribute('details', 'frame_material', String(collation='NOCASE'))
+    details_mattress_type = _json_attribute('details', 'mattress_type', String(collation='NOCASE'))
+    details_upholstery = _json_attribute('details', 'upholstery', String(collation='NOCASE'))
+    details_color = _json_attribute('details', 'color', String(collation='NOCASE'))
+    dimensions_width = _json_attribute('dimensions', 'width', Float)
+    dimensions_shape = _json_attribute('dimensions', 'shape', String(collation='NOCASE'))
+    dimensions_is_extendable = _json_attribute('dimensions', 'is_extendable', Integer, index=False)
+    ATTRIBUTE_COLUMNS = (
+        'details_material',
+        'details_frame_material',
+        'details_mattress_type',
+        'details_upholstery',
+        'details_color',
+        'dimensions_width',
+        'dimensions_shape',
+        'dimensions_is_extendable',
+    )
+    updated_at = _change_time()
+    # Hash of the supplier feed row the item was last synced from, see catalog_import.sync_items; not mapped
+    content_hash = Column("content_hash", String, nullable=True)
+    __mapper_args__ = {'exclude_properties': [*ATTRIBUTE_COLUMNS, 'updated_at', 'content_hash']}
+
+    __table_args__ = (
+        # /items?category=...&max_price=...
+        Index("ix_furniture_category_price", "category", "price"),
+        # /items?sort=final_price, including keyset pages on (final_price, model_num)
+        Index("ix_furniture_final_price_model_num", "final_price", "model_num"),
+    )
+
+    # Fields added by the /items endpoint and the columns they are derived from, see fieldsets.py
+    COMPUTED_FIELDS = {'is_available': ('stock_quantity',)}
 
     def to_dict(self):
         result = Base.to_dict(self)
-        if self.discount > 0.0:
-            discount_price = self.price * (1 - self.discount / 100)
-            result['final_price'] = self.apply_tax(discount_price)
-        else:
-            result['final_price'] = self.apply_tax(self.price)
+        # Rows loaded with a subset of columns (see fieldsets.py) fall back to the stored final_price
+        if 'price' in result and 'discount' in result:
+            result['final_price'] = self.calculate_final_price()
 
         return result
 
+    def calculate_final_price(self) -> float:
+        """Return the price the customer pays, after discount and tax."""
+        return customer_price(self.price, self.discount)
+
     def apply_tax(self, final_price: float, tax_rate: float = 18) -> float:
         """Apply a tax rate to the price and return the new price."""
-        return round(final_price * (1 + tax_rate / 100), 1)
+        return apply_tax(final_price, tax_rate)
 
     @staticmethod
     def new(
@@ -84,6 +182,12 @@ class Furniture(Base):
         pass
 
 
+@event.listens_for(Furniture, "before_insert", propagate=True)
+@event.listens_for(Furniture, "before_update", propagate=True)
+def _sync_final_price(mapper, connection, target):
+    target.final_price = target.calculate_final_price()
+
+
 class Bed(Furniture):
     def post_init(self):
         self.category = "Bed"
@@ -217,9 +321,11 @@ class User(Base):  # TODO - make it fit to user
     user_full_name: Mapped[str] = mapped_column(String, nullable=True)
     user_phone_num: Mapped[str] = mapped_column(String, nullable=True)
     address: Mapped[str] = mapped_column(String, nullable=True)
-    email: Mapped[str] = mapped_column(String, nullable=True)
+    email: Mapped[str] = mapped_column(String, nullable=True, index=True)
     password: Mapped[str] = mapped_column(String, nullable=True)
     role: Mapped[str] = mapped_column(String, nullable=False, default="user")
+    updated_at = _change_time()
+    __mapper_args__ = {'exclude_properties': ['updated_at']}
 
     def to_dict(self):
         result = Base.to_dict(self)
@@ -246,6 +352,8 @@ class CartItem(Base):
     user_id: Mapped[int] = mapped_column(Integer)
     model_num: Mapped[dict] = mapped_column(String)
     quantity: Mapped[int] = mapped_column(Integer, nullable=True)
+    updated_at = _change_time()
+    __mapper_args__ = {'exclude_properties': ['updated_at']}
 
     __table_args__ = (PrimaryKeyConstraint("user_id", "model_num"),)
 
@@ -293,15 +401,41 @@ class Order(Base):
     items: Mapped[dict] = mapped_column(JSON, nullable=True)
     total_price: Mapped[float] = mapped_column(Float, nullable=True)
     status: Mapped[OrderStatus] = mapped_column(SQLAlchemyEnum(OrderStatus), nullable=False)
-    creation_time: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    creation_time: Mapped[datetime] = mapped_column(DateTime, nullable=True, index=True)
+    updated_at = _change_time()
+    __mapper_args__ = {'exclude_properties': ['updated_at']}
+
+    # Order listings filter by user or status and sort by creation_time; SQLite appends order_num (the rowid) to every index
+    __table_args__ = (
+        Index("ix_order_user_id_creation_time", "user_id", "creation_time"),
+        Index("ix_order_status_creation_time", "status", "creation_time"),
+    )
+
+    # The customer, for to_dict; there is no foreign key, so orders of deleted users keep their user_id
+    customer: Mapped["User"] = relationship(User, primaryjoin=lambda: foreign(Order.user_id) == User.user_id, viewonly=True)
+
+    # Fields added by to_dict and the columns they are derived from, see fieldsets.py
+    COMPUTED_FIELDS = {'phone_number': ('user_id',), 'user_name': ('user_id',), 'user_full_name': ('user_id',)}
+
+    @staticmethod
+    def with_customer():
+        """
+        A query option loading the customer fields of `to_dict` in the same query as the orders.
+
+        Without it every order serialized loads its customer with a query of its own.
+        """
+        return joinedload(Order.customer).load_only(User.user_name, User.user_full_name, User.user_phone_num)
 
     def to_dict(self):
         result = Base.to_dict(self)
-        customer = user.get_user_details(self.user_id)
-        result['phone_number'] = customer['user_phone_num']
-        result['user_name'] = customer['user_name']
-        result['user_full_name'] = customer['user_full_name']
-        result['status'] = self.status.name
+        # Summaries loaded without user_id (see fieldsets.py) skip the customer lookup
+        if 'user_id' in result:
+            customer = self.customer
+            result['phone_number'] = customer.user_phone_num if customer else None
+            result['user_name'] = customer.user_name if customer else None
+            result['user_full_name'] = customer.user_full_name if customer else None
+        if 'status' in result:
+            result['status'] = self.status.name
 
         return result
 
@@ -349,9 +483,10 @@ class Order(Base):
         if not self.items:
             return False, "Order must contain at least one item."
 
-        # Validate all items exist and have valid quantities
+        # Validate all items exist, with one query, and have valid quantities
+        existing = set(session().scalars(select(Furniture.model_num).where(Furniture.model_num.in_(list(self.items)))))
         for key, value in self.items.items():
-            if not cart.get_cart_item_full_details(key):
+            if key not in existing:
                 return False, f"Item with model_num {key} does not exist."
             if not isinstance(value, (int, float)) or value <= 0:
                 return False, f"Invalid quantity for item {key}. Quantity must be greater than zero."
@@ -359,18 +494,325 @@ class Order(Base):
         return True, None  # No errors
 
 
+class CatalogVersion(Base):
+    """
+    Counter the triggers `create` installs bump on every change to a furniture row, in the writer's transaction.
+
+    Lets a server notice catalog changes made by other processes (e.g. `python -m source.cli import-items`),
+    see `versions.catalog`. Holds a single row.
+    """
+
+    __tablename__ = "catalog_version"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+
 _engine = None
 _session_maker = None
+_read_engine = None
+_read_session_maker = None
+
+
+# Pragmas set on every new SQLite connection, per profile
+SQLITE_PROFILES = {
+    # SQLite's own defaults: rollback journal, an fsync on every commit, a 2 MiB page cache
+    'default': {},
+    'performance': {
+        # Readers work on a snapshot and never wait for a committing writer, nor it for them
+        'journal_mode': 'WAL',
+        # In WAL mode only a power loss, not a crash of the process, can lose the last commits
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        # Negative: in KiB, so 64 MiB
+        'cache_size': -64 * 1024,
+        # Milliseconds a writer waits for the write lock before failing with "database is locked"
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def _set_pragmas(dbapi_connection, connection_record, pragmas: dict) -> None:
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _sqlite_pragmas(sqlite_profile) -> dict:
+    pragmas = SQLITE_PROFILES[sqlite_profile] if isinstance(sqlite_profile, str) else sqlite_profile
+    for name, value in pragmas.items():
+        if name not in SQLITE_PROFILES['performance'] or not (isinstance(value, int) or str(value).isalnum()):
+            raise ValueError(f"Unsupported SQLite pragma: {name}={value}")
+    return pragmas
+
+
+def _create_engine(url: str, echo: bool, pragmas: dict):
+    engine = create_engine(url, echo=echo)
+    if engine.dialect.name == 'sqlite' and pragmas:
+        event.listen(engine, 'connect', functools.partial(_set_pragmas, pragmas=pragmas))
+    return engine
 
 
 # Database setup
-def create(database_url: str, echo: bool = True):
+def create(database_url: str, echo: bool = True, read_database_url: str = None, sqlite_profile='default'):
+    """
+    Opens the database, creating or upgrading its tables.
+
+    Args:
+        database_url (str): The database all writes go to.
+        echo (bool): Log every SQL statement.
+        read_database_url (str): Optional read replica for `read_session`, e.g. the same SQLite file
+            opened read-only (`sqlite:///file:default.db?mode=ro&uri=true`) or a periodically refreshed
+            copy. Without it, read sessions use the main database.
+        sqlite_profile: The name of one of `SQLITE_PROFILES`, or a dict of the same pragmas,
+            set on every connection to a SQLite database.
+
+    Raises:
+        KeyError: If the profile does not exist.
+        ValueError: If a pragma is not one of those of the 'performance' profile.
+    """
     global _engine
     global _session_maker
-    _engine = create_engine(database_url, echo=echo)
-    _session_maker = sessionmaker(bind=_engine)
+    global _read_engine
+    global _read_session_maker
+    pragmas = _sqlite_pragmas(sqlite_profile)
+    _engine = _create_engine(database_url, echo, pragmas)
+    _session_maker = sessionmaker(bind=_engine, class_=_Session)
     Base.metadata.create_all(_engine)
+    _upgrade(_engine)
+    _install_change_tracking(_engine)
+    _install_catalog_version(_engine)
+    search.install(_engine)
+    if read_database_url is None:
+        _read_engine = _engine
+    else:
+        if _engine.dialect.name == 'sqlite':
+            # In WAL mode SQLite readers work on a snapshot and never block a committing writer
+            with _engine.connect() as connection:
+                connection.exec_driver_sql("PRAGMA journal_mode=WAL")
+        # The journal mode belongs to the database file, and a read-only connection cannot set it
+        _read_engine = _create_engine(read_database_url, echo, {name: value for name, value in pragmas.items() if name != 'journal_mode'})
+    _read_session_maker = sessionmaker(bind=_read_engine)
+    catalog_cache.invalidate()  # a cached catalog belongs to the previous database
+    versions.reset()  # and so do the ETag version counters
+
+
+def _upgrade(engine):
+    """
+    Brings a database created by an older version of this schema up to date.
+
+    `create_all` skips tables that already exist, so columns and indexes added to the
+    models later are created here, and derived columns are backfilled.
+    """
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                    connection.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    s = _session_maker()
+    for item in s.query(Furniture).filter(Furniture.final_price.is_(None)):
+        item.final_price = item.calculate_final_price()
+    s.commit()
+    s.close()
+
+
+# strftime('%f') gives seconds with milliseconds, so the stamps sort as text
+_NOW = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+
+def change_time(moment: datetime = None) -> str:
+    """
+    Formats a time like the `updated_at` columns store it.
+
+    Args:
+        moment (datetime): The time; naive times are taken as UTC. Defaults to now.
+
+    Returns:
+        str: ISO 8601 UTC time with milliseconds, e.g. `2025-03-01T10:30:00.000Z`.
+    """
+    if moment is None:
+        moment = datetime.now(UTC)
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(UTC).replace(tzinfo=None)
+    return moment.isoformat(timespec='milliseconds') + 'Z'
+
+
+def _install_change_tracking(engine) -> None:
+    """
+    Creates the triggers that stamp `updated_at` on every insert and update, and stamps older rows.
+
+    Only SQLite databases get the triggers. An update that sets `updated_at` itself
+    (e.g. a replayed import) is left as it is.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if 'updated_at' not in table.c:
+                continue
+            name = preparer.format_table(table)
+            stamp = f"UPDATE {name} SET updated_at = {_NOW} WHERE rowid = new.rowid;"
+            connection.execute(
+                text(f"CREATE TRIGGER IF NOT EXISTS {table.name}_stamp_insert AFTER INSERT ON {name} WHEN new.updated_at IS NULL BEGIN {stamp} END")
+            )
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS {table.name}_stamp_update AFTER UPDATE ON {name} "
+                    f"WHEN new.updated_at IS old.updated_at BEGIN {stamp} END"
+                )
+            )
+            connection.execute(text(f"UPDATE {name} SET updated_at = {_NOW} WHERE updated_at IS NULL"))
+
+
+def _install_catalog_version(engine) -> None:
+    """
+    Creates the row of `CatalogVersion` and, on SQLite, the triggers that bump it on every furniture insert, update and delete.
+    """
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO catalog_version (id, version) SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM catalog_version)"))
+        if engine.dialect.name != 'sqlite':
+            return
+        for operation in ('INSERT', 'UPDATE', 'DELETE'):
+            connection.execute(
+                text(
+                    f"CREATE TRIGGER IF NOT EXISTS furniture_version_{operation.lower()} AFTER {operation} ON furniture "
+                    "BEGIN UPDATE catalog_version SET version = version + 1; END"
+                )
+            )
+
+
+def stored_catalog_version():
+    """
+    Reads the catalog version stored in the database, see `CatalogVersion`.
+
+    Returns:
+        int | None: The version, or None before `create` or on databases without the triggers.
+    """
+    if _engine is None or _engine.dialect.name != 'sqlite':
+        return None
+    with _engine.connect() as connection:
+        return connection.execute(select(CatalogVersion.version)).scalar()
+
+
+class _Session(Session):
+    def commit(self):
+        # Inside transaction() the controllers' commits only flush; the block commits once at its end
+        if self.info.get('transaction'):
+            self.flush()
+        else:
+            super().commit()
 
 
-def session():
+def new_session():
+    """
+    Returns a new session of its own.
+
+    For work that must neither see nor join the request's transaction: loading
+    the process-wide caches, batched imports, and responses streamed after the
+    view has returned. The caller closes it.
+    """
     return _session_maker()
+
+
+def session():
+    """
+    Returns the session of the current request, or a new session outside of requests.
+
+    All the controllers called during a request share one session, so a request
+    holds at most one connection; `install` closes the session when the request
+    ends, rolling back anything left uncommitted. Callers need not close it.
+    """
+    if not flask.has_app_context():
+        return _session_maker()
+    if 'db_session' not in flask.g:
+        flask.g.db_session = _session_maker()
+    return flask.g.db_session
+
+
+def _close_request_session(exception=None) -> None:
+    for key in ('db_session', 'db_read_session'):
+        s = flask.g.pop(key, None)
+        if s is not None:
+            s.close()
+
+
+def install(app: flask.Flask) -> None:
+    """
+    Closes the request's sessions, see `session` and `read_session`, at the end of every request of the app.
+
+    Args:
+        app (flask.Flask): The application.
+    """
+    app.teardown_appcontext(_close_request_session)
+
+
+@contextlib.contextmanager
+def transaction():
+    """
+    Makes everything the request's controllers write inside the block one transaction.
+
+    Their `commit()` calls only flush while the block runs; it is committed once
+    when the block ends, or rolled back as a whole if the block raises. Version
+    bumps and catalog cache invalidations issued inside run after that (see
+    `versions.after_commit`). Blocks nest; the outermost one commits.
+
+    Yields:
+        Session: The request's session.
+    """
+    s = session()
+    if s.info.get('transaction'):
+        yield s
+        return
+
+    s.info['transaction'] = True
+    flask.g.after_commit = []
+    try:
+        try:
+            yield s
+        finally:
+            del s.info['transaction']
+        s.commit()
+    except BaseException:
+        s.rollback()
+        raise
+    finally:
+        # Also after a rollback: work committed by other sessions inside the block must still be seen
+        for callback in flask.g.pop('after_commit'):
+            callback()
+
+
+def read_session():
+    """
+    Returns the request's session on the read replica, for listings and reports that never write.
+
+    Like `session`, it is shared by the request and closed when the request ends;
+    outside of requests it is a new session the caller closes. Reads through it may
+    lag behind the main database when the replica is a copy, so anything that must
+    see its own writes (or that feeds the catalog cache and ETags) uses `session()` instead.
+    """
+    if not flask.has_app_context():
+        return _read_session_maker()
+    if 'db_read_session' not in flask.g:
+        flask.g.db_read_session = _read_session_maker()
+    return flask.g.db_read_session
+
+
+def new_read_session():
+    """
+    Returns a new session of its own on the read replica, for responses streamed
+    after the view has returned and the request's sessions are closed. The caller closes it.
+    """
+    return _read_session_maker()
@@ -1,3 +1,104 @@
-def main() -> int:
-    print("hi, this is furniture")
+"""
+Command line tools for the furniture store.
+
+Run from the project root:
+    python -m source.cli export orders --format csv --since 2025-03-01 --output orders.csv
+    python -m source.cli import-items supplier_catalog.csv --workers 4
+    python -m source.cli sync-items supplier_feed.ndjson
+"""
+
+import argparse
+import sys
+import schema
+import source.controller.catalog_import as catalog_import
+import source.controller.export as export
+
+DEFAULT_DATABASE_URL = 'sqlite:///./default.db'
+
+
+def _export(args) -> int:
+    try:
+        since = export.parse_since(args.since) if args.since is not None else None
+    except ValueError:
+        print(f"Invalid value for --since: {args.since}", file=sys.stderr)
+        return 2
+
+    schema.create(args.database_url, echo=False, read_database_url=args.read_database_url, sqlite_profile=args.sqlite_profile)
+    output = open(args.output, 'w', newline='', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for chunk in export.export(args.dataset, args.format, since):
+            output.write(chunk)
+    finally:
+        if output is not sys.stdout:
+            output.close()
     return 0
+
+
+def _import_items(args) -> int:
+    file_format = args.format or ('csv' if args.file.lower().endswith('.csv') else 'ndjson')
+    schema.create(args.database_url, echo=False, sqlite_profile=args.sqlite_profile)
+    with open(args.file, newline='', encoding='utf-8') as lines:
+        report = catalog_import.import_items(lines, file_format, batch_size=args.batch_size, workers=args.workers)
+
+    for error in report['errors']:
+        print(f"line {error['line']}: {error['model_num']}: {error['error']}", file=sys.stderr)
+    print(f"{report['inserted']} of {report['total']} items imported, {report['error_count']} rejected")
+    return 1 if report['error_count'] else 0
+
+
+def _sync_items(args) -> int:
+    file_format = args.format or ('csv' if args.file.lower().endswith('.csv') else 'ndjson')
+    schema.create(args.database_url, echo=False, sqlite_profile=args.sqlite_profile)
+    with open(args.file, newline='', encoding='utf-8') as lines:
+        report = catalog_import.sync_items(lines, file_format, batch_size=args.batch_size, delete_missing=not args.keep_missing)
+
+    for error in report['errors']:
+        print(f"line {error['line']}: {error['model_num']}: {error['error']}", file=sys.stderr)
+    if report['deletes_skipped'] and not args.keep_missing:
+        print("some rows have no readable model number, so no items were deleted", file=sys.stderr)
+    print(
+        f"{report['total']} feed rows: {report['inserted']} inserted, {report['updated']} updated, "
+        f"{report['unchanged']} unchanged, {report['deleted']} deleted, {report['error_count']} rejected"
+    )
+    return 1 if report['error_count'] else 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m source.cli', description="Furniture store command line tools.")
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL, help=f"database to use (default: {DEFAULT_DATABASE_URL})")
+    parser.add_argument('--read-database-url', help="read replica to export from, see schema.create")
+    parser.add_argument(
+        '--sqlite-profile', choices=schema.SQLITE_PROFILES, default='default', help="SQLite pragmas to connect with, see schema.SQLITE_PROFILES"
+    )
+    commands = parser.add_subparsers(dest='command')
+
+    export_parser = commands.add_parser('export', help="write a table as NDJSON or CSV, in constant memory")
+    export_parser.add_argument('dataset', choices=export.DATASETS)
+    export_parser.add_argument('--format', choices=list(export.FORMATS), default='ndjson')
+    export_parser.add_argument('--since', help="only rows inserted or updated from this ISO 8601 time on (UTC unless given)")
+    export_parser.add_argument('--output', help="file to write (default: standard output)")
+    export_parser.set_defaults(handler=_export)
+
+    import_parser = commands.add_parser('import-items', help="add furniture items from an NDJSON or CSV file, reporting the rejected rows")
+    import_parser.add_argument('file')
+    import_parser.add_argument('--format', choices=catalog_import.FORMATS, help="default: from the file extension")
+    import_parser.add_argument('--batch-size', type=int, default=catalog_import.BATCH_SIZE, help="rows per validation chunk and transaction")
+    import_parser.add_argument('--workers', type=int, default=1, help="validation processes (default: 1)")
+    import_parser.set_defaults(handler=_import_items)
+
+    sync_parser = commands.add_parser('sync-items', help="bring the catalog in line with a full supplier feed, writing only what changed")
+    sync_parser.add_argument('file')
+    sync_parser.add_argument('--format', choices=catalog_import.FORMATS, help="default: from the file extension")
+    sync_parser.add_argument('--batch-size', type=int, default=catalog_import.BATCH_SIZE, help="rows per write transaction")
+    sync_parser.add_argument('--keep-missing', action='store_true', help="do not delete the items missing from the feed")
+    sync_parser.set_defaults(handler=_sync_items)
+
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 0
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
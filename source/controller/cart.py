@@ -1,6 +1,8 @@
 import http
 import schema
 import flask
+import source.controller.versions as versions
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 from collections import defaultdict
 
@@ -27,6 +29,7 @@ def add_cart_item(session: Session, item_data: dict):
         )
     session.add(cart)
     session.commit()
+    versions.bump_cart(cart.user_id)
 
 
 def get_cart_item_full_details(model_num):  # TODO: add integration tests
@@ -40,51 +43,102 @@ def get_cart_item_full_details(model_num):  # TODO: add integration tests
             model_num (str): The model number of the furniture item.
 
         Returns:
-            dict: Item details including the final price.
+            dict: Item details including the final price, or None if there is no such item.
         """
 
     s = schema.session()
-    query = s.query(schema.Furniture)
-    query = query.filter_by(model_num=model_num)
-    result = query.first()
-    if result.discount > 0.0:
-        discount_price = result.price * (1 - result.discount / 100)
-        final_price = result.apply_tax(discount_price)
-    else:
-        final_price = result.apply_tax(result.price)
+    result = s.get(schema.Furniture, model_num)
+    if result is None:
+        return None
 
     item = {result.model_num: result.to_dict()}
-    print(item)
-    item['final_price'] = final_price
+    item['final_price'] = result.calculate_final_price()
     return item
 
 
+def lines_query(session: Session):
+    """
+    Builds a query of cart lines joined with their catalog items, so a whole cart is read with one query.
+
+    Each row has the cart columns (`user_id`, `model_num`, `quantity`) and, computed by the
+    database from the stored `final_price`, the item's `model_name`, `price_per_unit` and the
+    line `price`, followed by its `stock_quantity`. Items no longer in the catalog have None for the four.
+
+    Args:
+        session (Session): The database session.
+
+    Returns:
+        Query: The unfiltered, unordered query.
+    """
+    CartItem, Furniture = schema.CartItem, schema.Furniture
+    return session.query(
+        CartItem.user_id,
+        CartItem.model_num,
+        CartItem.quantity,
+        Furniture.model_name,
+        Furniture.final_price.label('price_per_unit'),
+        (Furniture.final_price * CartItem.quantity).label('price'),
+        Furniture.stock_quantity,
+    ).outerjoin(Furniture, Furniture.model_num == CartItem.model_num)
+
+
+def line_dict(row, stock: bool = False) -> dict:
+    """
+    Serializes a row of `lines_query` like `CartItem.to_dict`, leaving out the catalog fields of items no longer sold.
+
+    With `stock`, the line keeps the item's `stock_quantity` (None for items no longer sold).
+    """
+    line = row._asdict()
+    if not stock:
+        del line['stock_quantity']
+    if line['model_name'] is None:
+        for key in ('model_name', 'price_per_unit', 'price'):
+            del line[key]
+    return line
+
+
+def get_carts(session: Session, user_id, model_num: str = None, stock: bool = False) -> dict:
+    """
+    Reads a user's cart lines and their total with one query.
+
+    Args:
+        session (Session): The database session.
+        user_id (int): The ID of the user.
+        model_num (str): Only this item of the cart, when given.
+        stock (bool): Keep each item's `stock_quantity` in its line, see `line_dict`.
+
+    Returns:
+        dict: The lines under 'carts', keyed by user ID (empty when the cart is), and 'total_price'.
+    """
+    query = lines_query(session).filter(schema.CartItem.user_id == user_id)
+    if model_num is not None:
+        query = query.filter(schema.CartItem.model_num == model_num)
+
+    cart_items = defaultdict(list)
+    total_price = 0
+    for row in query.order_by(schema.CartItem.user_id, schema.CartItem.model_num):
+        cart_items[row.user_id].append(line_dict(row, stock))
+        total_price += row.price or 0
+
+    return {'carts': dict(cart_items), 'total_price': total_price}
+
+
 def system_get_all_user_cart_items(user_id):
     """
         Retrieves all cart items for a given user.
 
-        Fetches all items in the user's cart, calculates the total price, and
+        Fetches all items in the user's cart, with their stock, calculates the total price, and
         returns the data in a structured format.
 
         Args:
             user_id (int): The ID of the user.
 
         Returns:
-            dict: A dictionary containing the user's cart items and the total price.
+            dict: A dictionary containing the user's cart items and the total price. Each item
+            has its `stock_quantity`, which is None when it is no longer in the catalog.
         """
 
-    s = schema.session()
-    query = s.query(schema.CartItem)
-    query = query.filter(schema.CartItem.user_id == user_id)
-    results = query.all()
-    total_price = 0
-    cart_items = defaultdict(list)  # Using defaultdict to store lists of items per user_id
-
-    for result in results:
-        cart_items[result.user_id].append(result.to_dict())  # Append instead of overwrite
-        total_price += result.to_dict()['price']  # Summing prices correctly
-
-    return {'carts': dict(cart_items), 'total_price': total_price}
+    return get_carts(schema.session(), user_id, stock=True)
 
 
 def get_cart_user_details(user_id):
@@ -131,10 +185,13 @@ def update_cart_item_quantity(session: Session, item_data: dict):
         if item:
             session.delete(item)
             session.commit()
+            versions.bump_cart(item_data["user_id"])
             return
 
     # Validate the new asked quantity is available in stock
     item_details = get_cart_item_full_details(item_data['model_num'])
+    if item_details is None:
+        flask.abort(http.HTTPStatus.NOT_FOUND, "Item is no longer available")
     if item_details[item_data['model_num']]['stock_quantity'] < item_data['quantity']:
         flask.abort(
             http.HTTPStatus.CONFLICT, f"Not enough stock available, stock quantity is {item_details[item_data['model_num']]['stock_quantity']}"
@@ -146,6 +203,7 @@ def update_cart_item_quantity(session: Session, item_data: dict):
     else:
         item.quantity = item_data["quantity"]
         session.commit()
+        versions.bump_cart(item_data["user_id"])
 
 
 def delete_cart_item(session: Session, item_data: dict):
@@ -162,3 +220,20 @@ def delete_cart_item(session: Session, item_data: dict):
     if item:
         session.delete(item)
         session.commit()
+        versions.bump_cart(item_data["user_id"])
+
+
+def delete_cart_items(session: Session, user_id, model_nums: list) -> None:
+    """
+        Removes several items from the user's cart with one DELETE statement.
+
+        Args:
+            session (Session): The database session.
+            user_id (int): The ID of the user.
+            model_nums (list): The model numbers of the items to remove.
+        """
+    if not model_nums:
+        return
+    session.execute(delete(schema.CartItem).where(schema.CartItem.user_id == user_id, schema.CartItem.model_num.in_(model_nums)))
+    session.commit()
+    versions.bump_cart(user_id)
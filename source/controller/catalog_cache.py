@@ -0,0 +1,188 @@
+import threading
+from sqlalchemy import literal_column, select
+import schema
+import source.controller.versions as versions
+
+
+class CatalogSnapshot:
+    """
+    Serialized copy of the whole furniture catalog.
+
+    Items are kept in table order, keyed by model number, with a secondary
+    index by category so the common `/items?category=` lookup does not scan
+    the whole catalog. `stored_version` is the database's catalog version the
+    items were read at (see `schema.CatalogVersion`).
+    """
+
+    def __init__(self, items: list, stored_version: int = None) -> None:
+        self.stored_version = stored_version
+        self.items = {item['model_num']: item for item in items}
+        self.by_category = {}
+        for item in self.items.values():
+            self.by_category.setdefault(item['category'], []).append(item)
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def invalidate() -> None:
+    """
+    Drops the cached catalog so the next read reloads it from the database.
+
+    Must be called after every committed change to a furniture row. Also bumps
+    the catalog version, so ETags issued for the old catalog stop matching.
+    Inside a `schema.transaction()` both wait for its commit.
+    """
+    versions.after_commit(_invalidate)
+
+
+def _invalidate() -> None:
+    global _snapshot
+    with _lock:
+        _snapshot = None
+    versions.bump_catalog()
+
+
+def _outdated(snapshot: CatalogSnapshot) -> bool:
+    # Another process changed the catalog since the snapshot was read (see versions.catalog)
+    stored = versions.stored_catalog()
+    return stored is not None and snapshot.stored_version is not None and stored > snapshot.stored_version
+
+
+def _current():
+    """Returns the loaded snapshot, or None when none is loaded or it is outdated."""
+    snapshot = _snapshot
+    if snapshot is None or _outdated(snapshot):
+        return None
+    return snapshot
+
+
+def get_snapshot() -> CatalogSnapshot:
+    """
+    Returns the cached catalog, loading it from the database on first use.
+
+    The load happens under the lock, so an `invalidate()` issued by a writer
+    while the catalog is being read waits for the load and then discards it.
+    A snapshot is also reloaded once another process changed the catalog.
+
+    Returns:
+        CatalogSnapshot: The current catalog snapshot.
+    """
+    global _snapshot
+    snapshot = _current()
+    if snapshot is not None:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _outdated(_snapshot):
+            s = schema.new_session()
+            try:
+                # Read in the same transaction as the items, so the version is exactly theirs
+                stored_version = s.scalar(select(schema.CatalogVersion.version))
+                _snapshot = CatalogSnapshot([result.to_dict() for result in s.query(schema.Furniture).all()], stored_version)
+            finally:
+                s.close()
+        return _snapshot
+
+
+def get_items(category: str = None, max_price: float = None, model_num: str = None, model_name: str = None) -> dict:
+    """
+    Filters the cached catalog the same way `GET /items` filters the furniture table.
+
+    The returned item dicts are shared with the cache and must not be modified.
+
+    Args:
+        category (str): Keep only items of this category.
+        max_price (float): Keep only items whose base price is below this value.
+        model_num (str): Keep only the item with this model number.
+        model_name (str): Keep only items with this model name.
+
+    Returns:
+        dict: Matching items keyed by model number, in table order.
+    """
+    snapshot = get_snapshot()
+
+    if model_num is not None:
+        candidates = [snapshot.items[model_num]] if model_num in snapshot.items else []
+    elif category is not None:
+        candidates = snapshot.by_category.get(category, [])
+    else:
+        candidates = snapshot.items.values()
+
+    items = {}
+    for item in candidates:
+        if category is not None and item['category'] != category:
+            continue
+        if max_price is not None and not item['price'] < max_price:
+            continue
+        if model_name is not None and item['model_name'] != model_name:
+            continue
+        items[item['model_num']] = item
+    return items
+
+
+def get_many(model_nums: list) -> dict:
+    """
+    Looks up several items by model number at once.
+
+    Answered from the snapshot when it is loaded; otherwise with a single `IN`
+    query, so a cold cache does not load the whole catalog for a few items.
+    The returned item dicts may be shared with the cache and must not be modified.
+
+    Args:
+        model_nums (list): The model numbers to look up, without duplicates.
+
+    Returns:
+        dict: The items found, keyed by model number, in the order of `model_nums`.
+    """
+    snapshot = _current()
+    if snapshot is not None:
+        found = snapshot.items
+    else:
+        s = schema.new_session()
+        try:
+            found = {result.model_num: result.to_dict() for result in s.query(schema.Furniture).filter(schema.Furniture.model_num.in_(model_nums))}
+        finally:
+            s.close()
+    return {model_num: found[model_num] for model_num in model_nums if model_num in found}
+
+
+def get_stock(model_nums: list = None, category: str = None) -> dict:
+    """
+    Returns the stock quantity of the given items, or of every item of a category.
+
+    Answered from the snapshot when it is loaded; otherwise with a query that
+    reads only the model number and stock columns.
+
+    Args:
+        model_nums (list): Keep only these model numbers (without duplicates).
+        category (str): Keep only items of this category.
+
+    Returns:
+        dict: Stock quantity keyed by model number, in the order of `model_nums`
+        if given, otherwise in table order.
+    """
+    snapshot = _current()
+    if snapshot is not None:
+        if model_nums is not None:
+            candidates = (snapshot.items[model_num] for model_num in model_nums if model_num in snapshot.items)
+        elif category is not None:
+            candidates = snapshot.by_category.get(category, [])
+        else:
+            candidates = snapshot.items.values()
+        return {item['model_num']: item['stock_quantity'] for item in candidates if category is None or item['category'] == category}
+
+    s = schema.new_session()
+    try:
+        query = s.query(schema.Furniture.model_num, schema.Furniture.stock_quantity)
+        if model_nums is not None:
+            query = query.filter(schema.Furniture.model_num.in_(model_nums))
+        if category is not None:
+            query = query.filter(schema.Furniture.category == category)
+        stock = dict(query.order_by(literal_column('furniture.rowid')).all())
+    finally:
+        s.close()
+    if model_nums is None:
+        return stock
+    return {model_num: stock[model_num] for model_num in model_nums if model_num in stock}
@@ -0,0 +1,428 @@
+import collections
+import csv
+import functools
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+import schema
+import source.controller.catalog_cache as catalog_cache
+
+FORMATS = ('ndjson', 'csv')
+
+# Rows validated and inserted together; each batch is one executemany in its own transaction
+BATCH_SIZE = 1000
+
+# The report lists at most this many errors; `error_count` has the full number
+MAX_REPORTED_ERRORS = 1000
+
+REQUIRED_FIELDS = ('model_num', 'model_name', 'price', 'dimensions', 'details', 'image_filename', 'discount', 'category')
+
+# The summary of a sync lists at most this many model numbers per kind of change
+MAX_REPORTED_CHANGES = 1000
+
+# How CSV cells are read; the JSON columns hold JSON text, like the CSV export writes them
+_CSV_TYPES = {'price': float, 'discount': float, 'stock_quantity': int, 'dimensions': json.loads, 'details': json.loads}
+
+
+def _ndjson_record(text: str) -> tuple:
+    try:
+        record = json.loads(text)
+    except ValueError:
+        return None, "Invalid JSON"
+    if not isinstance(record, dict):
+        return None, "Each line must be a JSON object"
+    return record, None
+
+
+def _csv_record(header: list, cells: list) -> tuple:
+    record = {}
+    # Empty cells count as missing; cells beyond the header are ignored
+    for key, value in zip(header, cells):
+        if value == '':
+            continue
+        try:
+            record[key] = _CSV_TYPES.get(key, str)(value)
+        except ValueError:
+            return None, f"Invalid value for '{key}': {value}"
+    return record, None
+
+
+def _feed_rows(lines, file_format: str):
+    """
+    Splits a feed into rows without parsing them yet.
+
+    Yields:
+        tuple: The row's line number, its text, and a function parsing it into (record, error).
+    """
+    if file_format == 'csv':
+        reader = csv.reader(lines)
+        header = next(reader, [])
+        for cells in reader:
+            if cells:
+                yield reader.line_num, '\x1f'.join(cells), functools.partial(_csv_record, header, cells)
+    else:
+        for line_number, line in enumerate(lines, 1):
+            text = line.strip()
+            if text:
+                yield line_number, text, functools.partial(_ndjson_record, text)
+
+
+def _parse(lines, file_format: str):
+    for line_number, _, parse in _feed_rows(lines, file_format):
+        record, error = parse()
+        yield line_number, record, error
+
+
+def validate(record: dict) -> tuple:
+    """
+    Validates one imported item with the same rules as `/admin/add_item`.
+
+    Args:
+        record (dict): The item fields, as for `furniture_inventory.add_item`.
+
+    Returns:
+        tuple: (row, None) with the furniture table row to insert, or (None, error message).
+    """
+    missing = [field for field in REQUIRED_FIELDS if record.get(field) is None]
+    if missing:
+        return None, f"Missing fields: {', '.join(missing)}"
+    if not isinstance(record['model_num'], str) or not record['model_num']:
+        return None, "model_num must be a non-empty string"
+    for field in ('price', 'discount'):
+        if isinstance(record[field], bool) or not isinstance(record[field], (int, float)) or record[field] < 0:
+            return None, f"{field} must be a non-negative number"
+    stock_quantity = record.get('stock_quantity', 0)
+    if isinstance(stock_quantity, bool) or not isinstance(stock_quantity, int) or stock_quantity < 0:
+        return None, "stock_quantity must be a non-negative integer"
+    if not isinstance(record['details'], dict) or not isinstance(record['dimensions'], dict):
+        return None, "details and dimensions must be objects"
+
+    try:
+        item = schema.Furniture.new(
+            model_num=record['model_num'],
+            model_name=record['model_name'],
+            description=record.get('description', ""),
+            price=record['price'],
+            dimensions=record['dimensions'],
+            stock_quantity=stock_quantity,
+            details=record['details'],
+            image_filename=record['image_filename'],
+            discount=record['discount'],
+            category=record['category'],
+        )
+    except KeyError:
+        return None, f"Unknown category: {record['category']}"
+
+    try:
+        valid = item.valid()
+    except (AttributeError, TypeError, ValueError):
+        valid = False
+    if not valid:
+        return None, f"Invalid {record['category']} details provided."
+
+    row = {
+        column: getattr(item, column)
+        for column in ('model_num', 'model_name', 'description', 'price', 'dimensions', 'details', 'category', 'image_filename', 'discount')
+    }
+    # Bulk inserts skip the ORM events, so the stored final price is computed here
+    return {**row, 'stock_quantity': stock_quantity, 'final_price': item.calculate_final_price()}, None
+
+
+def validate_chunk(chunk: list) -> list:
+    """
+    Validates a chunk of parsed rows; runs in a worker process when the import uses several.
+
+    Args:
+        chunk (list): (line number, record, parse error) triples.
+
+    Returns:
+        list: (line number, model number, row, error) for every input row.
+    """
+    results = []
+    for line_number, record, error in chunk:
+        model_num = record.get('model_num') if record else None
+        row = None
+        if error is None:
+            row, error = validate(record)
+        results.append((line_number, model_num, row, error))
+    return results
+
+
+def _chunks(rows, size: int):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validated(chunks, workers: int):
+    if workers <= 1:
+        yield from map(validate_chunk, chunks)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        # A few chunks in flight per worker keep the pool busy without reading the whole input ahead
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(executor.submit(validate_chunk, chunk))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _report_error(report: dict, line_number: int, model_num, error: str) -> None:
+    report['error_count'] += 1
+    if len(report['errors']) < MAX_REPORTED_ERRORS:
+        report['errors'].append({'line': line_number, 'model_num': model_num, 'error': error})
+
+
+def import_items(lines, file_format: str, batch_size: int = BATCH_SIZE, workers: int = 1) -> dict:
+    """
+    Imports furniture items from an NDJSON or CSV stream.
+
+    Rows are validated in chunks of `batch_size` (in `workers` processes when more
+    than one) and the valid rows of each chunk are inserted with one executemany,
+    in a transaction of their own. Invalid rows and model numbers that already
+    exist are reported and skipped; they never stop the import.
+
+    Args:
+        lines: Iterable of text lines: one JSON object per line, or CSV with a header row
+            (the columns of the CSV export; `dimensions` and `details` as JSON text).
+        file_format (str): One of `FORMATS`.
+        batch_size (int): Rows per validation chunk and insert transaction.
+        workers (int): Number of validation processes; 1 validates in this process.
+
+    Returns:
+        dict: `total` rows read, `inserted`, `error_count` and up to `MAX_REPORTED_ERRORS`
+        `errors`, each with the input `line`, the `model_num` (if known) and the `error`.
+    """
+    parsed = _parse(lines, file_format)
+    report = {'total': 0, 'inserted': 0, 'error_count': 0, 'errors': []}
+    seen = set()
+
+    s = schema.new_session()
+    try:
+        for results in _validated(_chunks(parsed, batch_size), workers):
+            report['total'] += len(results)
+            candidates = {}
+            for line_number, model_num, row, error in results:
+                if error is None and (model_num in seen or model_num in candidates):
+                    error = "Duplicate model_num in this import"
+                if error is not None:
+                    _report_error(report, line_number, model_num, error)
+                else:
+                    candidates[model_num] = (line_number, row)
+            seen.update(candidates)
+            if not candidates:
+                continue
+
+            existing = set(s.scalars(select(schema.Furniture.model_num).where(schema.Furniture.model_num.in_(list(candidates)))))
+            for model_num in existing:
+                _report_error(report, candidates.pop(model_num)[0], model_num, "Item already exists")
+            if not candidates:
+                continue
+
+            # Stamped here, so the insert trigger does not have to update every new row again
+            updated_at = schema.change_time()
+            try:
+                s.execute(insert(schema.Furniture.__table__), [{**row, 'updated_at': updated_at} for _, row in candidates.values()])
+                s.commit()
+                report['inserted'] += len(candidates)
+            except IntegrityError:
+                # Another writer added one of the items meanwhile; nothing of this batch was kept
+                s.rollback()
+                for model_num, (line_number, _) in candidates.items():
+                    _report_error(report, line_number, model_num, "Could not be inserted, retry the row")
+    finally:
+        s.close()
+        if report['inserted']:
+            catalog_cache.invalidate()
+
+    report['errors'].sort(key=lambda entry: entry['line'])
+    return report
+
+
+def content_hash(text: str) -> str:
+    """
+    Hashes a feed row as it was sent (an NDJSON line, or the cells of a CSV row).
+
+    The row is hashed before it is parsed, so an unchanged row is recognised
+    without parsing or validating it again. A feed that changes format or
+    formatting is simply synced in full once.
+
+    Returns:
+        str: Hex digest of the row.
+    """
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+# Columns a changed feed row overwrites; stock and discounts of existing items belong to the store
+SUPPLIER_COLUMNS = ('model_name', 'description', 'price', 'dimensions', 'details', 'category', 'image_filename', 'content_hash')
+
+
+def _insert(s, rows: list, updated_at) -> list:
+    try:
+        s.execute(insert(schema.Furniture.__table__), [{**row, 'updated_at': updated_at} for row in rows])
+        s.commit()
+        return rows
+    except IntegrityError:
+        # Another writer added one of the items meanwhile; insert the rows one by one to keep the others
+        s.rollback()
+    inserted = []
+    for row in rows:
+        try:
+            s.execute(insert(schema.Furniture.__table__), {**row, 'updated_at': updated_at})
+            s.commit()
+            inserted.append(row)
+        except IntegrityError:
+            s.rollback()
+    return inserted
+
+
+def _apply(s, inserts: list, updates: list) -> tuple:
+    """
+    Writes a batch of new and changed feed rows.
+
+    Changed rows only overwrite `SUPPLIER_COLUMNS`, and `stock_quantity` when the
+    feed row has it; the final price is recomputed with the item's own discount.
+
+    Returns:
+        tuple: The model numbers inserted and updated.
+    """
+    table = schema.Furniture.__table__
+    # Stamped here, so the change-tracking triggers do not have to update every written row again
+    updated_at = schema.change_time()
+    inserted = [row['model_num'] for row in _insert(s, inserts, updated_at)] if inserts else []
+    updated = []
+    if updates:
+        model_nums = [row['model_num'] for row in updates]
+        discounts = dict(s.execute(select(table.c.model_num, table.c.discount).where(table.c.model_num.in_(model_nums))).all())
+        # One executemany per set of columns, since every row of an executemany must bind the same ones
+        statements = collections.defaultdict(list)
+        for row in updates:
+            if row['model_num'] not in discounts:
+                # Deleted since the sync started; left to the next sync
+                continue
+            updated.append(row['model_num'])
+            values = {column: row[column] for column in SUPPLIER_COLUMNS}
+            if row['has_stock']:
+                values['stock_quantity'] = row['stock_quantity']
+            values['final_price'] = schema.customer_price(row['price'], discounts[row['model_num']])
+            statements[tuple(values)].append({**values, 'key': row['model_num'], 'updated_at': updated_at})
+        for parameters in statements.values():
+            s.execute(update(table).where(table.c.model_num == bindparam('key')), parameters)
+    s.commit()
+    return inserted, updated
+
+
+def _report_change(report: dict, kind: str, model_nums: list) -> None:
+    report[kind] += len(model_nums)
+    listed = report['changes'][kind]
+    listed.extend(model_nums[: MAX_REPORTED_CHANGES - len(listed)])
+
+
+def sync_items(lines, file_format: str, batch_size: int = BATCH_SIZE, delete_missing: bool = True) -> dict:
+    """
+    Brings the catalog in line with a full supplier feed, writing only what changed.
+
+    Every item keeps the content hash of the feed row it was last written from.
+    Feed rows whose hash is unchanged are skipped without even being parsed; new
+    and changed rows are checked like `import_items` and written in batches, and
+    items missing from the feed are deleted. The catalog cache is invalidated
+    only when something changed.
+
+    A changed row updates the supplier's columns (`SUPPLIER_COLUMNS`) of its
+    item; the stock is only replaced when the row has `stock_quantity`, and the
+    discount set in the store is kept. A new item added by another writer
+    meanwhile is reported like an invalid row.
+
+    Deletes are skipped when a feed row could not be read far enough to know
+    its model number, since that item would otherwise be deleted by mistake.
+    Invalid rows keep the item as it is.
+
+    Args:
+        lines: Iterable of text lines, as for `import_items`.
+        file_format (str): One of `FORMATS`.
+        batch_size (int): Rows per write transaction.
+        delete_missing (bool): Delete the items that are not in the feed.
+
+    Returns:
+        dict: The counts of `total` feed rows, `inserted`, `updated`, `unchanged` and `deleted`
+        items, up to `MAX_REPORTED_CHANGES` model numbers per kind of change in `changes`,
+        `deletes_skipped`, and the rejected rows as in `import_items`.
+    """
+    report = {
+        'total': 0,
+        'inserted': 0,
+        'updated': 0,
+        'unchanged': 0,
+        'deleted': 0,
+        'changes': {'inserted': [], 'updated': [], 'deleted': []},
+        'deletes_skipped': False,
+        'error_count': 0,
+        'errors': [],
+    }
+    seen = set()
+
+    s = schema.new_session()
+    try:
+        table = schema.Furniture.__table__
+        stored = dict(s.execute(select(table.c.model_num, table.c.content_hash)).all())
+        unchanged_rows = {digest: model_num for model_num, digest in stored.items() if digest is not None}
+
+        for chunk in _chunks(_feed_rows(lines, file_format), batch_size):
+            inserts, updates, line_numbers = [], [], {}
+            for line_number, text, parse in chunk:
+                report['total'] += 1
+                digest = content_hash(text)
+                model_num = unchanged_rows.get(digest)
+                if model_num is not None and model_num not in seen:
+                    seen.add(model_num)
+                    report['unchanged'] += 1
+                    continue
+
+                record, error = parse()
+                model_num = record.get('model_num') if record else None
+                if not isinstance(model_num, str):
+                    report['deletes_skipped'] = True
+                elif error is None and model_num in seen:
+                    error = "Duplicate model_num in this import"
+                else:
+                    seen.add(model_num)
+                if error is None:
+                    row, error = validate(record)
+                if error is not None:
+                    _report_error(report, line_number, model_num, error)
+                    continue
+                line_numbers[model_num] = line_number
+                if model_num in stored:
+                    updates.append({**row, 'content_hash': digest, 'has_stock': 'stock_quantity' in record})
+                else:
+                    inserts.append({**row, 'content_hash': digest})
+
+            inserted, updated = _apply(s, inserts, updates)
+            for model_num in {row['model_num'] for row in inserts}.difference(inserted):
+                # Another writer added the item meanwhile
+                _report_error(report, line_numbers[model_num], model_num, "Could not be inserted, retry the row")
+            _report_change(report, 'inserted', inserted)
+            _report_change(report, 'updated', updated)
+
+        if delete_missing and not report['deletes_skipped']:
+            missing = [model_num for model_num in stored if model_num not in seen]
+            for batch in _chunks(missing, batch_size):
+                s.execute(delete(table).where(table.c.model_num.in_(batch)))
+                s.commit()
+                _report_change(report, 'deleted', batch)
+    finally:
+        s.close()
+        if report['inserted'] or report['updated'] or report['deleted']:
+            catalog_cache.invalidate()
+
+    report['errors'].sort(key=lambda entry: entry['line'])
+    return report
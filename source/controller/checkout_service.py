@@ -25,6 +25,7 @@ class CheckoutService:
         self.user_control = user_controller  # Manages user-related operations.
         self.payment_strategy = payment_strategy  # Injected payment strategy
         self.cart = {}
+        self.stock = {}  # Stock of the cart's items, read with the cart
         self.user = None
         self.order_num = None
         self.total_price = 0
@@ -45,6 +46,7 @@ class CheckoutService:
             user_cart = cart_items['carts'].get(user_id, [])  # Get user cart safely
             for item in user_cart:  # Iterate through all cart items
                 self.cart[item['model_num']] = item['quantity']
+                self.stock[item['model_num']] = item['stock_quantity']
 
             # STEP 2: Validate the cart
             self.validate_cart(user_id)
@@ -67,8 +69,7 @@ class CheckoutService:
             self.update_inventory(self.cart)
 
             # STEP 8: Empty user cart
-            for key, value in self.cart.items():
-                self.delete_item_from_cart(key, user_id)
+            self.delete_items_from_cart(list(self.cart), user_id)
 
             return dict(status="success", order_id=self.order_id, message="Order placed successfully.")
 
@@ -80,22 +81,24 @@ class CheckoutService:
         Validates that the user's cart contains items and that they are in stock.
 
         Checks if the cart is empty and raises an error if so.
-        Ensures each item's requested quantity does not exceed available stock.
+        Ensures each item is still sold and its requested quantity does not exceed
+        available stock, using the stock read together with the cart.
 
         Args:
             user_id (int): The ID of the user.
 
         Raises:
-            HTTPException: If the cart is empty or if stock is insufficient for any item.
+            HTTPException: If the cart is empty, or if an item is no longer sold or its stock is insufficient.
         """
-        print("testing the cart", self.cart)  # debug
         if not self.cart or self.cart == {}:
             flask.abort(http.HTTPStatus.NOT_FOUND, f"Cart for user {user_id} is empty!")
 
         for model_num, asked_quantity in self.cart.items():
-            item_details = self.cart_control.get_cart_item_full_details(model_num)
-            if item_details[model_num]['stock_quantity'] < asked_quantity:
-                flask.abort(http.HTTPStatus.CONFLICT, f"Not enough stock available, stock quantity is {item_details[model_num]['stock_quantity']}")
+            stock_quantity = self.stock.get(model_num)
+            if stock_quantity is None:
+                flask.abort(http.HTTPStatus.CONFLICT, f"Item {model_num} is no longer available")
+            if stock_quantity < asked_quantity:
+                flask.abort(http.HTTPStatus.CONFLICT, f"Not enough stock available, stock quantity is {stock_quantity}")
 
     def validate_address(self, address: str) -> None:
         """
@@ -159,22 +162,20 @@ class CheckoutService:
 
     def update_inventory(self, cart: Any) -> None:
         """
-        Updates inventory stock based on the purchased cart items.
+        Updates inventory stock based on the purchased cart items, with one statement for the whole cart.
 
         Args:
             cart (Any): A dictionary mapping item model numbers to purchased quantities.
         """
-        for key, val in cart.items():
-            self.inventory_control.system_update_item_quantity(key, -val)
+        self.inventory_control.system_update_item_quantities({key: -val for key, val in cart.items()})
 
-    def delete_item_from_cart(self, item: str, user_id: int) -> None:
+    def delete_items_from_cart(self, items: list, user_id: int) -> None:
         """
-        Removes a specific item from the user's cart.
+        Removes the purchased items from the user's cart, with one statement.
 
         Args:
-            item (str): The model number of the item to remove.
+            items (list): The model numbers of the items to remove.
             user_id (int): The ID of the user.
         """
         s = schema.session()
-        item_data = {'user_id': user_id, 'model_num': item}
-        self.cart_control.delete_cart_item(s, item_data)
+        self.cart_control.delete_cart_items(s, user_id, items)
@@ -0,0 +1,112 @@
+import collections
+import functools
+import gzip
+import threading
+import zlib
+import flask
+import source.controller.versions as versions
+
+# Bodies smaller than this are sent as they are; gzip barely helps them and costs CPU on both ends
+DEFAULT_MIN_SIZE = 1024
+
+COMPRESS_LEVEL = 6
+
+# JSON responses and the NDJSON / CSV exports
+COMPRESSED_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv'}
+
+# Compressed bodies of ETag-tagged responses, most recently used last. A tag names one exact body
+# (see versions.etag), so an entry never goes stale; it is simply never asked for again.
+CACHE_SIZE = 64
+MAX_CACHED_BYTES = 4 * 1024 * 1024
+_cache = collections.OrderedDict()
+_lock = threading.Lock()
+
+
+def install(app: flask.Flask, min_size: int = DEFAULT_MIN_SIZE) -> None:
+    """
+    Compresses the app's JSON (and export) responses with gzip for clients that accept it.
+
+    Buffered bodies below `min_size` bytes are left alone; streamed bodies are
+    compressed as they are sent. The compressed bytes of responses that carry
+    an ETag are cached, so a repeated request for the same catalog data is not
+    compressed again.
+
+    Args:
+        app (flask.Flask): The application.
+        min_size (int): Smallest buffered body, in bytes, worth compressing.
+    """
+    app.after_request(functools.partial(_compress, min_size=min_size))
+
+
+def clear_cache() -> None:
+    """Drops all cached compressed bodies."""
+    with _lock:
+        _cache.clear()
+
+
+def _cached(tag: str) -> bytes | None:
+    with _lock:
+        body = _cache.get(tag)
+        if body is not None:
+            _cache.move_to_end(tag)
+        return body
+
+
+def _store(tag: str, body: bytes) -> None:
+    if len(body) > MAX_CACHED_BYTES:
+        return
+    with _lock:
+        _cache[tag] = body
+        _cache.move_to_end(tag)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _gzip_stream(chunks, tag: str | None):
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    parts = [] if tag else None
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            if parts is not None:
+                parts.append(data)
+            yield data
+    data = compressor.flush()
+    if parts is not None:
+        parts.append(data)
+        # Only a body that was sent to the end is complete enough to be served again
+        _store(tag, b''.join(parts))
+    yield data
+
+
+def _compress(response: flask.Response, min_size: int) -> flask.Response:
+    if response.mimetype not in COMPRESSED_MIMETYPES or response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    # The body depends on the request's Accept-Encoding, so caches must not serve it to other clients
+    response.vary.add('Accept-Encoding')
+    if not flask.request.accept_encodings['gzip']:
+        return response
+
+    tag, weak = response.get_etag()
+    tag = tag if tag and not weak else None
+    body = _cached(tag) if tag else None
+    if body is not None:
+        # The view's body is dropped unread; response.close() still releases it
+        response.set_data(body)
+    elif response.is_streamed:
+        response.response = _gzip_stream(response.iter_encoded(), tag)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        body = gzip.compress(data, COMPRESS_LEVEL, mtime=0)
+        if tag:
+            _store(tag, body)
+        response.set_data(body)
+
+    response.headers['Content-Encoding'] = 'gzip'
+    if tag:
+        # The gzip body is a different representation, so it gets its own strong tag
+        response.set_etag(tag + versions.GZIP_ETAG_SUFFIX)
+    return response
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import select
+import schema
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+
+# Rows fetched from the database at a time; memory use depends on this, not on the table size
+BATCH_SIZE = 1000
+
+
+DATASETS = ('furniture', 'orders', 'users', 'cart_items')
+
+
+def _columns(dataset: str) -> list:
+    if dataset == 'furniture':
+        return [column for column in schema.Furniture.__table__.c if column.key not in (*schema.Furniture.ATTRIBUTE_COLUMNS, 'content_hash')]
+    if dataset == 'orders':
+        return list(schema.Order.__table__.c)
+    if dataset == 'users':
+        # Password hashes never leave the database
+        return [column for column in schema.User.__table__.c if column.key != 'password']
+    return list(schema.CartItem.__table__.c)
+
+
+def _line_items(order: dict) -> list:
+    # One record per line item, so the export loads into a table without parsing JSON
+    items = order.pop('items') or {}
+    order['status'] = order['status'].name
+    order['creation_time'] = order['creation_time'].isoformat() if order['creation_time'] else None
+    return [{**order, 'model_num': model_num, 'quantity': quantity} for model_num, quantity in items.items()]
+
+
+def parse_since(value: str) -> str:
+    """
+    Turns a `since` argument into the format of the `updated_at` columns.
+
+    Args:
+        value (str): An ISO 8601 date or time; times without a timezone are taken as UTC.
+
+    Returns:
+        str: The time as stored in `updated_at`.
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 date or time.
+    """
+    return schema.change_time(datetime.fromisoformat(value))
+
+
+def fieldnames(dataset: str) -> list:
+    """Returns the field names of the records of a dataset, in CSV column order."""
+    names = [column.key for column in _columns(dataset)]
+    if dataset == 'orders':
+        names.remove('items')
+        names += ['model_num', 'quantity']
+    return names
+
+
+def records(dataset: str, since: str = None):
+    """
+    Reads the records of a dataset from the read replica, in batches of `BATCH_SIZE` rows.
+
+    Args:
+        dataset (str): One of `DATASETS`.
+        since (str): Only rows inserted or updated at or after this time, as returned by `parse_since`.
+
+    Yields:
+        dict: One record per row; one per line item for orders.
+    """
+    columns = _columns(dataset)
+    table = columns[0].table
+    # Primary key order, which is also the order of the table's index
+    query = select(*columns).order_by(*table.primary_key.columns)
+    if since is not None:
+        query = query.where(table.c.updated_at >= since)
+
+    s = schema.new_read_session()
+    try:
+        for row in s.execute(query.execution_options(yield_per=BATCH_SIZE)):
+            if dataset == 'orders':
+                yield from _line_items(row._asdict())
+            else:
+                yield row._asdict()
+    finally:
+        s.close()
+
+
+def _ndjson(dataset: str, since: str):
+    lines = []
+    for record in records(dataset, since):
+        lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        if len(lines) == BATCH_SIZE:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def _csv(dataset: str, since: str):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames(dataset), lineterminator='\n')
+    writer.writeheader()
+    for index, record in enumerate(records(dataset, since), 1):
+        # JSON columns (dimensions, details) go into one cell as JSON text
+        writer.writerow({key: json.dumps(value) if isinstance(value, (dict, list)) else value for key, value in record.items()})
+        if index % BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export(dataset: str, file_format: str, since: str = None):
+    """
+    Writes a dataset as NDJSON or CSV, piece by piece, in constant memory.
+
+    Args:
+        dataset (str): One of `DATASETS`.
+        file_format (str): One of `FORMATS`.
+        since (str): Only rows changed at or after this time, as returned by `parse_since`.
+            Deleted rows are not reported.
+
+    Returns:
+        Iterator[str]: The export, in chunks of about `BATCH_SIZE` records.
+    """
+    return (_csv if file_format == 'csv' else _ndjson)(dataset, since)
@@ -0,0 +1,87 @@
+import functools
+from collections import Counter
+from sqlalchemy import case, func
+import schema
+import source.controller.furniture_inventory as furniture_inventory
+import source.controller.versions as versions
+
+# Upper bounds of the final-price buckets; the last bucket is open-ended
+PRICE_BUCKETS = (100, 250, 500, 1000, 2500)
+
+FILTER_KEYS = ('category', 'max_price', 'model_num', 'model_name', 'min_final_price', 'max_final_price', 'attributes')
+
+
+def _bucket_labels() -> list:
+    bounds = (0,) + PRICE_BUCKETS
+    return [f"{low}-{high}" for low, high in zip(bounds, bounds[1:])] + [f"{PRICE_BUCKETS[-1]}+"]
+
+
+def _by_count(counter: Counter) -> dict:
+    return dict(sorted(counter.items(), key=lambda entry: (-entry[1], entry[0])))
+
+
+def get_facets(filters: dict) -> dict:
+    """
+    Returns the facet counts of the items matching the `/items` filters.
+
+    Results are cached per filter set until the next catalog write (the cache is
+    keyed by the catalog version).
+
+    Args:
+        filters (dict): The `/items` filters, see `furniture_inventory.filter_items`.
+
+    Returns:
+        dict: The number of matching items, counts per category, material, color,
+        upholstery and final-price bucket, and the final price range.
+    """
+    key = tuple(filters.get(name) for name in FILTER_KEYS)
+    return _cached_facets(versions.generation(), versions.catalog(), key)
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_facets(generation: str, catalog_version: int, key: tuple) -> dict:
+    return compute_facets(dict(zip(FILTER_KEYS, key)))
+
+
+def compute_facets(filters: dict) -> dict:
+    """
+    Computes the facet counts with a single aggregate query.
+
+    The database groups the matching items by every facet at once; the (few)
+    groups are then summed per facet, so the cost in Python does not grow with
+    the number of items.
+    """
+    Furniture = schema.Furniture
+    material = func.coalesce(Furniture.details['material'].as_string(), Furniture.details['frame_material'].as_string())
+    color = Furniture.details['color'].as_string()
+    upholstery = Furniture.details['upholstery'].as_string()
+    bucket = case(*((Furniture.final_price < bound, index) for index, bound in enumerate(PRICE_BUCKETS)), else_=len(PRICE_BUCKETS))
+    dimensions = (Furniture.category, material, color, upholstery, bucket)
+
+    s = schema.new_session()
+    try:
+        query = s.query(*dimensions, func.count(), func.min(Furniture.final_price), func.max(Furniture.final_price))
+        groups = furniture_inventory.filter_items(query, filters).group_by(*dimensions).all()
+    finally:
+        s.close()
+
+    counters = {name: Counter() for name in ('category', 'material', 'color', 'upholstery')}
+    buckets = [0] * (len(PRICE_BUCKETS) + 1)
+    total = 0
+    low = high = None
+    for group_category, group_material, group_color, group_upholstery, group_bucket, count, group_min, group_max in groups:
+        total += count
+        for name, value in zip(counters, (group_category, group_material, group_color, group_upholstery)):
+            if value is not None:
+                counters[name][value] += count
+        if group_bucket is not None and group_min is not None:
+            buckets[group_bucket] += count
+            low = group_min if low is None else min(low, group_min)
+            high = group_max if high is None else max(high, group_max)
+
+    return {
+        'total': total,
+        **{name: _by_count(counter) for name, counter in counters.items()},
+        'final_price_buckets': dict(zip(_bucket_labels(), buckets)),
+        'final_price': {'min': low, 'max': high},
+    }
@@ -0,0 +1,64 @@
+import http
+import flask
+from sqlalchemy import inspect
+from sqlalchemy.orm import load_only
+
+
+def requested_fields(model, computed: dict = None) -> set | None:
+    """
+    Parses the `fields` query parameter of a listing endpoint.
+
+    Args:
+        model: The mapped class being listed.
+        computed (dict): Fields that `to_dict` derives rather than reads from a column,
+            mapped to the column names they are derived from.
+
+    Returns:
+        set | None: The requested field names, or None when `fields` was not given.
+
+    Raises:
+        HTTPException: 400 if a requested field does not exist.
+    """
+    raw = flask.request.args.get('fields')
+    if raw is None:
+        return None
+
+    fields = {field.strip() for field in raw.split(',') if field.strip()}
+    known = {attribute.key for attribute in inspect(model).column_attrs} | set(computed or {})
+    unknown = fields - known
+    if not fields or unknown:
+        flask.abort(http.HTTPStatus.BAD_REQUEST, description=f"Invalid fields: {sorted(unknown)}. Must be from {sorted(known)}")
+    return fields
+
+
+def load_only_option(model, fields: set, computed: dict = None, extra_columns: tuple = ()):
+    """
+    Builds a `load_only` option that fetches only the columns needed for the requested fields.
+
+    Columns left out are never selected, so large JSON columns are neither read from
+    SQLite nor decoded. The primary key is always loaded.
+
+    Args:
+        model: The mapped class being listed.
+        fields (set): Requested field names, as returned by `requested_fields`.
+        computed (dict): Derived fields and the columns they need, see `requested_fields`.
+        extra_columns (tuple): Columns the endpoint itself needs, e.g. the pagination key.
+    """
+    computed = computed or {}
+    columns = {column.key for column in extra_columns}
+    for field in fields:
+        columns.update(computed.get(field, (field,)))
+    return load_only(*(getattr(model, column) for column in sorted(columns)))
+
+
+def project(result: dict, fields: set) -> dict:
+    """Keeps only the requested fields of a serialized row."""
+    return {key: value for key, value in result.items() if key in fields}
+
+
+def serialize(row, fields: set = None) -> dict:
+    """Serializes a row with `to_dict`, keeping only the requested fields when `fields` is given."""
+    result = row.to_dict()
+    if fields is None:
+        return result
+    return project(result, fields)
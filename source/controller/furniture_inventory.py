@@ -1,7 +1,11 @@
 import http
+import re
 import schema
 import flask
+from sqlalchemy import bindparam, select, true, update
 from sqlalchemy.orm import Session
+from werkzeug.datastructures import MultiDict
+import source.controller.catalog_cache as catalog_cache
 
 
 # TODO- Add functionality to check if the model number already exists. If it does, update only the quantity.
@@ -33,6 +37,7 @@ def add_item(session: Session, item_data: dict) -> None:
 
     session.add(item)
     session.commit()
+    catalog_cache.invalidate()
 
 
 def update_item_quantity(session: Session, data) -> None:
@@ -47,6 +52,7 @@ def update_item_quantity(session: Session, data) -> None:
     if item:
         item.stock_quantity = data["stock_quantity"]
         session.commit()
+        catalog_cache.invalidate()
 
 
 def system_update_item_quantity(model_num: str, quantity_to_add: int) -> None:
@@ -61,7 +67,28 @@ def system_update_item_quantity(model_num: str, quantity_to_add: int) -> None:
     item = s.get(schema.Furniture, model_num)
     if item:
         item.stock_quantity += quantity_to_add
+        s.commit()
+        catalog_cache.invalidate()
+
+
+def system_update_item_quantities(quantities_to_add: dict) -> None:
+    """
+    Adjusts the stock quantities of many furniture items with one executemany UPDATE.
+
+    The change is applied in SQL (`stock_quantity + ?`), so no item is read first.
+
+    Args:
+        quantities_to_add (dict): The amount to add (or subtract if negative) to each model number.
+    """
+    if not quantities_to_add:
+        return
+    s = schema.session()
+    table = schema.Furniture.__table__
+    stamp = schema.change_time()
+    statement = update(table).where(table.c.model_num == bindparam('key')).values(stock_quantity=table.c.stock_quantity + bindparam('delta'))
+    s.execute(statement, [{'key': model_num, 'delta': delta, 'updated_at': stamp} for model_num, delta in quantities_to_add.items()])
     s.commit()
+    catalog_cache.invalidate()
 
 
 def delete_item(session: Session, model_num: str):
@@ -76,9 +103,274 @@ def delete_item(session: Session, model_num: str):
     if item:
         session.delete(item)
         session.commit()
+        catalog_cache.invalidate()
+
 
-def update_item_discount(session: Session, data): 
+def update_item_discount(session: Session, data):
+    """
+    Updates the discount percentage of a furniture item.
+
+    Args:
+        session (Session): The database session.
+        data (dict): A dictionary containing 'model_num' and the new 'discount'.
+    """
     item = session.get(schema.Furniture, data["model_num"])
     if item:
         item.discount = data["discount"]
-        session.commit()   
+        session.commit()
+        catalog_cache.invalidate()
+
+
+def _set_discounts(session: Session, items: list) -> int:
+    table = schema.Furniture.__table__
+    stamp = schema.change_time()
+    # The final price is computed from the price just read, so a row whose price changed since is left alone
+    statement = update(table).where(table.c.model_num == bindparam('key'), table.c.price == bindparam('old_price'))
+    result = session.execute(
+        statement,
+        [
+            {'key': model_num, 'old_price': price, 'discount': discount, 'final_price': schema.customer_price(price, discount), 'updated_at': stamp}
+            for model_num, price, discount in items
+        ],
+    )
+    session.commit()
+    catalog_cache.invalidate()
+    return result.rowcount
+
+
+def update_item_discounts(session: Session, discounts: dict) -> dict:
+    """
+    Updates the discount percentages of many furniture items in one transaction.
+
+    The prices are read with one query and the new discounts and final prices
+    written with one executemany UPDATE, instead of a load and a commit per item.
+
+    Args:
+        session (Session): The database session.
+        discounts (dict): The new discount of each model number.
+
+    Returns:
+        dict: The number of items `updated` and the `missing` model numbers.
+    """
+    table = schema.Furniture.__table__
+    prices = dict(session.execute(select(table.c.model_num, table.c.price).where(table.c.model_num.in_(list(discounts)))).all())
+    items = [(model_num, prices[model_num], discount) for model_num, discount in discounts.items() if model_num in prices]
+    updated = _set_discounts(session, items) if items else 0
+    return {'updated': updated, 'missing': [model_num for model_num in discounts if model_num not in prices]}
+
+
+def update_selection_discount(session: Session, selection: dict, discount: float) -> dict:
+    """
+    Sets the same discount on every furniture item of a selection, in one transaction.
+
+    Args:
+        session (Session): The database session.
+        selection (dict): The items, see `selection_condition`.
+        discount (float): The new discount percentage.
+
+    Returns:
+        dict: The number of items `updated`, and an empty `missing` list.
+    """
+    table = schema.Furniture.__table__
+    items = [
+        (model_num, price, discount)
+        for model_num, price in session.execute(select(table.c.model_num, table.c.price).where(selection_condition(selection)))
+    ]
+    return {'updated': _set_discounts(session, items) if items else 0, 'missing': []}
+
+
+def update_item_quantities(session: Session, quantities: dict) -> dict:
+    """
+    Updates the stock quantities of many furniture items with one executemany UPDATE in one transaction.
+
+    Args:
+        session (Session): The database session.
+        quantities (dict): The new stock quantity of each model number.
+
+    Returns:
+        dict: The number of items `updated` and the `missing` model numbers.
+    """
+    table = schema.Furniture.__table__
+    existing = set(session.scalars(select(table.c.model_num).where(table.c.model_num.in_(list(quantities)))))
+    stamp = schema.change_time()
+    rows = [
+        {'key': model_num, 'stock_quantity': quantity, 'updated_at': stamp} for model_num, quantity in quantities.items() if model_num in existing
+    ]
+    if rows:
+        session.execute(update(table).where(table.c.model_num == bindparam('key')), rows)
+        session.commit()
+        catalog_cache.invalidate()
+    return {'updated': len(rows), 'missing': [model_num for model_num in quantities if model_num not in existing]}
+
+
+def update_selection_quantity(session: Session, selection: dict, quantity: int) -> dict:
+    """
+    Sets the same stock quantity on every furniture item of a selection, with one UPDATE statement.
+
+    Args:
+        session (Session): The database session.
+        selection (dict): The items, see `selection_condition`.
+        quantity (int): The new stock quantity.
+
+    Returns:
+        dict: The number of items `updated`, and an empty `missing` list.
+    """
+    table = schema.Furniture.__table__
+    statement = update(table).where(selection_condition(selection)).values(stock_quantity=quantity, updated_at=schema.change_time())
+    updated = session.execute(statement).rowcount
+    session.commit()
+    if updated:
+        catalog_cache.invalidate()
+    return {'updated': updated, 'missing': []}
+
+
+# Orderings accepted by `GET /items?sort=`: key columns and direction. model_num breaks ties so the order is total
+ITEM_SORTS = {
+    'model_num': ((schema.Furniture.model_num,), False),
+    'final_price': ((schema.Furniture.final_price, schema.Furniture.model_num), False),
+    '-final_price': ((schema.Furniture.final_price, schema.Furniture.model_num), True),
+}
+
+
+# `details.<key>=value`, `dimensions.<key>_min=number`, `dimensions.<key>_max=number`, ...
+_ATTRIBUTE_ARG = re.compile(r'(details|dimensions)\.(\w+?)(?:_(min|max))?')
+
+
+def _attribute_value(name: str, value: str, numeric: bool):
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    try:
+        return float(value)
+    except ValueError:
+        if numeric:
+            flask.abort(http.HTTPStatus.BAD_REQUEST, description=f"Invalid value for '{name}': {value}, a number is required")
+        return value
+
+
+def attribute_filters(args) -> tuple:
+    """
+    Parses the `details.<key>` and `dimensions.<key>` filters of an `/items` request.
+
+    `<key>=value` matches items whose attribute equals the value (case-insensitive for text,
+    `true` / `false` for flags); `<key>_min` and `<key>_max` bound numeric attributes.
+
+    Args:
+        args: The request query parameters.
+
+    Returns:
+        tuple: (source, key, bound, value) tuples, where source is 'details' or 'dimensions'
+        and bound is 'min', 'max' or None for equality.
+
+    Raises:
+        HTTPException: 400 if a bound is not a number.
+    """
+    filters = []
+    for name, value in args.items(multi=True):
+        match = _ATTRIBUTE_ARG.fullmatch(name)
+        if match:
+            source, key, bound = match.groups()
+            filters.append((source, key, bound, _attribute_value(name, value, numeric=bound is not None)))
+    return tuple(filters)
+
+
+def _attribute_condition(source: str, key: str, bound: str, value):
+    """Builds the SQL condition of one attribute filter, on the indexed virtual column when there is one."""
+    name = f"{source}_{key}"
+    if name in schema.Furniture.ATTRIBUTE_COLUMNS:
+        column = getattr(schema.Furniture, name)
+    else:
+        # Any other key is read with json_extract; slower, but every attribute can be filtered on
+        element = getattr(schema.Furniture, source)[key]
+        if isinstance(value, bool):
+            column = element.as_boolean()
+        elif isinstance(value, float):
+            column = element.as_float()
+        else:
+            column = element.as_string().collate('NOCASE')
+
+    if bound == 'min':
+        return column >= value
+    if bound == 'max':
+        return column <= value
+    return column == value
+
+
+def filter_items(query, filters: dict):
+    """
+    Applies the `/items` filters to a furniture query.
+
+    Args:
+        query: A query over schema.Furniture.
+        filters (dict): Any of 'category', 'max_price', 'model_num', 'model_name',
+            'min_final_price', 'max_final_price' and 'attributes' (see `attribute_filters`).
+            Missing or None values are ignored.
+
+    Returns:
+        The filtered query.
+    """
+    if filters.get('category') is not None:
+        query = query.filter(schema.Furniture.category == filters['category'])
+    if filters.get('max_price') is not None:
+        query = query.filter(schema.Furniture.price < filters['max_price'])
+    if filters.get('model_num') is not None:
+        query = query.filter(schema.Furniture.model_num == filters['model_num'])
+    if filters.get('model_name') is not None:
+        query = query.filter(schema.Furniture.model_name == filters['model_name'])
+    if filters.get('min_final_price') is not None:
+        query = query.filter(schema.Furniture.final_price >= filters['min_final_price'])
+    if filters.get('max_final_price') is not None:
+        query = query.filter(schema.Furniture.final_price <= filters['max_final_price'])
+    for attribute in filters.get('attributes') or ():
+        query = query.filter(_attribute_condition(*attribute))
+    return query
+
+
+# The fields that select the items of a bulk update or a pricing rule: the `/items` filters,
+# a list of 'model_nums', and `/items` attribute filters under 'attributes'
+_SELECTION_FILTERS = ('category', 'model_name', 'max_price', 'min_final_price', 'max_final_price')
+SELECTION_FIELDS = (*_SELECTION_FILTERS, 'model_nums', 'attributes')
+
+
+def selection_condition(selection: dict):
+    """
+    Turns a selection of furniture items into a SQL condition.
+
+    Args:
+        selection (dict): Any of `SELECTION_FIELDS`. 'attributes' takes the `/items` query
+            parameter syntax, e.g. `{"details.material": "fabric", "dimensions.width_max": 100}`.
+            An empty selection selects every item.
+
+    Returns:
+        The condition, on the furniture table.
+
+    Raises:
+        ValueError: If the selection is malformed.
+    """
+    if not isinstance(selection, dict):
+        raise ValueError("The selection must be an object")
+    unknown = set(selection) - set(SELECTION_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown selection fields: {', '.join(sorted(unknown))}")
+
+    filters = {key: selection[key] for key in _SELECTION_FILTERS if selection.get(key) is not None}
+    for key, value in filters.items():
+        if key in ('category', 'model_name'):
+            if not isinstance(value, str):
+                raise ValueError(f"'{key}' must be a string")
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f"'{key}' must be a number")
+    attributes = selection.get('attributes') or {}
+    if not isinstance(attributes, dict):
+        raise ValueError("'attributes' must be an object of /items attribute filters")
+    filters['attributes'] = attribute_filters(MultiDict({name: str(value) for name, value in attributes.items()}))
+    if len(filters['attributes']) != len(attributes):
+        raise ValueError("Attribute filters must look like 'details.<key>' or 'dimensions.<key>_min'")
+
+    condition = filter_items(select(schema.Furniture.model_num), filters).whereclause
+    model_nums = selection.get('model_nums')
+    if model_nums is not None:
+        if not isinstance(model_nums, list) or not all(isinstance(model_num, str) for model_num in model_nums):
+            raise ValueError("'model_nums' must be a list of model numbers")
+        in_list = schema.Furniture.model_num.in_(model_nums)
+        condition = in_list if condition is None else condition & in_list
+    return true() if condition is None else condition
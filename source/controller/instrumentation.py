@@ -0,0 +1,172 @@
+import collections
+import heapq
+import threading
+import time
+import flask
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# The same statement run this many times in one request is reported as an N+1 pattern
+REPEAT_THRESHOLD = 5
+
+# Slowest statements kept per request and for the whole process
+SLOWEST = 5
+
+# Statement text is cut to this many characters in headers and reports
+MAX_STATEMENT_LENGTH = 200
+
+_lock = threading.Lock()
+_endpoints = {}
+_repeated = collections.Counter()
+_slowest = []
+_listening = False
+
+
+class RequestStats:
+    """The statements run for one request: how many, for how long, the slowest ones and how often each ran."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest = []
+        self.repeats = collections.Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.seconds += seconds
+        self.repeats[statement] += 1
+        entry = (seconds, statement)
+        if len(self.slowest) < SLOWEST:
+            heapq.heappush(self.slowest, entry)
+        elif entry > self.slowest[0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def n_plus_one(self) -> dict:
+        """Returns the statements run at least `REPEAT_THRESHOLD` times, with their counts."""
+        return {statement: count for statement, count in self.repeats.most_common() if count >= REPEAT_THRESHOLD}
+
+
+def _shorten(statement: str) -> str:
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= MAX_STATEMENT_LENGTH else statement[: MAX_STATEMENT_LENGTH - 3] + '...'
+
+
+def _before_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_execute(connection, cursor, statement, parameters, context, executemany):
+    started = connection.info['query_started'].pop()
+    # Statements run outside a request (startup, streamed bodies, the CLI) are not attributed to one
+    stats = flask.g.get('sql_stats') if flask.has_app_context() else None
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def _on_error(context) -> None:
+    # A failed statement never reaches after_cursor_execute
+    if context.connection is not None and context.connection.info.get('query_started'):
+        context.connection.info['query_started'].pop()
+
+
+def _start_request() -> None:
+    flask.g.sql_stats = RequestStats()
+
+
+def _finish_request(response: flask.Response, debug_headers: bool) -> flask.Response:
+    stats = flask.g.pop('sql_stats', None)
+    if stats is None:
+        return response
+    repeated = stats.n_plus_one()
+    _aggregate(f"{flask.request.method} {flask.request.url_rule.rule if flask.request.url_rule else '<unmatched>'}", stats, repeated)
+
+    if debug_headers:
+        response.headers['X-SQL-Count'] = str(stats.count)
+        response.headers['X-SQL-Time-Ms'] = f"{stats.seconds * 1000:.2f}"
+        if repeated:
+            statement, count = next(iter(repeated.items()))
+            response.headers['X-SQL-N-Plus-One'] = f"{count}x {_shorten(statement)}"
+    return response
+
+
+def _aggregate(endpoint: str, stats: RequestStats, repeated: dict) -> None:
+    with _lock:
+        totals = _endpoints.setdefault(endpoint, {'requests': 0, 'statements': 0, 'seconds': 0.0, 'max_statements': 0, 'n_plus_one_requests': 0})
+        totals['requests'] += 1
+        totals['statements'] += stats.count
+        totals['seconds'] += stats.seconds
+        totals['max_statements'] = max(totals['max_statements'], stats.count)
+        if repeated:
+            totals['n_plus_one_requests'] += 1
+            for statement, count in repeated.items():
+                _repeated[(endpoint, _shorten(statement))] += count
+        for seconds, statement in stats.slowest:
+            entry = (seconds, endpoint, _shorten(statement))
+            if len(_slowest) < SLOWEST:
+                heapq.heappush(_slowest, entry)
+            elif entry > _slowest[0]:
+                heapq.heapreplace(_slowest, entry)
+
+
+def install(app: flask.Flask, debug_headers: bool = False) -> None:
+    """
+    Records the SQL statements run by each request of the app.
+
+    Statement count and database time are aggregated per endpoint (see `metrics`),
+    and a statement run `REPEAT_THRESHOLD` times or more in one request is counted
+    as an N+1 pattern. With `debug_headers` (or in debug mode) every response also
+    carries `X-SQL-Count`, `X-SQL-Time-Ms` and, for an N+1 pattern, `X-SQL-N-Plus-One`.
+    Statements run while a streamed body is sent come after the headers and are not counted.
+
+    Args:
+        app (flask.Flask): The application.
+        debug_headers (bool): Add the statistics headers to every response.
+    """
+    global _listening
+    with _lock:
+        # Listening on the Engine class covers the main and read replica engines, and those of a later schema.create
+        if not _listening:
+            event.listen(Engine, 'before_cursor_execute', _before_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_execute)
+            event.listen(Engine, 'handle_error', _on_error)
+            _listening = True
+    app.before_request(_start_request)
+    app.after_request(lambda response: _finish_request(response, debug_headers or app.debug))
+
+
+def metrics() -> dict:
+    """
+    Returns the SQL statistics gathered since the process started (or since `reset`).
+
+    Returns:
+        dict: Per endpoint, the number of `requests`, `statements` and `db_time_ms`, the mean
+        and max statements per request and the number of requests with an N+1 pattern; the
+        most `repeated` statements (total runs in N+1 patterns, per endpoint); and the
+        `slowest` single statements.
+    """
+    with _lock:
+        endpoints = {
+            endpoint: {
+                'requests': totals['requests'],
+                'statements': totals['statements'],
+                'db_time_ms': round(totals['seconds'] * 1000, 2),
+                'mean_statements': round(totals['statements'] / totals['requests'], 2),
+                'max_statements': totals['max_statements'],
+                'n_plus_one_requests': totals['n_plus_one_requests'],
+            }
+            for endpoint, totals in sorted(_endpoints.items(), key=lambda entry: -entry[1]['seconds'])
+        }
+        repeated = [{'endpoint': endpoint, 'statement': statement, 'count': count} for (endpoint, statement), count in _repeated.most_common(10)]
+        slowest = [
+            {'endpoint': endpoint, 'statement': statement, 'time_ms': round(seconds * 1000, 2)}
+            for seconds, endpoint, statement in sorted(_slowest, reverse=True)
+        ]
+    return {'endpoints': endpoints, 'repeated': repeated, 'slowest': slowest}
+
+
+def reset() -> None:
+    """Drops the gathered statistics."""
+    with _lock:
+        _endpoints.clear()
+        _repeated.clear()
+        _slowest.clear()
@@ -1,6 +1,7 @@
 import http
 import schema
 import flask
+import source.controller.versions as versions
 from sqlalchemy.orm import Session
 from source.models.OrderStatus import OrderStatus
 from source.controller.furniture_inventory import system_update_item_quantity
@@ -43,6 +44,7 @@ def add_order(session: Session, item_data: dict):
 
     session.add(order)
     session.commit()
+    versions.bump_orders(order.user_id)
     return order.order_num
 
 
@@ -74,6 +76,7 @@ def update_order_status(session: Session, item_data: dict):
 
     order.status = new_status  # Store the Enum instance
     session.commit()
+    versions.bump_orders(order.user_id)
 
     if new_status == OrderStatus.CANCELLED:
         for key, value in order.items:
@@ -0,0 +1,149 @@
+import base64
+import binascii
+import http
+import json
+import flask
+from datetime import datetime
+from sqlalchemy import bindparam, tuple_
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'datetime': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value['datetime'])
+    return value
+
+
+def encode_cursor(ordering: str, values: list) -> str:
+    """
+    Builds the opaque cursor pointing just after a row.
+
+    Args:
+        ordering (str): Name of the ordering the page was produced with.
+        values (list): The row's values for the ordering's key columns.
+
+    Returns:
+        str: URL-safe cursor string.
+    """
+    payload = json.dumps({'o': ordering, 'k': [_encode_value(value) for value in values]}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def column_types(columns: tuple) -> tuple:
+    """Returns, per key column, the Python types its cursor value may have, for `decode_cursor`."""
+    types = []
+    for column in columns:
+        python_type = column.type.python_type
+        accepted = (python_type, int) if python_type is float else (python_type,)
+        types.append(accepted + (type(None),) if column.expression.nullable else accepted)
+    return tuple(types)
+
+
+def _valid_value(value, types: tuple) -> bool:
+    # bool is an int to isinstance, but never a valid key value
+    return isinstance(value, types) and (bool in types or not isinstance(value, bool))
+
+
+def decode_cursor(cursor: str, ordering: str, types: tuple) -> list:
+    """
+    Parses a cursor produced by `encode_cursor`.
+
+    Args:
+        cursor (str): The cursor.
+        ordering (str): Name of the ordering the cursor must have been produced with.
+        types (tuple): Per key value, a type or tuple of types it must have, see `column_types`.
+
+    Raises:
+        HTTPException: 400 if the cursor is malformed, holds values of the wrong type or was produced for a different ordering.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        values = [_decode_value(value) for value in payload['k']]
+        valid = payload['o'] == ordering and len(values) == len(types)
+        valid = valid and all(
+            _valid_value(value, value_types if isinstance(value_types, tuple) else (value_types,)) for value, value_types in zip(values, types)
+        )
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        valid = False
+
+    if not valid:
+        flask.abort(http.HTTPStatus.BAD_REQUEST, description="Invalid cursor")
+    return values
+
+
+def ordered(query, columns: tuple, descending: bool = False):
+    """Orders a query by the given key columns, all in the same direction."""
+    return query.order_by(*(column.desc() if descending else column for column in columns))
+
+
+def _after(columns: tuple, values: list, descending: bool):
+    key = tuple_(*columns)
+    after = tuple_(*(bindparam(None, value, type_=column.type) for column, value in zip(columns, values)))
+    return key < after if descending else key > after
+
+
+def _parts(query, columns: tuple, descending: bool, values: list = None) -> list:
+    # Rows whose first key is NULL sort first (SQLite's NULL order, last when descending) and never
+    # compare with a row value, so they are read as a part of their own, ordered by the other keys
+    first = columns[0]
+    if not first.expression.nullable:
+        return [query if values is None else query.filter(_after(columns, values, descending))]
+
+    not_null, null = query.filter(first.is_not(None)), query.filter(first.is_(None))
+    if values is not None and values[0] is None:
+        null = null.filter(_after(columns[1:], values[1:], descending))
+        return [null] if descending else [null, not_null]
+    if values is not None:
+        not_null = query.filter(_after(columns, values, descending))
+        return [not_null, null] if descending else [not_null]
+    return [not_null, null] if descending else [null, not_null]
+
+
+def paginate(query, ordering: str, columns: tuple, descending: bool, limit: int, cursor: str = None):
+    """
+    Returns one page of a query using keyset pagination.
+
+    Instead of OFFSET, the page starts right after the row the cursor points to
+    (`WHERE (key columns) > (cursor values)`), so with an index on the key
+    columns every page costs the same as the first one. When the first key column
+    is nullable, rows where it is NULL are paged after the others (before them in
+    ascending order), which may take a second query for the page that crosses over.
+
+    Args:
+        query: The filtered query.
+        ordering (str): Name of the ordering, stored in the cursor so it cannot be replayed against another sort.
+        columns (tuple): Key columns; together they must be unique (end with the primary key), and only the first may be nullable.
+        descending (bool): Whether the page runs in descending key order.
+        limit (int): Page size.
+        cursor (str): Cursor returned with the previous page, or None for the first page.
+
+    Returns:
+        tuple: The rows of the page and the cursor of the next page (None on the last page).
+
+    Raises:
+        HTTPException: 400 if the limit is not positive or the cursor is invalid.
+    """
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if limit <= 0:
+        flask.abort(http.HTTPStatus.BAD_REQUEST, description="limit must be a positive integer")
+
+    values = decode_cursor(cursor, ordering, column_types(columns)) if cursor is not None else None
+    rows = []
+    for part in _parts(query, columns, descending, values):
+        rows += ordered(part, columns, descending).limit(limit + 1 - len(rows)).all()
+        if len(rows) > limit:
+            break
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(ordering, [getattr(rows[-1], column.key) for column in columns])
+    return rows, next_cursor
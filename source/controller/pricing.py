@@ -0,0 +1,150 @@
+from sqlalchemy import bindparam, case, or_, select, update
+import schema
+import source.controller.catalog_cache as catalog_cache
+import source.controller.furniture_inventory as furniture_inventory
+
+MAX_RULES = 50
+
+# Changed items listed in a report; the counts and totals always cover all of them
+MAX_LISTED_ITEMS = 1000
+
+
+def parse_rules(rules) -> list:
+    """
+    Checks a rule set and turns it into SQL conditions.
+
+    A rule is an object with the new 'discount' (percent, from 0 up to 100) and the
+    items it applies to: any of `furniture_inventory.SELECTION_FIELDS`, such as
+    'category' or `"attributes": {"details.upholstery": "fabric"}`. A rule without
+    them applies to every item. Where rules overlap, the later one wins.
+
+    Args:
+        rules: The rule set, as decoded from JSON.
+
+    Returns:
+        list: (condition, discount) pairs, in rule order.
+
+    Raises:
+        ValueError: If the rule set is malformed.
+    """
+    if not isinstance(rules, list) or not rules:
+        raise ValueError("'rules' must be a non-empty list")
+    if len(rules) > MAX_RULES:
+        raise ValueError(f"At most {MAX_RULES} rules are allowed")
+
+    parsed = []
+    for index, rule in enumerate(rules, 1):
+        if not isinstance(rule, dict):
+            raise ValueError(f"Rule {index} must be an object")
+        discount = rule.get('discount')
+        if isinstance(discount, bool) or not isinstance(discount, (int, float)) or not 0 <= discount < 100:
+            raise ValueError(f"Rule {index}: 'discount' must be a number from 0 up to 100")
+        try:
+            condition = furniture_inventory.selection_condition({key: value for key, value in rule.items() if key != 'discount'})
+        except ValueError as error:
+            raise ValueError(f"Rule {index}: {error}")
+        parsed.append((condition, float(discount)))
+    return parsed
+
+
+def _evaluate(s, rules: list) -> tuple:
+    Furniture = schema.Furniture
+    # CASE picks the first match, so the rules are listed last first
+    new_discount = case(*((condition, discount) for condition, discount in reversed(rules)), else_=Furniture.discount)
+    query = (
+        select(Furniture.model_num, Furniture.price, Furniture.discount, Furniture.final_price, Furniture.stock_quantity, new_discount)
+        .where(or_(*(condition for condition, _ in rules)))
+        .order_by(Furniture.model_num)
+    )
+
+    matched = 0
+    changes = []
+    margin_delta = stock_value_delta = 0.0
+    for model_num, price, discount, final_price, stock_quantity, new_discount in s.execute(query):
+        matched += 1
+        new_final_price = schema.customer_price(price, new_discount)
+        if new_discount == discount and new_final_price == final_price:
+            continue
+        # Before tax, the store's margin on a unit moves by exactly the change in its net price
+        unit_margin_delta = price * (discount - new_discount) / 100
+        margin_delta += unit_margin_delta * stock_quantity
+        stock_value_delta += (new_final_price - (final_price or 0.0)) * stock_quantity
+        changes.append(
+            {
+                'model_num': model_num,
+                'discount': discount,
+                'new_discount': new_discount,
+                'final_price': final_price,
+                'new_final_price': new_final_price,
+                'margin_delta': round(unit_margin_delta, 2),
+                'price': price,
+            }
+        )
+
+    report = {
+        'matched': matched,
+        'changed': len(changes),
+        'margin_delta': round(margin_delta, 2),
+        'stock_value_delta': round(stock_value_delta, 2),
+        'applied': 0,
+        'items': [{key: value for key, value in change.items() if key != 'price'} for change in changes[:MAX_LISTED_ITEMS]],
+    }
+    return report, changes
+
+
+def _apply(s, changes: list) -> int:
+    table = schema.Furniture.__table__
+    # Rows whose price or discount changed since they were read are left alone
+    statement = (
+        update(table)
+        .where(table.c.model_num == bindparam('key'), table.c.price == bindparam('old_price'), table.c.discount == bindparam('old_discount'))
+        .values(discount=bindparam('new_discount'), final_price=bindparam('new_final_price'), updated_at=bindparam('stamp'))
+    )
+    stamp = schema.change_time()
+    result = s.execute(
+        statement,
+        [
+            {
+                'key': change['model_num'],
+                'old_price': change['price'],
+                'old_discount': change['discount'],
+                'new_discount': change['new_discount'],
+                'new_final_price': change['new_final_price'],
+                'stamp': stamp,
+            }
+            for change in changes
+        ],
+    )
+    s.commit()
+    return result.rowcount
+
+
+def reprice(rules: list, apply: bool = False) -> dict:
+    """
+    Previews, or applies, a set of discount rules across the whole catalog.
+
+    The rules are evaluated by the database in one query; the new final prices
+    are computed with `schema.customer_price`, the math of `Furniture.to_dict`.
+    Applying writes every changed item with one bulk UPDATE in one transaction,
+    keeping `final_price` and `updated_at` in step, and invalidates the catalog cache.
+
+    Args:
+        rules (list): The rules, as returned by `parse_rules`.
+        apply (bool): Write the new discounts; otherwise only report them.
+
+    Returns:
+        dict: The number of items `matched` by any rule and `changed` by the rule set,
+        the total `margin_delta` (before tax) and `stock_value_delta` (at final prices)
+        over the items in stock, the number of items `applied`, and up to
+        `MAX_LISTED_ITEMS` changed `items` with their old and new discount and final
+        price and their per-unit `margin_delta`.
+    """
+    s = schema.new_session()
+    try:
+        report, changes = _evaluate(s, rules)
+        if apply and changes:
+            report['applied'] = _apply(s, changes)
+            catalog_cache.invalidate()
+    finally:
+        s.close()
+    return report
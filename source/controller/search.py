@@ -0,0 +1,124 @@
+import re
+import schema
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Searchable text of a furniture row; material also covers the bed frame material, see Furniture.valid()
+_SEARCH_COLUMNS = "rowid, model_num, model_name, description, category, material, color, upholstery"
+
+
+def _search_values(row: str) -> str:
+    return (
+        f"{row}.rowid, {row}.model_num, {row}.model_name, {row}.description, {row}.category, "
+        f"trim(ifnull(json_extract({row}.details, '$.material'), '') || ' ' || ifnull(json_extract({row}.details, '$.frame_material'), '')), "
+        f"json_extract({row}.details, '$.color'), json_extract({row}.details, '$.upholstery')"
+    )
+
+
+_CREATE_TABLE = """
+CREATE VIRTUAL TABLE furniture_fts USING fts5(
+    model_num UNINDEXED, model_name, description, category, material, color, upholstery,
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+)
+"""
+
+# The index follows the furniture table through triggers, so every write path (ORM, bulk SQL, imports) keeps it current.
+# Stock and discount updates do not touch the searchable columns and leave the index alone.
+_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS furniture_fts_insert AFTER INSERT ON furniture BEGIN
+        INSERT INTO furniture_fts({_SEARCH_COLUMNS}) VALUES ({_search_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS furniture_fts_update AFTER UPDATE OF model_num, model_name, description, category, details ON furniture BEGIN
+        DELETE FROM furniture_fts WHERE rowid = old.rowid;
+        INSERT INTO furniture_fts({_SEARCH_COLUMNS}) VALUES ({_search_values('new')});
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS furniture_fts_delete AFTER DELETE ON furniture BEGIN
+        DELETE FROM furniture_fts WHERE rowid = old.rowid;
+    END
+    """,
+]
+
+# bm25() takes one weight per column: a hit in the model name counts most, then category, then details and description.
+# The page is cut inside the full-text query, so only the rows of the page are joined back to the furniture table.
+_SEARCH = text("""
+    SELECT furniture.* FROM (
+        SELECT model_num, bm25(furniture_fts, 0.0, 10.0, 1.0, 5.0, 2.0, 2.0, 2.0) AS score FROM furniture_fts
+        WHERE furniture_fts MATCH :query
+        ORDER BY score, model_num
+        LIMIT :limit OFFSET :offset
+    ) AS hits
+    JOIN furniture ON furniture.model_num = hits.model_num
+    ORDER BY hits.score, hits.model_num
+    """)
+
+
+def install(engine) -> None:
+    """
+    Creates the `furniture_fts` full-text index and the triggers that keep it in sync.
+
+    Called by `schema.create`. The index is (re)built from the furniture table
+    when it is missing or out of step with it, e.g. for a database created before
+    search existed, or after a VACUUM renumbered the furniture rowids.
+    Only SQLite databases get the index.
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    with engine.begin() as connection:
+        if connection.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'furniture_fts'")).first() is None:
+            connection.execute(text(_CREATE_TABLE))
+            in_sync = False
+        else:
+            stale = connection.execute(
+                text(
+                    "SELECT (SELECT count(*) FROM furniture) != (SELECT count(*) FROM furniture_fts) OR EXISTS ("
+                    "SELECT 1 FROM furniture_fts LEFT JOIN furniture ON furniture.rowid = furniture_fts.rowid "
+                    "WHERE furniture.model_num IS NOT furniture_fts.model_num)"
+                )
+            ).scalar()
+            in_sync = not stale
+
+        if not in_sync:
+            connection.execute(text("DELETE FROM furniture_fts"))
+            connection.execute(text(f"INSERT INTO furniture_fts({_SEARCH_COLUMNS}) SELECT {_search_values('furniture')} FROM furniture"))
+
+        for trigger in _TRIGGERS:
+            connection.execute(text(trigger))
+
+
+def match_expression(query: str) -> str | None:
+    """
+    Turns free text typed by a user into an FTS5 query.
+
+    Every word becomes a quoted prefix term, so `leath sof` finds "leather sofa"
+    and FTS5 operators or quotes in the input are matched as plain text.
+
+    Returns:
+        str | None: The MATCH expression, or None if the query has no words.
+    """
+    terms = re.findall(r'\w+', query)
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_items(session: Session, query: str, limit: int, offset: int = 0) -> list:
+    """
+    Full-text search over the furniture catalog, best matches first (BM25).
+
+    Args:
+        session (Session): The database session.
+        query (str): MATCH expression built by `match_expression`.
+        limit (int): Maximum number of items to return.
+        offset (int): Number of ranked items to skip.
+
+    Returns:
+        list: The matching Furniture rows.
+    """
+    statement = _SEARCH.bindparams(query=query, limit=limit, offset=offset)
+    return session.query(schema.Furniture).from_statement(statement).all()
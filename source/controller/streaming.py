@@ -0,0 +1,98 @@
+import functools
+import flask
+from sqlalchemy.engine import Row
+
+# Encoded JSON is handed to the server in chunks of about this many characters
+CHUNK_SIZE = 64 * 1024
+
+# Rows fetched from the database at a time while streaming
+BATCH_SIZE = 500
+
+
+class Members:
+    """
+    A JSON object whose members are produced lazily, as (key, value) pairs.
+
+    Used as a value in the document passed to `response`, in place of a dict
+    that would have to hold every row at once.
+    """
+
+    def __init__(self, pairs) -> None:
+        self.pairs = pairs
+
+
+def rows(session, query, member):
+    """
+    Iterates a query in batches of `BATCH_SIZE` rows and closes the session when done.
+
+    Args:
+        session: The session the query belongs to.
+        query: The ordered query to stream.
+        member: Function turning a row into a (key, value) pair.
+
+    Yields:
+        tuple: One (key, value) pair per row.
+    """
+    try:
+        for row in query.yield_per(BATCH_SIZE):
+            yield member(row)
+            # Serialized rows are not needed again; keep the identity map from growing with the result
+            # (column rows, unlike mapped objects, never enter it)
+            if not isinstance(row, Row):
+                session.expunge(row)
+    finally:
+        session.close()
+
+
+def _encode(value, dumps):
+    if isinstance(value, Members):
+        pairs = value.pairs
+    elif isinstance(value, dict) and any(isinstance(member, Members) for member in value.values()):
+        pairs = value.items()
+    else:
+        yield dumps(value)
+        return
+
+    yield '{'
+    for index, (key, member) in enumerate(pairs):
+        yield f'{"," if index else ""}{dumps(str(key))}:'
+        yield from _encode(member, dumps)
+    yield '}'
+
+
+def _chunked(parts):
+    buffer, size = [], 0
+    for part in parts:
+        buffer.append(part)
+        size += len(part)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer)
+
+
+def response(document: dict) -> flask.Response:
+    """
+    Builds a JSON response that is encoded while it is being sent.
+
+    The document is written like `flask.jsonify` would write it, except that
+    `Members` values are consumed one member at a time, so neither the rows nor
+    the encoded body are ever held in memory as a whole.
+
+    Args:
+        document (dict): The response body; may contain `Members` values.
+
+    Returns:
+        flask.Response: A streamed `application/json` response.
+    """
+    # The body is produced after the view returns; serializing rows needs no request context,
+    # and the app's JSON provider is captured here so the output matches jsonify
+    app = flask.current_app
+    compact = getattr(app.json, 'compact', None)
+    # jsonify writes compact JSON unless the app is in debug mode (where it indents, which a stream cannot)
+    if compact or (compact is None and not app.debug):
+        dumps = functools.partial(app.json.dumps, separators=(',', ':'))
+    else:
+        dumps = app.json.dumps
+    return flask.Response(_chunked(_encode(document, dumps)), mimetype='application/json')
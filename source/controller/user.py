@@ -1,6 +1,7 @@
 import http
 import schema
 import flask
+import source.controller.versions as versions
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 from werkzeug.security import generate_password_hash
@@ -59,6 +60,8 @@ def update_info_user_full_name(session: Session, user_data: dict) -> None:
     if user:
         user.user_full_name = user_data["user_full_name"]
         session.commit()
+        # Orders show the customer's name and phone number
+        versions.bump_orders(user_data["user_id"])
 
 
 def update_info_user_phone_num(session: Session, user_data: dict) -> None:
@@ -73,6 +76,8 @@ def update_info_user_phone_num(session: Session, user_data: dict) -> None:
     if user:
         user.user_phone_num = user_data["user_phone_num"]
         session.commit()
+        # Orders show the customer's name and phone number
+        versions.bump_orders(user_data["user_id"])
 
 
 def update_info_address(session: Session, user_data: dict) -> None:
@@ -94,6 +99,8 @@ def update_info_user_name(session: Session, user_data: dict):
     if user:
         user.user_name = user_data["user_name"]
         session.commit()
+        # Orders show the customer's name and phone number
+        versions.bump_orders(user_data["user_id"])
 
 
 def update_info_email(session: Session, user_data: dict) -> None:
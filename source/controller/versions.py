@@ -0,0 +1,184 @@
+import functools
+import hashlib
+import http
+import threading
+import time
+import uuid
+import flask
+import schema
+
+# Like catalog_cache, the counters live in this process; they start over (with a new generation) on every schema.create()
+_lock = threading.Lock()
+_generation = uuid.uuid4().hex[:8]
+_catalog = 0
+_carts = {}
+_orders = {}
+
+# Seconds between two looks at the catalog version stored in the database, see `catalog`
+CATALOG_CHECK_INTERVAL = 1.0
+_stored_catalog = None
+_checked_at = None
+
+# Appended by compression.py to the tag of a gzip-encoded body
+GZIP_ETAG_SUFFIX = '-gz'
+
+
+def reset() -> None:
+    """
+    Drops all version counters and starts a new generation.
+
+    ETags issued before the reset carry the old generation, so they can never
+    match a counter that restarted from zero.
+    """
+    global _generation, _catalog, _stored_catalog, _checked_at
+    with _lock:
+        _generation = uuid.uuid4().hex[:8]
+        _catalog = 0
+        _stored_catalog = None
+        _checked_at = None
+        _carts.clear()
+        _orders.clear()
+
+
+def after_commit(callback) -> None:
+    """
+    Runs `callback` once the request's open `schema.transaction()` has ended, or at once when none is open.
+
+    Version bumps and cache invalidations go through here: issued before the
+    commit, they would let another request cache the old data under the new version.
+    """
+    pending = flask.g.get('after_commit') if flask.has_app_context() else None
+    if pending is None:
+        callback()
+    else:
+        pending.append(callback)
+
+
+def _bump_catalog() -> None:
+    global _catalog
+    with _lock:
+        _catalog += 1
+
+
+def _bump_cart(user_id) -> None:
+    with _lock:
+        _carts[str(user_id)] = _carts.get(str(user_id), 0) + 1
+
+
+def _bump_orders(user_id) -> None:
+    with _lock:
+        _orders[str(user_id)] = _orders.get(str(user_id), 0) + 1
+
+
+def bump_catalog() -> None:
+    """Marks the furniture catalog as changed. Called by catalog_cache.invalidate()."""
+    after_commit(_bump_catalog)
+
+
+def bump_cart(user_id) -> None:
+    """Marks a user's cart as changed. Must be called after every committed change to the user's cart items."""
+    after_commit(functools.partial(_bump_cart, user_id))
+
+
+def bump_orders(user_id) -> None:
+    """Marks a user's order list as changed, including the customer details shown on each order."""
+    after_commit(functools.partial(_bump_orders, user_id))
+
+
+def generation() -> str:
+    """Returns the current generation, which changes on every `reset`."""
+    return _generation
+
+
+def _check_catalog() -> None:
+    global _catalog, _stored_catalog, _checked_at
+    now = time.monotonic()
+    if _checked_at is not None and now - _checked_at < CATALOG_CHECK_INTERVAL:
+        return
+    _checked_at = now
+    stored = schema.stored_catalog_version()
+    with _lock:
+        if stored != _stored_catalog and _stored_catalog is not None:
+            _catalog += 1
+        _stored_catalog = stored
+
+
+def catalog() -> int:
+    """
+    Returns the current catalog version.
+
+    Writes made by this process bump it through `bump_catalog`. Changes committed
+    by other processes, such as the command line import, are noticed through the
+    version the database keeps (`schema.CatalogVersion`), which is read at most
+    once every `CATALOG_CHECK_INTERVAL` seconds.
+    """
+    _check_catalog()
+    return _catalog
+
+
+def stored_catalog():
+    """
+    Returns the catalog version stored in the database, as last read by `catalog`.
+
+    Returns:
+        int | None: The version, or None when the database keeps none.
+    """
+    _check_catalog()
+    return _stored_catalog
+
+
+def cart(user_id) -> int:
+    """Returns the current version of a user's cart."""
+    return _carts.get(str(user_id), 0)
+
+
+def orders(user_id) -> int:
+    """Returns the current version of a user's order list."""
+    return _orders.get(str(user_id), 0)
+
+
+def etag(*versions) -> str:
+    """
+    Builds a strong ETag for the current GET request from the versions its response depends on.
+
+    The query string is part of the tag, so e.g. `/items?category=Chair` and
+    `/items?category=Bed` never share one.
+
+    Versions must be read before the response is queried: a write that lands in
+    between then only makes the tag older than the body, never newer.
+
+    Args:
+        *versions: Version counters, as returned by `catalog`, `cart` and `orders`.
+
+    Returns:
+        str: The (unquoted) entity tag.
+    """
+    args = sorted(flask.request.args.items(multi=True))
+    digest = hashlib.sha1(repr((flask.request.path, args)).encode()).hexdigest()[:16]
+    return '-'.join([_generation, *(str(version) for version in versions), digest])
+
+
+def not_modified(tag: str) -> flask.Response | None:
+    """
+    Returns a 304 response if the client already holds the representation tagged `tag`.
+
+    The gzip-encoded representation (see compression.py) matches as well.
+
+    Args:
+        tag (str): The tag built by `etag`.
+
+    Returns:
+        flask.Response | None: An empty 304 Not Modified response, or None if the response must be produced.
+    """
+    for held in (tag, tag + GZIP_ETAG_SUFFIX):
+        if flask.request.if_none_match.contains_weak(held):
+            response = flask.Response(status=http.HTTPStatus.NOT_MODIFIED)
+            response.set_etag(held)
+            return response
+    return None
+
+
+def tagged(response: flask.Response, tag: str) -> flask.Response:
+    """Sets the ETag of a response built for the tag returned by `etag`."""
+    response.set_etag(tag)
+    return response
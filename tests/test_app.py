@@ -1,8 +1,13 @@
+import base64
 from datetime import datetime
+import gzip
+import json
 import pytest
 import app
 import http
 import schema
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from unittest.mock import patch
 from werkzeug.security import check_password_hash, generate_password_hash
 from source.models.OrderStatus import OrderStatus
@@ -246,6 +251,25 @@ def test_user_get_all_items(client):
     }
 
 
+def test_items_listing_is_streamed(client):
+    """
+    Tests that unpaged '/items' listings are streamed in catalog order.
+
+    Verifies that the response is sent in chunks, that it parses as the same JSON
+    document as before, and that SQL-filtered listings are streamed too.
+    """
+    response = client.get('/items')
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.is_streamed
+    assert response.mimetype == 'application/json'
+    assert list(response.get_json()['items']) == ['chair-0', 'chair-1', 'BD-5005', 'BS-4004', 'SF-3003']
+
+    response = client.get('/items', query_string={"sort": "final_price"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.is_streamed
+    assert list(response.get_json()['items']) == ['BS-4004', 'chair-0', 'chair-1', 'BD-5005', 'SF-3003']
+
+
 def test_single_filter_by_category(client):
     """
     Test retrieving items by category.
@@ -401,6 +425,437 @@ def test_verify_availability_out_of_stock(client):
     }
 
 
+def test_filter_by_final_price_range(client):
+    """
+    Tests filtering items by the price customers actually pay (after discount and tax).
+
+    Sends a GET request with `min_final_price` and `max_final_price` and verifies that
+    only items whose final price falls in the range are returned.
+    """
+    response = client.get('/items', query_string={"min_final_price": 100, "max_final_price": 300})
+    assert response.status_code == http.HTTPStatus.OK
+    items = response.get_json()['items']
+    assert set(items) == {'chair-0', 'chair-1'}
+    assert items['chair-1']['final_price'] == 236.0
+
+
+def test_sort_by_final_price_with_limit(client):
+    """
+    Tests sorting items by final price and limiting the number of results.
+
+    Verifies ascending and descending orders, and that ties are broken by model number.
+    """
+    response = client.get('/items', query_string={"sort": "final_price", "limit": 3})
+    assert response.status_code == http.HTTPStatus.OK
+    assert list(response.get_json()['items']) == ['BS-4004', 'chair-0', 'chair-1']
+
+    response = client.get('/items', query_string={"sort": "-final_price", "limit": 2})
+    assert response.status_code == http.HTTPStatus.OK
+    assert list(response.get_json()['items']) == ['SF-3003', 'BD-5005']
+
+
+@pytest.mark.parametrize("query", [{"sort": "price"}, {"limit": 0}, {"limit": "ten"}, {"max_final_price": "cheap"}])
+def test_items_invalid_price_query(client, query):
+    """
+    Tests that malformed sorting, limit and price parameters are rejected with 400 BAD REQUEST.
+    """
+    response = client.get('/items', query_string=query)
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_final_price_filter_follows_discount_update(client):
+    """
+    Tests that the stored final price is updated together with the item's discount.
+
+    Steps:
+    - Logs in as an admin user.
+    - Sets a 50% discount on chair-1 (final price 236.0 -> 118.0).
+    - Verifies chair-1 is now returned by a `max_final_price` filter it did not match before.
+    """
+    response = client.get('/items', query_string={"max_final_price": 120})
+    assert set(response.get_json()['items']) == {'chair-0', 'BS-4004'}
+
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.post('/admin/update_discount', json={"model_num": "chair-1", "discount": 50.0})
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/items', query_string={"max_final_price": 120})
+    items = response.get_json()['items']
+    assert set(items) == {'chair-0', 'chair-1', 'BS-4004'}
+    assert items['chair-1']['final_price'] == 118.0
+
+
+def test_items_keyset_pagination(client):
+    """
+    Tests paging through all items with `limit` and the returned `next_cursor`.
+
+    Steps:
+    - Requests pages of 2 items, ordered by model number, following `next_cursor`.
+    - Verifies every item is returned exactly once and the last page has no cursor.
+    """
+    pages = []
+    query = {"limit": 2}
+    while True:
+        response = client.get('/items', query_string=query)
+        assert response.status_code == http.HTTPStatus.OK
+        data = response.get_json()
+        pages.append(list(data['items']))
+        if data['next_cursor'] is None:
+            break
+        query = {"limit": 2, "cursor": data['next_cursor']}
+
+    assert pages == [['BD-5005', 'BS-4004'], ['SF-3003', 'chair-0'], ['chair-1']]
+
+
+def test_items_keyset_pagination_by_final_price(client):
+    """
+    Tests paging through items sorted by final price, including a price tie between two items.
+    """
+    response = client.get('/items', query_string={"sort": "-final_price", "limit": 3})
+    data = response.get_json()
+    assert list(data['items']) == ['SF-3003', 'BD-5005', 'chair-1']
+
+    response = client.get('/items', query_string={"sort": "-final_price", "limit": 3, "cursor": data['next_cursor']})
+    data = response.get_json()
+    assert list(data['items']) == ['chair-0', 'BS-4004']
+    assert data['next_cursor'] is None
+
+
+def test_items_invalid_cursor(client):
+    """
+    Tests that malformed cursors, and cursors issued for a different sort, are rejected with 400 BAD REQUEST.
+    """
+    response = client.get('/items', query_string={"limit": 2, "cursor": "not-a-cursor"})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+    cursor = client.get('/items', query_string={"limit": 2}).get_json()['next_cursor']
+    response = client.get('/items', query_string={"sort": "final_price", "limit": 2, "cursor": cursor})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_items_sparse_fieldset(client):
+    """
+    Tests that `fields` limits the returned item fields, both for cached and for SQL-served listings.
+
+    Steps:
+    - Requests only model_name and final_price for the whole catalog.
+    - Requests a sorted page with the same fields and verifies `details` is not even selected.
+    - Requests `is_available` for a single item.
+    """
+    response = client.get('/items', query_string={"fields": "model_name,final_price"})
+    assert response.status_code == http.HTTPStatus.OK
+    items = response.get_json()['items']
+    assert len(items) == 5
+    assert items['BD-5005'] == {"model_name": "DreamComfort", "final_price": 1274.4}
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(schema._engine, "before_cursor_execute", record)
+    try:
+        response = client.get('/items', query_string={"fields": "model_num,final_price", "sort": "final_price", "limit": 2})
+    finally:
+        event.remove(schema._engine, "before_cursor_execute", record)
+    data = response.get_json()
+    assert data['items'] == {"BS-4004": {"model_num": "BS-4004", "final_price": 64.9}, "chair-0": {"model_num": "chair-0", "final_price": 118.0}}
+    assert data['next_cursor'] is not None
+    furniture_selects = [statement for statement in statements if "FROM furniture" in statement]
+    assert furniture_selects and not any("details" in statement for statement in furniture_selects)
+
+    response = client.get('/items', query_string={"model_num": "chair-0", "fields": "is_available"})
+    assert response.get_json()['items'] == {"chair-0": {"is_available": True}}
+
+
+def test_items_invalid_fields(client):
+    """
+    Tests that unknown or empty `fields` values are rejected with 400 BAD REQUEST.
+    """
+    response = client.get('/items', query_string={"fields": "model_num,secret"})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+    response = client.get('/items', query_string={"fields": ","})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_items_etag_not_modified(client):
+    """
+    Tests conditional GET /items requests.
+
+    Steps:
+    - Fetches the chairs and keeps the returned ETag.
+    - Repeats the request with If-None-Match and verifies a bodyless 304 NOT MODIFIED.
+    - Verifies other filters get a different ETag.
+    - Changes a discount and verifies the old ETag no longer matches.
+    """
+    response = client.get('/items', query_string={"category": "Chair"})
+    assert response.status_code == http.HTTPStatus.OK
+    etag = response.headers['ETag']
+
+    response = client.get('/items', query_string={"category": "Chair"}, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+    response = client.get('/items', query_string={"category": "Bed"}, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+    response = client.post('/admin/update_discount', json={"model_num": "chair-0", "discount": 50.0})
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/items', query_string={"category": "Chair"}, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json()['items']['chair-0']['final_price'] == 59.0
+
+
+def test_items_gzip(client):
+    """
+    Tests that the full item listing is sent gzip-compressed to clients that accept it,
+    and that its ETag is revalidated like the uncompressed one.
+    """
+    plain = client.get('/items')
+    response = client.get('/items', headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data) == plain.data
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + '-gz"'
+
+    response = client.get('/items', headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers['ETag']})
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_search_items(client):
+    """
+    Tests full-text search over names, descriptions, categories and details.
+
+    Steps:
+    - Searches with two words and verifies only the item matching both is returned.
+    - Searches by a word prefix and verifies the ranking.
+    - Searches by a detail (color) and restricts the returned fields.
+    """
+    response = client.get('/items/search', query_string={"q": "leather sofa"})
+    assert response.status_code == http.HTTPStatus.OK
+    data = response.get_json()
+    assert list(data['items']) == ['SF-3003']
+    assert data['items']['SF-3003']['final_price'] == 1274.4
+    assert data['next_cursor'] is None
+
+    response = client.get('/items/search', query_string={"q": "chai"})
+    assert list(response.get_json()['items']) == ['chair-0', 'chair-1']
+
+    response = client.get('/items/search', query_string={"q": "natural oak", "fields": "model_name"})
+    assert response.get_json()['items'] == {"BS-4004": {"model_name": "OakElegance"}}
+
+
+def test_search_items_pagination(client):
+    """
+    Tests paging through search results with `limit` and `cursor`.
+    """
+    response = client.get('/items/search', query_string={"q": "wood", "limit": 3})
+    data = response.get_json()
+    first_page = list(data['items'])
+    assert len(first_page) == 3
+
+    response = client.get('/items/search', query_string={"q": "wood", "limit": 3, "cursor": data['next_cursor']})
+    data = response.get_json()
+    assert data['next_cursor'] is None
+    assert set(first_page + list(data['items'])) == {'chair-0', 'chair-1', 'BD-5005', 'BS-4004'}
+
+
+def test_search_items_invalid_query(client):
+    """
+    Tests that searches without words, and cursors of other listings, are rejected with 400 BAD REQUEST.
+    """
+    response = client.get('/items/search')
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+    response = client.get('/items/search', query_string={"q": "\"*"})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+    cursor = client.get('/items', query_string={"limit": 2}).get_json()['next_cursor']
+    response = client.get('/items/search', query_string={"q": "wood", "cursor": cursor})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_item_facets(client):
+    """
+    Tests facet counts for the whole catalog and for a filtered category page.
+
+    Steps:
+    - Requests the facets without filters and verifies counts per category, material, color and price bucket.
+    - Requests the facets of the chairs only.
+    """
+    response = client.get('/items/facets')
+    assert response.status_code == http.HTTPStatus.OK
+    data = response.get_json()
+    assert data['total'] == 5
+    assert data['category'] == {"Chair": 2, "Bed": 1, "BookShelf": 1, "Sofa": 1}
+    assert data['material'] == {"wood": 2, "Pine Wood": 1, "Solid Wood": 1}
+    assert data['color'] == {"white": 2, "Dark Gray": 1, "Natural Oak": 1}
+    assert data['upholstery'] == {"Top-Grain Leather": 1}
+    assert data['final_price_buckets'] == {"0-100": 1, "100-250": 2, "250-500": 0, "500-1000": 0, "1000-2500": 2, "2500+": 0}
+    assert data['final_price'] == {"min": 64.9, "max": 1274.4}
+
+    response = client.get('/items/facets', query_string={"category": "Chair", "max_final_price": 200})
+    data = response.get_json()
+    assert data['total'] == 1
+    assert data['color'] == {"white": 1}
+    assert data['final_price'] == {"min": 118.0, "max": 118.0}
+
+    response = client.get('/items/facets', query_string={"max_final_price": "cheap"})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_item_facets_follow_catalog_writes(client):
+    """
+    Tests that cached facet counts are recomputed after a discount moves an item to another price bucket.
+    """
+    buckets = client.get('/items/facets').get_json()['final_price_buckets']
+    assert buckets["1000-2500"] == 2
+
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+    response = client.post('/admin/update_discount', json={"model_num": "SF-3003", "discount": 50.0})
+    assert response.status_code == http.HTTPStatus.OK
+
+    buckets = client.get('/items/facets').get_json()['final_price_buckets']
+    assert buckets["1000-2500"] == 1
+    assert buckets["500-1000"] == 1
+
+
+def test_items_batch(client):
+    """
+    Tests looking up several items at once with GET and POST '/items/batch'.
+
+    Verifies that items come back in request order with `is_available`, duplicates
+    are dropped, and unknown model numbers are listed under `missing`.
+    """
+    response = client.get(
+        '/items/batch', query_string=[("model_num", "SF-3003"), ("model_num", "BS-4004"), ("model_num", "nope"), ("model_num", "SF-3003")]
+    )
+    assert response.status_code == http.HTTPStatus.OK
+    data = response.get_json()
+    assert list(data['items']) == ['SF-3003', 'BS-4004']
+    assert data['items']['SF-3003']['final_price'] == 1274.4
+    assert data['items']['SF-3003']['is_available'] is True
+    assert data['items']['BS-4004']['is_available'] is False
+    assert data['missing'] == ['nope']
+
+    response = client.post('/items/batch', json={"model_nums": ["chair-1", "chair-0"]})
+    assert response.status_code == http.HTTPStatus.OK
+    data = response.get_json()
+    assert list(data['items']) == ['chair-1', 'chair-0']
+    assert data['missing'] == []
+
+
+@pytest.mark.parametrize(
+    "method, kwargs",
+    [
+        ("get", {}),
+        ("post", {"json": {"model_nums": "chair-0"}}),
+        ("post", {"json": {"model_nums": [1, 2]}}),
+        ("post", {"json": {"model_nums": [f"M-{i}" for i in range(201)]}}),
+    ],
+)
+def test_items_batch_invalid(client, method, kwargs):
+    """
+    Tests that '/items/batch' rejects missing, malformed and oversized model number lists.
+    """
+    response = getattr(client, method)('/items/batch', **kwargs)
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_items_availability(client):
+    """
+    Tests polling stock with '/items/availability' for a batch of items and for a category.
+
+    Verifies the stock-only response, a bodyless 304 for an unchanged catalog, and that
+    a stock update makes the old ETag stop matching.
+    """
+    response = client.get('/items/availability', query_string=[("model_num", "BS-4004"), ("model_num", "chair-0"), ("model_num", "nope")])
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json() == {
+        'availability': {
+            'BS-4004': {'stock_quantity': 0, 'is_available': False},
+            'chair-0': {'stock_quantity': 3, 'is_available': True},
+        },
+        'missing': ['nope'],
+    }
+    etag = response.headers['ETag']
+
+    response = client.get('/items/availability', query_string={"category": "Chair"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert list(response.get_json()['availability']) == ['chair-0', 'chair-1']
+
+    query = [("model_num", "BS-4004"), ("model_num", "chair-0"), ("model_num", "nope")]
+    response = client.get('/items/availability', query_string=query, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+    assert response.data == b''
+
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+    response = client.post('/admin/update_item', json={"model_num": "chair-0", "stock_quantity": 0})
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/items/availability', query_string=query, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json()['availability']['chair-0'] == {'stock_quantity': 0, 'is_available': False}
+
+
+def test_items_availability_requires_items_or_category(client):
+    response = client.get('/items/availability')
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_filter_by_attributes(client):
+    """
+    Tests filtering items on `details` and `dimensions` attributes.
+
+    Steps:
+    - Filters on an indexed attribute, ignoring case.
+    - Combines category, material and a width bound.
+    - Filters on an attribute without an indexed column.
+    """
+    response = client.get('/items', query_string={"details.material": "WOOD"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert list(response.get_json()['items']) == ['chair-0', 'chair-1']
+
+    response = client.get('/items', query_string={"category": "Chair", "details.material": "wood", "dimensions.width_max": 40})
+    assert response.get_json()['items'] == {}
+
+    response = client.get('/items', query_string={"details.material": "wood", "dimensions.width_max": 45, "dimensions.height_min": 90})
+    assert list(response.get_json()['items']) == ['chair-0', 'chair-1']
+
+    response = client.get('/items', query_string={"details.weight_min": 6})
+    assert list(response.get_json()['items']) == ['chair-1']
+
+    response = client.get('/items', query_string={"details.upholstery": "top-grain leather", "fields": "model_num"})
+    assert response.get_json()['items'] == {"SF-3003": {"model_num": "SF-3003"}}
+
+    response = client.get('/items/facets', query_string={"details.color": "white"})
+    assert response.get_json()['total'] == 2
+
+
+def test_filter_by_attributes_invalid_bound(client):
+    """
+    Tests that a non-numeric attribute bound is rejected with 400 BAD REQUEST.
+    """
+    response = client.get('/items', query_string={"dimensions.width_max": "narrow"})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
 def test_add_bed_item(client):
     """
     Tests adding a new bed item via a POST request.
@@ -786,6 +1241,81 @@ def test_add_Sofa_item_not_correct_values(client):
         assert "upholstery" in data["error"]  # Check if upholstery is valid
 
 
+def test_import_items(client):
+    """
+    Tests importing several items from an NDJSON body with '/admin/import_items'.
+
+    Verifies that valid rows are added, that an existing model number and an invalid
+    row are reported with their line numbers, and that the catalog shows the new item.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    table = {
+        "model_num": "T-1001",
+        "model_name": "Harvest",
+        "description": "A solid oak dining table.",
+        "price": 500.0,
+        "dimensions": {"shape": "rectangular", "length": 180, "width": 90, "is_extendable": True},
+        "stock_quantity": 2,
+        "details": {"material": "Wood"},
+        "image_filename": "table.jpg",
+        "discount": 0.0,
+        "category": "Table",
+    }
+    body = "\n".join(
+        json.dumps(record)
+        for record in (table, {**table, "model_num": "chair-0"}, {**table, "model_num": "T-1002", "dimensions": {"shape": "circular"}})
+    )
+    response = client.post('/admin/import_items', data=body, content_type='application/x-ndjson')
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json() == {
+        'total': 3,
+        'inserted': 1,
+        'error_count': 2,
+        'errors': [
+            {'line': 2, 'model_num': 'chair-0', 'error': 'Item already exists'},
+            {'line': 3, 'model_num': 'T-1002', 'error': 'Invalid Table details provided.'},
+        ],
+    }
+
+    response = client.get('/items', query_string={"model_num": "T-1001"})
+    assert response.get_json()['items']['T-1001']['final_price'] == 590.0
+
+
+def test_import_items_requires_admin(client):
+    response = client.post('/admin/import_items', data="", content_type='application/x-ndjson')
+    assert response.status_code == http.HTTPStatus.UNAUTHORIZED
+
+
+def test_sync_items(client):
+    """
+    Tests syncing the catalog with '/admin/sync_items' while keeping the items missing from the feed.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    # The chairs of the test catalog, as the supplier feed
+    feed = [json.loads(line) for line in client.get('/admin/export/furniture').get_data(as_text=True).splitlines()]
+    chair_0, chair_1 = (record for record in feed if record['category'] == 'Chair')
+    body = "\n".join(json.dumps(record) for record in ({**chair_0, "stock_quantity": 7}, chair_1))
+    response = client.post('/admin/sync_items', data=body, content_type='application/x-ndjson', query_string={"delete_missing": "false"})
+    assert response.status_code == http.HTTPStatus.OK
+    report = response.get_json()
+    assert (report['updated'], report['deleted'], report['error_count']) == (2, 0, 0)
+
+    response = client.post('/admin/sync_items', data=body, content_type='application/x-ndjson', query_string={"delete_missing": "false"})
+    assert (response.get_json()['updated'], response.get_json()['unchanged']) == (0, 2)
+
+    response = client.get('/items', query_string={"model_num": "chair-0"})
+    assert response.get_json()['items']['chair-0']['stock_quantity'] == 7
+
+    response = client.post('/admin/sync_items', data=body, query_string={"delete_missing": "maybe"})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
 def test_update_quantity(client):
     """
     Tests updating the stock quantity of an item via a POST request.
@@ -840,6 +1370,56 @@ def test_update_discount(client):
     assert data["items"]["chair-0"]["discount"] == 15.0  # Verify discount update
 
 
+def test_reprice(client):
+    """
+    Tests previewing and then applying a category-wide discount with '/admin/reprice'.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    rules = [{"category": "Chair", "discount": 15.0}]
+    response = client.post('/admin/reprice', json={"rules": rules})
+    assert response.status_code == http.HTTPStatus.OK
+    preview = response.get_json()
+    assert (preview['changed'], preview['applied']) == (2, 0)
+    assert [item['new_final_price'] for item in preview['items']] == [100.3, 200.6]
+
+    response = client.post('/admin/reprice', json={"rules": rules, "apply": True})
+    assert response.get_json()['applied'] == 2
+    response = client.get('/items', query_string={"model_num": "chair-1"})
+    assert response.get_json()["items"]["chair-1"]["final_price"] == 200.6
+
+    response = client.post('/admin/reprice', json={"rules": [{"discount": 150}]})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_sql_metrics(client):
+    """
+    Tests the per-endpoint SQL statistics of '/admin/metrics/sql' and the debug headers.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+    client.get('/admin/metrics/sql', query_string={"reset": "true"})
+
+    response = client.get('/admin/orders')
+    assert response.status_code == http.HTTPStatus.OK
+    assert 'X-SQL-Count' not in response.headers
+
+    response = client.get('/admin/metrics/sql', query_string={"reset": "true"})
+    assert response.status_code == http.HTTPStatus.OK
+    endpoint = response.get_json()['endpoints']['GET /admin/orders']
+    assert endpoint['requests'] == 1
+    assert endpoint['statements'] >= 1
+    assert client.get('/admin/metrics/sql').get_json()['endpoints'].keys() == {'GET /admin/metrics/sql'}
+
+    debug_app = app.create_app({'database_url': 'sqlite:///:memory:', 'sql_debug_headers': True})
+    response = debug_app.test_client().get('/items')
+    assert int(response.headers['X-SQL-Count']) >= 0
+    assert 'X-SQL-Time-Ms' in response.headers
+
+
 def test_delete_item(client):
     """
     Tests deleting an item via a POST request.
@@ -1433,6 +2013,35 @@ def test_access_protected_endpoint_after_logout(client):
     assert response.status_code == http.HTTPStatus.UNAUTHORIZED
 
 
+def test_carts_etag_not_modified(client):
+    """
+    Tests that a user's cart is answered with 304 NOT MODIFIED until the cart changes.
+    """
+    response = client.get('/carts', query_string={"user_id": 1003})
+    assert response.status_code == http.HTTPStatus.OK
+    etag = response.headers['ETag']
+
+    response = client.get('/carts', query_string={"user_id": 1003}, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+
+    # Another user's cart changing does not affect this one
+    login_info = {"user_name": "JaneSmith", "password": "mypassword456"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+    response = client.post('/user/delete_cart_item', json={"user_id": 1002, "model_num": "chair-0"})
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/carts', query_string={"user_id": 1003}, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+
+    response = client.post('/user/add_item_to_cart', json={"user_id": 1003, "model_num": "chair-1", "quantity": 1})
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/carts', query_string={"user_id": 1003}, headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
 def test_add_item_to_cart_requires_login(client):
     """
     Tests that adding an item to the cart requires authentication.
@@ -1868,6 +2477,109 @@ def test_order_view_all_orders(client):
     }
 
 
+def test_admin_orders_streamed_newest_first(client):
+    """
+    Tests that the unpaged '/admin/orders' listing is streamed, newest order first.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/admin/orders', query_string={"fields": "order_num,status"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.is_streamed
+    assert list(response.get_json()['orders'].values()) == [
+        {"order_num": 1, "status": "PENDING"},
+        {"order_num": 2, "status": "DELIVERED"},
+    ]
+
+
+def test_admin_orders_customer_joined(client):
+    """
+    Tests that listing orders loads their customers in the same query, so the number of
+    statements does not grow with the number of orders.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    def count_statements(path):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            response = client.get(path, query_string={"limit": 50})
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        assert response.status_code == http.HTTPStatus.OK
+        return len(statements), response.get_json()['orders']
+
+    before, orders = count_statements('/admin/orders')
+    assert len(orders) == 2
+    assert orders["1"]["user_full_name"] == "Jane Smith"
+
+    session = schema.session()
+    for _ in range(8):
+        session.add(schema.Order.new(1003, {"chair-0": 1}, "michaelbrown@example.com", "MichaelBrown", "Tel Aviv", 118.0))
+    session.commit()
+
+    after, orders = count_statements('/admin/orders')
+    assert len(orders) == 10
+    assert after == before
+    assert count_statements('/user/orders/1003')[0] <= before
+
+
+def test_admin_export(client):
+    """
+    Tests the admin exports: orders as CSV with one line per order item, users as NDJSON without
+    password hashes, and `since` keeping only rows changed from that time on.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/admin/export/orders', query_string={"format": "csv"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.mimetype == 'text/csv'
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "order_num,user_id,user_email,shipping_address,total_price,status,creation_time,updated_at,model_num,quantity"
+    assert [line.split(',')[-2:] for line in lines[1:]] == [['chair-0', '2'], ['SF-3003', '1'], ['BS-4004', '1'], ['SF-3003', '1']]
+
+    response = client.get('/admin/export/users')
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.mimetype == 'application/x-ndjson'
+    users = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [user['user_id'] for user in users] == [1002, 1003, 1004, 1005]
+    assert all('password' not in user for user in users)
+
+    since = max(user['updated_at'] for user in users)
+    response = client.post('/update_user', json={"user_id": 1003, "address": "1 New Street"})
+    assert response.status_code == http.HTTPStatus.OK
+    response = client.get('/admin/export/users', query_string={"since": since[:-1]})
+    changed = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [user['user_id'] for user in changed if user['updated_at'] > since] == [1003]
+
+
+@pytest.mark.parametrize(
+    "path, query, expected_status",
+    [
+        ('/admin/export/passwords', {}, http.HTTPStatus.NOT_FOUND),
+        ('/admin/export/orders', {"format": "xml"}, http.HTTPStatus.BAD_REQUEST),
+        ('/admin/export/orders', {"since": "yesterday"}, http.HTTPStatus.BAD_REQUEST),
+    ],
+)
+def test_admin_export_invalid(client, path, query, expected_status):
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get(path, query_string=query)
+    assert response.status_code == expected_status
+
+
 def test_get_order_by_user_id_for_admin(client):
     """
     Tests retrieving a user's order details as an admin.
@@ -1941,6 +2653,176 @@ def test_user_view_my_orders(client):
     }
 
 
+def test_orders_keyset_pagination(client):
+    """
+    Tests paging through orders, newest first, as an admin and as a user.
+
+    Steps:
+    - Logs in as an admin and requests one order per page from '/admin/orders'.
+    - Verifies the newest order comes first and the second page is the last one.
+    - Verifies a user's own order history returns a single page.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/admin/orders', query_string={"limit": 1})
+    assert response.status_code == http.HTTPStatus.OK
+    data = response.get_json()
+    assert list(data['orders']) == ['1']
+    assert data['next_cursor'] is not None
+
+    response = client.get('/admin/orders', query_string={"limit": 1, "cursor": data['next_cursor']})
+    data = response.get_json()
+    assert list(data['orders']) == ['2']
+    assert data['orders']['2']['creation_time'] == 'Sun, 03 Mar 2024 12:30:00 GMT'
+    assert data['next_cursor'] is None
+
+    response = client.get('/user/orders/1002', query_string={"limit": 5})
+    data = response.get_json()
+    assert list(data['orders']) == ['1']
+    assert data['next_cursor'] is None
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4])
+def test_orders_keyset_pagination_null_creation_time(client, limit):
+    """
+    Tests that orders without a creation time are paged too, after the dated ones, as in the unpaged listing.
+    """
+    session = schema.session()
+    session.add_all(
+        [
+            schema.Order(order_num=order_num, user_id=1002, items={"chair-0": 1}, total_price=118.0, status=OrderStatus.PENDING, creation_time=None)
+            for order_num in (3, 4)
+        ]
+    )
+    session.commit()
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    order_nums = []
+    query = {"limit": limit}
+    while query:
+        data = client.get('/admin/orders', query_string=query).get_json()
+        order_nums += list(data['orders'])
+        query = {"limit": limit, "cursor": data['next_cursor']} if data['next_cursor'] else None
+
+    assert order_nums == ['1', '2', '4', '3']
+    assert list(client.get('/admin/orders').get_json()['orders']) == order_nums
+
+
+@pytest.mark.parametrize(
+    "keys", [["abc", 1], [{"datetime": "2024-03-04T12:45:00"}, "1"], [{"datetime": "2024-03-04T12:45:00"}, True], [None, 1.5], [{}, 1]]
+)
+def test_orders_invalid_cursor_values(client, keys):
+    """
+    Tests that a cursor whose values do not fit the key columns is rejected with 400.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    cursor = base64.urlsafe_b64encode(json.dumps({"o": "creation_time", "k": keys}).encode()).decode()
+    response = client.get('/admin/orders', query_string={"limit": 1, "cursor": cursor})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert "Invalid cursor" in response.get_data(as_text=True)
+
+
+def test_users_keyset_pagination(client):
+    """
+    Tests paging through '/admin/users' by user ID.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    user_ids = []
+    query = {"limit": 3}
+    while query:
+        data = client.get('/admin/users', query_string=query).get_json()
+        user_ids += list(data['users'])
+        query = {"limit": 3, "cursor": data['next_cursor']} if data['next_cursor'] else None
+
+    assert user_ids == ['1002', '1003', '1004', '1005']
+
+
+def test_orders_sparse_fieldset(client):
+    """
+    Tests that an order summary requested with `fields` skips the customer lookup.
+
+    Steps:
+    - Logs in as an admin.
+    - Requests order numbers, status and totals with customer lookups made to fail.
+    - Verifies only the requested fields are returned, and that customer fields still work when asked for.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    with patch("schema.user.get_user_details", side_effect=AssertionError("customer lookup not needed")):
+        response = client.get('/admin/orders', query_string={"fields": "order_num,status,total_price"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json()['orders'] == {
+        "1": {"order_num": 1, "status": "PENDING", "total_price": 1750.1},
+        "2": {"order_num": 2, "status": "DELIVERED", "total_price": 2500.0},
+    }
+
+    response = client.get('/admin/orders', query_string={"fields": "user_name", "limit": 1})
+    data = response.get_json()
+    assert data['orders'] == {"1": {"user_name": "JaneSmith"}}
+    assert data['next_cursor'] is not None
+
+    response = client.get('/admin/orders', query_string={"fields": "password"})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_users_sparse_fieldset(client):
+    """
+    Tests requesting only some user fields from '/admin/users'.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/admin/users', query_string={"user_id": 1002, "fields": "user_name,email"})
+    assert response.get_json()['users'] == {"1002": {"user_name": "JaneSmith", "email": "janesmith@example.com"}}
+
+
+def test_user_orders_etag_not_modified(client):
+    """
+    Tests conditional requests for a user's order history.
+
+    Steps:
+    - Fetches the orders of user 1002 and keeps the returned ETag.
+    - Verifies a matching If-None-Match is answered with 304 without touching the database.
+    - Verifies a status change and a change of the customer's name both produce a new ETag.
+    """
+    login_info = {"user_name": "RobertWilson", "password": "wilsonRob007"}
+    response = client.post('/login', json=login_info)
+    assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/user/orders/1002')
+    assert response.status_code == http.HTTPStatus.OK
+    etag = response.headers['ETag']
+
+    with patch("schema.session", side_effect=AssertionError("304 hit the database")):
+        response = client.get('/user/orders/1002', headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.NOT_MODIFIED
+
+    response = client.post('/admin/update_order_status', json={"order_num": 1, "status": OrderStatus.SHIPPED.value})
+    assert response.status_code == http.HTTPStatus.OK
+    response = client.get('/user/orders/1002', headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.OK
+    etag = response.headers['ETag']
+
+    response = client.post('/update_user', json={"user_id": 1002, "user_full_name": "Jane Smith-Cohen"})
+    assert response.status_code == http.HTTPStatus.OK
+    response = client.get('/user/orders/1002', headers={"If-None-Match": etag})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json()['orders']['1']['user_full_name'] == "Jane Smith-Cohen"
+
+
 def test_view_user_order_no_user_id(client):
     """
     Tests that accessing the /user/orders endpoint without a user ID results in a server error.
@@ -2145,3 +3027,57 @@ def test_checkout_empty_cart(client):
 
     response = client.post(f"/checkout", json={'user_id': user_id, "address": address, 'payment_method': PaymentMethod.CREDIT_CARD.value})
     assert response.status_code == 404
+
+
+def test_checkout_statements_do_not_grow_with_cart(client):
+    """
+    Tests that checkout validates, settles stock and empties the cart with a fixed number of
+    statements, however many lines the cart holds.
+    """
+    address = "Even Gabirol 3, Tel Aviv"
+
+    def count_statements(user_id):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(Engine, "before_cursor_execute", record)
+        try:
+            with patch("source.controller.payment_gateway.random.random", return_value=0.0):
+                response = client.post("/checkout", json={'user_id': user_id, "address": address, 'payment_method': PaymentMethod.CREDIT_CARD.value})
+        finally:
+            event.remove(Engine, "before_cursor_execute", record)
+        assert response.status_code == http.HTTPStatus.OK
+        return len(statements)
+
+    two_lines = count_statements(1002)
+
+    session = schema.session()
+    for model_num in ('chair-0', 'chair-1', 'BD-5005', 'SF-3003'):
+        session.add(schema.CartItem(user_id=1004, model_num=model_num, quantity=1))
+    session.commit()
+
+    assert count_statements(1004) == two_lines
+    assert schema.session().query(schema.CartItem).filter_by(user_id=1004).count() == 0
+    stock = {item.model_num: item.stock_quantity for item in schema.session().query(schema.Furniture)}
+    assert stock == {'chair-0': 0, 'chair-1': 3, 'BD-5005': 4, 'BS-4004': 0, 'SF-3003': 3}
+
+
+def test_checkout_item_no_longer_sold(client):
+    """
+    Tests that checking out a cart that still holds a deleted item is rejected with 409, and that
+    the cart can still be viewed.
+    """
+    session = schema.session()
+    session.add(schema.CartItem(user_id=1004, model_num='gone-0', quantity=1))
+    session.commit()
+
+    response = client.get('/carts', query_string={"user_id": 1004})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json()['carts']['1004'][-1] == {'user_id': 1004, 'model_num': 'gone-0', 'quantity': 1}
+
+    address = "Even Gabirol 3, Tel Aviv"
+    response = client.post("/checkout", json={'user_id': 1004, "address": address, 'payment_method': PaymentMethod.CREDIT_CARD.value})
+    assert response.status_code == http.HTTPStatus.CONFLICT
+    assert "gone-0 is no longer available" in response.get_data(as_text=True)
@@ -2,6 +2,9 @@ import pytest
 import functools
 import http
 import schema
+import source.controller.cart as cart_controller
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from unittest.mock import patch
 
 
@@ -374,3 +377,33 @@ def test_valid_method_cart_item(user_exists, item_exists, expected):
         with patch("source.controller.cart.get_cart_item_full_details", return_value={update_info["model_num"]: {"stock_quantity": 3}}):
             response = client.post('/user/add_item_to_cart', json=update_info)
             assert response.status_code == http.HTTPStatus.CONFLICT
+
+
+def test_cart_read_with_one_query(client):
+    """
+    Tests that a cart of any size is read with one query joining the catalog, and that
+    lines of items no longer in the catalog keep only their cart fields.
+    """
+    session = schema.session()
+    session.add_all([schema.CartItem(user_id=1004, model_num=model_num, quantity=1) for model_num in ('chair-0', 'chair-1', 'BD-5005', 'SF-3003')])
+    session.add(schema.CartItem(user_id=1004, model_num='gone-0', quantity=3))
+    session.commit()
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        data = cart_controller.system_get_all_user_cart_items(1004)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert len(statements) == 1
+    lines = data['carts'][1004]
+    assert [line['model_num'] for line in lines] == ['BD-5005', 'SF-3003', 'chair-0', 'chair-1', 'gone-0']
+    assert lines[-1] == {'user_id': 1004, 'model_num': 'gone-0', 'quantity': 3, 'stock_quantity': None}
+    assert lines[0]['stock_quantity'] == 5
+    assert data['total_price'] == sum(line.get('price', 0) for line in lines)
+    assert cart_controller.get_cart_item_full_details('gone-0') is None
@@ -144,7 +144,7 @@ def test_create_order_object(test_db):
     Tests the creation of an order object and verifies it is correctly stored in the database.
 
     Steps:
-    - Mocks required functions for retrieving user and cart details.
+    - Adds the ordered items to the catalog and mocks the user details.
     - Calls `add_order()` with valid order data.
     - Retrieves the created order from the database and verifies its details.
     """
@@ -164,16 +164,33 @@ def test_create_order_object(test_db):
         "user_full_name": "John Doe",
     }
 
+    # The ordered items must exist in the catalog
+    for model_num, category in (("chair-1", "Chair"), ("table-2", "Table")):
+        test_db.add(
+            schema.Furniture(
+                model_num=model_num,
+                model_name=model_num,
+                description="",
+                price=50.0,
+                dimensions={"width": 45},
+                category=category,
+                image_filename="item.jpg",
+                stock_quantity=5,
+                discount=0.0,
+                details={"material": "wood", "weight": 5, "color": "white"},
+            )
+        )
+    test_db.commit()
+
     with patch("schema.user.get_user_details", return_value=dummy_customer):
-        with patch("schema.cart.get_cart_item_full_details", return_value={"dummy_key": "dummy_value"}):
-            add_order(test_db, order_data)
+        add_order(test_db, order_data)
 
-            added_order = test_db.query(schema.Order).filter_by(user_id=1).first()
+        added_order = test_db.query(schema.Order).filter_by(user_id=1).first()
 
-            assert added_order is not None
-            assert added_order.user_id == 1
-            assert added_order.total_price == 150.00
-            assert added_order.shipping_address == "123 Test Street"
+        assert added_order is not None
+        assert added_order.user_id == 1
+        assert added_order.total_price == 150.00
+        assert added_order.shipping_address == "123 Test Street"
 
 
 def test_add_order_to_table():
@@ -0,0 +1,168 @@
+import pytest
+import http
+import schema
+from unittest.mock import patch
+import source.controller.catalog_cache as catalog_cache
+import source.controller.furniture_inventory as furniture_inventory
+
+
+@pytest.fixture
+def application():
+    import app
+
+    application = app.create_app({'database_url': f'sqlite:///:memory:'})  # Use in-memory DB for testing
+    yield application
+
+
+@pytest.fixture
+def client(application):
+    with application.test_client() as client:
+        yield client
+
+
+@pytest.fixture(autouse=True)
+def preprepared_data(application):
+    session = schema.session()
+    chair0 = schema.Furniture(
+        model_num='chair-0',
+        model_name='Yosef',
+        description='a nice chair',
+        price=100.0,
+        dimensions={"height": 90, "width": 45, "depth": 50},
+        category="Chair",
+        image_filename='classic_wooden_chair.jpg',
+        stock_quantity=3,
+        discount=0.0,
+        details={'material': 'wood', 'weight': 5, 'color': 'white'},
+    )
+    chair1 = schema.Furniture(
+        model_num='chair-1',
+        model_name='Haim',
+        description='a Very nice chair',
+        price=200.0,
+        dimensions={"height": 90, "width": 45, "depth": 50},
+        category="Chair",
+        image_filename='classic_wooden_chair.jpg',
+        stock_quantity=4,
+        discount=0.0,
+        details={'material': 'wood', 'weight': 6, 'color': 'white'},
+    )
+    bed = schema.Furniture(
+        model_num="BD-5005",
+        model_name="DreamComfort",
+        description="A luxurious memory foam bed with a sturdy solid wood frame.",
+        price=1200.0,
+        dimensions={"height": 50, "width": 160, "depth": 200},
+        category="Bed",
+        image_filename="memory_foam_bed.jpg",
+        stock_quantity=5,
+        discount=10.0,
+        details={"mattress_type": "Memory Foam", "frame_material": "Solid Wood"},
+    )
+
+    session.add_all([chair0, chair1, bed])
+    session.commit()
+    yield
+
+
+def test_items_served_from_cache(client):
+    """
+    Tests that once the catalog is cached, GET /items no longer opens a database session.
+
+    Steps:
+    1. Warm the cache with a first GET request.
+    2. Make schema.new_session() unusable and repeat the request with different filters.
+    3. Verify the filtered results are still returned correctly.
+    """
+    response = client.get('/items')
+    assert response.status_code == http.HTTPStatus.OK
+    assert len(response.get_json()['items']) == 3
+
+    with patch("schema.new_session", side_effect=AssertionError("catalog read hit the database")):
+        response = client.get('/items', query_string={"category": "Chair", "max_price": 150})
+        assert response.status_code == http.HTTPStatus.OK
+        assert list(response.get_json()['items']) == ['chair-0']
+
+        response = client.get('/items', query_string={"model_name": "DreamComfort"})
+        assert list(response.get_json()['items']) == ['BD-5005']
+
+        response = client.get('/items', query_string={"model_num": "chair-1"})
+        assert response.get_json()['items']['chair-1']['is_available'] is True
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda s: furniture_inventory.update_item_quantity(s, {"model_num": "chair-0", "stock_quantity": 0}),
+        lambda s: furniture_inventory.update_item_discount(s, {"model_num": "chair-0", "discount": 50.0}),
+        lambda s: furniture_inventory.system_update_item_quantity("chair-0", -3),
+        lambda s: furniture_inventory.delete_item(s, "chair-0"),
+    ],
+)
+def test_cache_invalidated_by_inventory_writes(client, mutate):
+    """
+    Tests that every furniture_inventory write makes the next GET /items reflect the change.
+    """
+    before = client.get('/items', query_string={"model_num": "chair-0"}).get_json()['items']
+
+    mutate(schema.session())
+
+    after = client.get('/items', query_string={"model_num": "chair-0"}).get_json()['items']
+    assert after != before
+
+
+def test_cache_invalidated_by_add_item(client):
+    """
+    Tests that a newly added item shows up in the cached catalog.
+    """
+    assert "C-202" not in client.get('/items').get_json()['items']
+
+    new_item = {
+        "model_num": "C-202",
+        "model_name": "ErgoChair",
+        "description": "An ergonomic office chair with lumbar support.",
+        "price": 350.0,
+        "dimensions": {"width": 50, "depth": 55, "height": 110},
+        "stock_quantity": 8,
+        "details": {"material": "fabric", "weight": 12, "color": "black"},
+        "image_filename": "ergonomic_office_chair.jpg",
+        "discount": 10.0,
+        "category": "Chair",
+    }
+    furniture_inventory.add_item(schema.session(), new_item)
+
+    items = client.get('/items', query_string={"category": "Chair"}).get_json()['items']
+    assert set(items) == {"chair-0", "chair-1", "C-202"}
+
+
+def test_cached_items_not_shared_with_response(client):
+    """
+    Tests that adding `is_available` to a response does not leak into the cached item.
+    """
+    client.get('/items', query_string={"model_num": "BD-5005"})
+    assert 'is_available' not in catalog_cache.get_items(model_num="BD-5005")["BD-5005"]
+
+
+def test_get_many_cold_and_cached(client):
+    """
+    Tests that a batch lookup uses one query while the catalog is not cached, and the cache once it is.
+    """
+    assert list(catalog_cache.get_many(["BD-5005", "missing", "chair-0"])) == ["BD-5005", "chair-0"]
+    assert catalog_cache._snapshot is None
+
+    client.get('/items')
+    with patch("schema.new_session", side_effect=AssertionError("catalog read hit the database")):
+        assert list(catalog_cache.get_many(["chair-1", "BD-5005"])) == ["chair-1", "BD-5005"]
+
+
+def test_get_stock_cold_and_cached(client):
+    """
+    Tests that stock lookups read the same values from the database and from the cached catalog.
+    """
+    cold = [catalog_cache.get_stock(["chair-1", "missing", "chair-0"]), catalog_cache.get_stock(category="Chair")]
+    assert cold == [{"chair-1": 4, "chair-0": 3}, {"chair-0": 3, "chair-1": 4}]
+    assert catalog_cache._snapshot is None
+
+    client.get('/items')
+    with patch("schema.new_session", side_effect=AssertionError("catalog read hit the database")):
+        assert [catalog_cache.get_stock(["chair-1", "missing", "chair-0"]), catalog_cache.get_stock(category="Chair")] == cold
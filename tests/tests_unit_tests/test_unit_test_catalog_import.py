@@ -0,0 +1,191 @@
+import contextlib
+import io
+import json
+import sqlite3
+import pytest
+import schema
+import source.controller.catalog_cache as catalog_cache
+import source.controller.catalog_import as catalog_import
+import source.controller.versions as versions
+
+CHAIR = {
+    "model_num": "chair-0",
+    "model_name": "Yosef",
+    "description": "a nice chair",
+    "price": 100.0,
+    "dimensions": {"height": 90, "width": 45, "depth": 50},
+    "stock_quantity": 3,
+    "details": {"material": "wood", "weight": 5, "color": "white"},
+    "image_filename": "chair.jpg",
+    "discount": 0.0,
+    "category": "Chair",
+}
+SOFA = {
+    "model_num": "SF-3003",
+    "model_name": "LuxComfort",
+    "price": 1200.0,
+    "dimensions": {"width": 220},
+    "details": {"upholstery": "Leather", "color": "Dark Gray"},
+    "image_filename": "sofa.jpg",
+    "discount": 10.0,
+    "category": "Sofa",
+}
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path):
+    schema.create(f"sqlite:///{tmp_path / 'import.db'}", echo=False)
+
+
+def ndjson(*records) -> io.StringIO:
+    return io.StringIO("".join((record if isinstance(record, str) else json.dumps(record)) + "\n" for record in records))
+
+
+def test_import_inserts_valid_rows_and_reports_the_others():
+    """
+    Tests that one import inserts every valid row and reports each rejected row with its line and reason.
+    """
+    catalog_cache.get_snapshot()
+    report = catalog_import.import_items(
+        ndjson(
+            CHAIR,
+            {**CHAIR, "model_num": "chair-1", "details": {"material": "stone", "weight": 5, "color": "white"}},
+            "{not json",
+            {**SOFA, "category": "Lamp"},
+            {**SOFA, "price": "cheap"},
+            SOFA,
+            {**SOFA, "model_name": "Again"},
+            {"model_num": "x-1"},
+        ),
+        'ndjson',
+        batch_size=2,
+    )
+
+    assert (report['total'], report['inserted'], report['error_count']) == (8, 2, 6)
+    assert report['errors'] == [
+        {'line': 2, 'model_num': "chair-1", 'error': "Invalid Chair details provided."},
+        {'line': 3, 'model_num': None, 'error': "Invalid JSON"},
+        {'line': 4, 'model_num': "SF-3003", 'error': "Unknown category: Lamp"},
+        {'line': 5, 'model_num': "SF-3003", 'error': "price must be a non-negative number"},
+        {'line': 7, 'model_num': "SF-3003", 'error': "Duplicate model_num in this import"},
+        {'line': 8, 'model_num': "x-1", 'error': "Missing fields: model_name, price, dimensions, details, image_filename, discount, category"},
+    ]
+
+    # The new items are visible at once, with their stored final price and search entry
+    items = catalog_cache.get_items()
+    assert items['chair-0']['final_price'] == 118.0
+    assert items['SF-3003']['final_price'] == 1274.4
+    assert items['SF-3003']['stock_quantity'] == 0
+
+
+def test_import_skips_existing_items():
+    catalog_import.import_items(ndjson(CHAIR), 'ndjson')
+    report = catalog_import.import_items(ndjson(SOFA, CHAIR), 'ndjson')
+    assert report['inserted'] == 1
+    assert report['errors'] == [{'line': 2, 'model_num': "chair-0", 'error': "Item already exists"}]
+
+
+def test_import_csv_with_worker_processes():
+    """
+    Tests a CSV import (the furniture export format) validated in worker processes.
+    """
+    lines = io.StringIO(
+        "model_num,model_name,description,price,dimensions,stock_quantity,details,category,image_filename,discount\n"
+        'chair-0,Yosef,a nice chair,100.0,"{""width"": 45}",3,"{""material"": ""wood"", ""weight"": 5, ""color"": ""white""}",Chair,chair.jpg,0.0\n'
+        'chair-1,Haim,,abc,"{""width"": 45}",3,{},Chair,chair.jpg,0.0\n'
+    )
+    report = catalog_import.import_items(lines, 'csv', workers=2)
+    assert report['inserted'] == 1
+    assert report['errors'] == [{'line': 3, 'model_num': None, 'error': "Invalid value for 'price': abc"}]
+
+    s = schema.session()
+    item = s.get(schema.Furniture, "chair-0")
+    assert (item.description, item.stock_quantity, item.details['weight']) == ("a nice chair", 3, 5)
+    s.close()
+
+
+def test_sync_writes_only_what_changed():
+    """
+    Tests that a sync inserts new items, updates changed ones, skips unchanged rows and deletes the items missing from the feed.
+    """
+    table = {
+        **SOFA,
+        "model_num": "T-1001",
+        "dimensions": {"shape": "rectangular", "length": 180, "width": 90, "is_extendable": True},
+        "details": {"material": "Wood"},
+        "category": "Table",
+    }
+    report = catalog_import.sync_items(ndjson(CHAIR, SOFA, table), 'ndjson')
+    assert (report['inserted'], report['updated'], report['unchanged'], report['deleted']) == (3, 0, 0, 0)
+
+    catalog_cache.get_snapshot()
+    report = catalog_import.sync_items(ndjson(CHAIR, {**SOFA, "price": 1000.0}, "{not json"), 'ndjson', delete_missing=False)
+    assert (report['updated'], report['unchanged'], report['deleted'], report['deletes_skipped']) == (1, 1, 0, True)
+    assert report['errors'] == [{'line': 3, 'model_num': None, 'error': "Invalid JSON"}]
+    assert catalog_cache.get_items()['SF-3003']['final_price'] == 1062.0
+
+    report = catalog_import.sync_items(ndjson(CHAIR, {**SOFA, "price": 1000.0}), 'ndjson', batch_size=1)
+    assert (report['total'], report['inserted'], report['updated'], report['unchanged']) == (2, 0, 0, 2)
+    assert report['changes'] == {'inserted': [], 'updated': [], 'deleted': ["T-1001"]}
+    assert set(catalog_cache.get_items()) == {"chair-0", "SF-3003"}
+
+
+def test_sync_keeps_items_when_a_row_cannot_be_read():
+    catalog_import.sync_items(ndjson(CHAIR, SOFA), 'ndjson')
+    report = catalog_import.sync_items(ndjson(CHAIR, "{not json"), 'ndjson')
+    assert (report['unchanged'], report['deleted'], report['deletes_skipped']) == (1, 0, True)
+    assert schema.session().get(schema.Furniture, "SF-3003") is not None
+
+
+def test_sync_keeps_the_store_stock_and_discount():
+    """
+    Tests that a changed feed row updates the supplier's columns but keeps the discount set in the store,
+    and the stock unless the row has one.
+    """
+    catalog_import.sync_items(ndjson(CHAIR, SOFA), 'ndjson')
+    s = schema.session()
+    sofa = s.get(schema.Furniture, "SF-3003")
+    (sofa.stock_quantity, sofa.discount) = (4, 50.0)
+    s.commit()
+    s.close()
+
+    report = catalog_import.sync_items(ndjson({**CHAIR, "stock_quantity": 7}, {**SOFA, "price": 1000.0}), 'ndjson')
+    assert report['changes']['updated'] == ["chair-0", "SF-3003"]
+    s = schema.session()
+    sofa = s.get(schema.Furniture, "SF-3003")
+    assert s.get(schema.Furniture, "chair-0").stock_quantity == 7
+    assert (sofa.price, sofa.stock_quantity, sofa.discount, sofa.final_price) == (1000.0, 4, 50.0, 590.0)
+    s.close()
+
+
+def test_sync_reports_items_inserted_meanwhile():
+    """
+    Tests that a new item added by another writer during a sync is reported instead of failing the sync.
+    """
+
+    def feed():
+        yield json.dumps(CHAIR) + "\n"
+        catalog_import.import_items(ndjson(SOFA), 'ndjson')
+        yield json.dumps(SOFA) + "\n"
+
+    report = catalog_import.sync_items(feed(), 'ndjson')
+    assert (report['inserted'], report['changes']['inserted']) == (1, ["chair-0"])
+    assert report['errors'] == [{'line': 2, 'model_num': "SF-3003", 'error': "Could not be inserted, retry the row"}]
+
+
+def test_cache_sees_changes_of_other_processes(tmp_path, monkeypatch):
+    """
+    Tests that the catalog cache and version notice a change committed by another connection, as by the command line import.
+    """
+    monkeypatch.setattr(versions, 'CATALOG_CHECK_INTERVAL', 0)
+    catalog_import.import_items(ndjson(CHAIR), 'ndjson')
+    assert catalog_cache.get_items()['chair-0']['stock_quantity'] == 3
+    version = versions.catalog()
+
+    with contextlib.closing(sqlite3.connect(tmp_path / 'import.db')) as connection:
+        connection.execute("UPDATE furniture SET stock_quantity = 9 WHERE model_num = 'chair-0'")
+        connection.commit()
+
+    assert versions.catalog() > version
+    assert catalog_cache.get_items()['chair-0']['stock_quantity'] == 9
+    assert catalog_cache.get_stock(['chair-0']) == {'chair-0': 9}
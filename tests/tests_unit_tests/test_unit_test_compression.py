@@ -0,0 +1,68 @@
+import gzip
+import flask
+import pytest
+from unittest.mock import patch
+import source.controller.compression as compression
+import source.controller.streaming as streaming
+
+BODY = {"items": {f"M-{i}": {"category": "Chair", "material": "wood"} for i in range(100)}}
+
+
+@pytest.fixture
+def client():
+    compression.clear_cache()
+    app = flask.Flask(__name__)
+    compression.install(app, min_size=100)
+
+    @app.route('/large')
+    def large():
+        response = flask.jsonify(BODY)
+        response.set_etag("catalog-1")
+        return response
+
+    @app.route('/small')
+    def small():
+        return flask.jsonify({"ok": True})
+
+    @app.route('/streamed')
+    def streamed():
+        return streaming.response({"items": streaming.Members(iter(BODY["items"].items()))})
+
+    @app.route('/text')
+    def text():
+        return "x" * 1000
+
+    yield app.test_client()
+
+
+def test_compresses_large_json(client):
+    plain = client.get('/large')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    response = client.get('/large', headers={"Accept-Encoding": "gzip, deflate"})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['ETag'] == '"catalog-1-gz"'
+    assert int(response.headers['Content-Length']) == len(response.data) < len(plain.data) / 5
+    assert gzip.decompress(response.data) == plain.data
+
+
+def test_skips_small_refused_and_non_json(client):
+    assert 'Content-Encoding' not in client.get('/small', headers={"Accept-Encoding": "gzip"}).headers
+    assert 'Content-Encoding' not in client.get('/large', headers={"Accept-Encoding": "gzip;q=0, br"}).headers
+    assert 'Content-Encoding' not in client.get('/text', headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_compressed_body_cached_by_etag(client):
+    first = client.get('/large', headers={"Accept-Encoding": "gzip"})
+    with patch("gzip.compress", side_effect=AssertionError("compressed twice")):
+        second = client.get('/large', headers={"Accept-Encoding": "gzip"})
+    assert second.data == first.data
+
+
+def test_compresses_streamed_json(client):
+    plain = client.get('/streamed')
+    response = client.get('/streamed', headers={"Accept-Encoding": "gzip"})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert gzip.decompress(response.data) == plain.data
@@ -0,0 +1,88 @@
+import csv
+import json
+import pytest
+import schema
+import source.cli as cli
+import source.controller.export as export
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'export.db'}"
+    schema.create(url, echo=False)
+    s = schema.session()
+    s.add_all(
+        [
+            schema.Furniture(
+                model_num="chair-0",
+                model_name="Yosef",
+                price=100.0,
+                category="Chair",
+                image_filename="chair.jpg",
+                stock_quantity=3,
+                discount=0.0,
+                details={"material": "wood", "color": "white"},
+            ),
+            schema.CartItem(user_id=1002, model_num="chair-0", quantity=2),
+        ]
+    )
+    s.commit()
+    s.close()
+    yield url
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("2025-03-01", "2025-03-01T00:00:00.000Z"),
+        ("2025-03-01T10:30:00.5", "2025-03-01T10:30:00.500Z"),
+        ("2025-03-01T12:30:00+02:00", "2025-03-01T10:30:00.000Z"),
+        ("2025-03-01T10:30:00Z", "2025-03-01T10:30:00.000Z"),
+    ],
+)
+def test_parse_since(value, expected):
+    assert export.parse_since(value) == expected
+
+
+def test_rows_stamped_on_insert_and_update(database_url):
+    """
+    Tests that the triggers stamp updated_at on insert, and again on every update, including plain SQL ones.
+    """
+    (first,) = [record['updated_at'] for record in export.records('furniture')]
+    assert first is not None
+    assert list(export.records('furniture', since=first)) != []
+
+    with schema._engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE furniture SET stock_quantity = 0, updated_at = '2000-01-01T00:00:00.000Z'")
+    assert [record['updated_at'] for record in export.records('furniture')] == ['2000-01-01T00:00:00.000Z']
+    assert list(export.records('furniture', since=export.parse_since("2001-01-01"))) == []
+
+    with schema._engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE furniture SET stock_quantity = 1")
+    assert [record['updated_at'] for record in export.records('furniture')][0] >= first
+
+
+def test_cli_export_csv(database_url, tmp_path):
+    """
+    Tests that the CLI writes a CSV export with JSON columns as JSON text.
+    """
+    output = tmp_path / "furniture.csv"
+    assert cli.main(["--database-url", database_url, "export", "furniture", "--format", "csv", "--output", str(output)]) == 0
+
+    with open(output, newline='', encoding='utf-8') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 1
+    assert rows[0]['model_num'] == "chair-0"
+    assert rows[0]['final_price'] == "118.0"
+    assert json.loads(rows[0]['details']) == {"material": "wood", "color": "white"}
+
+
+def test_cli_export_ndjson_to_stdout(database_url, capsys):
+    assert cli.main(["--database-url", database_url, "export", "cart_items"]) == 0
+    (line,) = capsys.readouterr().out.splitlines()
+    assert {key: value for key, value in json.loads(line).items() if key != 'updated_at'} == {"user_id": 1002, "model_num": "chair-0", "quantity": 2}
+
+
+def test_cli_invalid_since(database_url, capsys):
+    assert cli.main(["--database-url", database_url, "export", "orders", "--since", "soon"]) == 2
+    assert "--since" in capsys.readouterr().err
@@ -0,0 +1,76 @@
+import flask
+import pytest
+from sqlalchemy import create_engine, text
+import source.controller.instrumentation as instrumentation
+
+
+@pytest.fixture
+def client():
+    instrumentation.reset()
+    engine = create_engine('sqlite:///:memory:')
+    app = flask.Flask(__name__)
+    instrumentation.install(app, debug_headers=True)
+
+    @app.route('/one')
+    def one():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return flask.jsonify({"ok": True})
+
+    @app.route('/repeated')
+    def repeated():
+        with engine.connect() as connection:
+            for value in range(instrumentation.REPEAT_THRESHOLD):
+                connection.execute(text("SELECT :value"), {"value": value})
+        return flask.jsonify({"ok": True})
+
+    yield app.test_client()
+    instrumentation.reset()
+    engine.dispose()
+
+
+def test_counts_statements_per_request(client):
+    response = client.get('/one')
+    assert response.headers['X-SQL-Count'] == '1'
+    assert float(response.headers['X-SQL-Time-Ms']) >= 0
+    assert 'X-SQL-N-Plus-One' not in response.headers
+
+
+def test_reports_repeated_statement(client):
+    response = client.get('/repeated')
+    assert response.headers['X-SQL-Count'] == str(instrumentation.REPEAT_THRESHOLD)
+    assert response.headers['X-SQL-N-Plus-One'] == f"{instrumentation.REPEAT_THRESHOLD}x SELECT ?"
+
+
+def test_metrics_aggregate_per_endpoint(client):
+    client.get('/one')
+    client.get('/one')
+    client.get('/repeated')
+    metrics = instrumentation.metrics()
+    assert metrics['endpoints']['GET /one']['requests'] == 2
+    assert metrics['endpoints']['GET /one']['statements'] == 2
+    assert metrics['endpoints']['GET /one']['n_plus_one_requests'] == 0
+    assert metrics['endpoints']['GET /repeated']['n_plus_one_requests'] == 1
+    assert metrics['repeated'] == [{'endpoint': 'GET /repeated', 'statement': 'SELECT ?', 'count': instrumentation.REPEAT_THRESHOLD}]
+    assert len(metrics['slowest']) == instrumentation.SLOWEST
+
+    instrumentation.reset()
+    assert instrumentation.metrics() == {'endpoints': {}, 'repeated': [], 'slowest': []}
+
+
+def test_no_headers_without_debug():
+    app = flask.Flask(__name__)
+    instrumentation.install(app)
+    app.add_url_rule('/plain', 'plain', lambda: "ok")
+    response = app.test_client().get('/plain')
+    assert 'X-SQL-Count' not in response.headers
+    instrumentation.reset()
+
+
+def test_n_plus_one_threshold():
+    stats = instrumentation.RequestStats()
+    for _ in range(instrumentation.REPEAT_THRESHOLD - 1):
+        stats.record("SELECT a", 0.001)
+    assert stats.n_plus_one() == {}
+    stats.record("SELECT a", 0.001)
+    assert stats.n_plus_one() == {"SELECT a": instrumentation.REPEAT_THRESHOLD}
@@ -392,3 +392,103 @@ def test_delete_item(client):
     assert response.status_code == http.HTTPStatus.OK
     data = response.get_json()
     assert data == {'items': {}}
+
+
+def test_filter_extendable_glass_tables(client):
+    """
+    Test filtering tables on a material in `details` and a flag in `dimensions`.
+
+    Steps:
+    1. Add an extendable and a fixed glass table, and an extendable wooden one.
+    2. Send a GET request for extendable glass tables.
+    3. Verify only the extendable glass table is returned.
+    """
+    tables = [("TB-1", "glass", True), ("TB-2", "glass", False), ("TB-3", "wood", True)]
+    for model_num, material, is_extendable in tables:
+        new_item = {
+            "model_num": model_num,
+            "model_name": "Dinner",
+            "description": "A dining table.",
+            "price": 500.0,
+            "dimensions": {"shape": "rectangular", "length": 160, "width": 90, "is_extendable": is_extendable},
+            "stock_quantity": 2,
+            "details": {"material": material},
+            "image_filename": "table.jpg",
+            "discount": 0.0,
+            "category": "Table",
+        }
+        response = client.post('/admin/add_item', json=new_item)
+        assert response.status_code == http.HTTPStatus.OK
+
+    response = client.get('/items', query_string={"category": "Table", "details.material": "glass", "dimensions.is_extendable": "true"})
+    assert response.status_code == http.HTTPStatus.OK
+    assert list(response.get_json()["items"]) == ["TB-1"]
+
+    response = client.get('/items', query_string={"dimensions.shape": "Rectangular", "dimensions.length_min": 150})
+    assert list(response.get_json()["items"]) == ["TB-1", "TB-2", "TB-3"]
+
+
+def test_bulk_update_discount(client):
+    """
+    Test updating the discounts of a list of items, then of a selection, in one request each.
+
+    Steps:
+    1. Set different discounts on both chairs and a missing model number, and verify the missing one is reported.
+    2. Set one discount on every wooden chair lighter than 6 kg.
+    3. Verify the discounts and final prices via GET requests, and that an out-of-range discount is rejected.
+    """
+    items = [{"model_num": "chair-0", "discount": 10.0}, {"model_num": "chair-1", "discount": 20.0}, {"model_num": "nope", "discount": 5.0}]
+    response = client.post('/admin/bulk_update_discount', json={"items": items})
+    assert response.status_code == http.HTTPStatus.OK
+    assert response.get_json() == {'updated': 2, 'missing': ["nope"]}
+
+    response = client.get('/items', query_string={"category": "Chair"})
+    items = response.get_json()["items"]
+    assert (items["chair-0"]["final_price"], items["chair-1"]["final_price"]) == (106.2, 188.8)
+
+    selection = {"category": "Chair", "attributes": {"details.material": "wood", "details.weight_max": 5}}
+    response = client.post('/admin/bulk_update_discount', json={"filter": selection, "discount": 50.0})
+    assert response.get_json() == {'updated': 1, 'missing': []}
+    response = client.get('/items', query_string={"category": "Chair"})
+    items = response.get_json()["items"]
+    assert (items["chair-0"]["discount"], items["chair-0"]["final_price"], items["chair-1"]["discount"]) == (50.0, 59.0, 20.0)
+
+    response = client.post('/admin/bulk_update_discount', json={"items": [{"model_num": "chair-0", "discount": 100.0}]})
+    assert response.status_code == http.HTTPStatus.BAD_REQUEST
+
+
+def test_bulk_update_quantity(client):
+    """
+    Test updating the stock quantities of a list of items, then of a whole category.
+    """
+    items = [{"model_num": "chair-0", "stock_quantity": 10}, {"model_num": "BD-5005", "stock_quantity": 1}]
+    response = client.post('/admin/bulk_update_quantity', json={"items": items})
+    assert response.get_json() == {'updated': 2, 'missing': []}
+
+    response = client.post('/admin/bulk_update_quantity', json={"filter": {"category": "Chair"}, "stock_quantity": 0})
+    assert response.get_json() == {'updated': 2, 'missing': []}
+
+    response = client.get('/items')
+    assert {model_num: item["stock_quantity"] for model_num, item in response.get_json()["items"].items()} == {
+        "chair-0": 0,
+        "chair-1": 0,
+        "BD-5005": 1,
+    }
+
+    for payload in (
+        {"filter": {"colour": "red"}, "stock_quantity": 1},
+        {"filter": {"category": ["Chair"]}, "stock_quantity": 1},
+        {"filter": {"model_name": 5}, "stock_quantity": 1},
+        {"filter": {"max_final_price": "cheap"}, "stock_quantity": 1},
+        {"filter": {}, "stock_quantity": 0},
+        {"filter": {"category": None, "attributes": {}}, "stock_quantity": 0},
+        {"filter": {}, "stock_quantity": 0, "all": "yes"},
+        {"items": [{"model_num": "chair-0", "stock_quantity": -1}]},
+        {},
+    ):
+        response = client.post('/admin/bulk_update_quantity', json=payload)
+        assert response.status_code == http.HTTPStatus.BAD_REQUEST
+    assert client.get('/items').get_json()["items"]["BD-5005"]["stock_quantity"] == 1
+
+    response = client.post('/admin/bulk_update_quantity', json={"filter": {}, "stock_quantity": 2, "all": True})
+    assert response.get_json() == {'updated': 3, 'missing': []}
@@ -0,0 +1,68 @@
+import pytest
+import schema
+import source.controller.catalog_cache as catalog_cache
+import source.controller.pricing as pricing
+
+
+@pytest.fixture(autouse=True)
+def database(tmp_path):
+    schema.create(f"sqlite:///{tmp_path / 'pricing.db'}", echo=False)
+    s = schema.session()
+    for model_num, price, stock_quantity, details in (
+        ("chair-0", 100.0, 2, {"material": "fabric", "weight": 5, "color": "white"}),
+        ("chair-1", 200.0, 1, {"material": "wood", "weight": 5, "color": "white"}),
+    ):
+        chair = schema.Furniture.new(model_num, "Yosef", "", price, {"width": 45}, stock_quantity, details, "chair.jpg", 0.0, "Chair")
+        s.add(chair)
+    s.add(schema.Furniture.new("SF-3003", "LuxComfort", "", 1000.0, {"width": 220}, 3, {"upholstery": "leather"}, "sofa.jpg", 10.0, "Sofa"))
+    s.commit()
+    s.close()
+
+
+def test_preview_reports_new_prices_without_writing():
+    rules = pricing.parse_rules(
+        [{"category": "Sofa", "discount": 15}, {"category": "Chair", "attributes": {"details.material": "Fabric"}, "discount": 15}]
+    )
+    report = pricing.reprice(rules)
+
+    assert (report['matched'], report['changed'], report['applied']) == (2, 2, 0)
+    assert report['items'] == [
+        {'model_num': "SF-3003", 'discount': 10.0, 'new_discount': 15.0, 'final_price': 1062.0, 'new_final_price': 1003.0, 'margin_delta': -50.0},
+        {'model_num': "chair-0", 'discount': 0.0, 'new_discount': 15.0, 'final_price': 118.0, 'new_final_price': 100.3, 'margin_delta': -15.0},
+    ]
+    assert report['margin_delta'] == -180.0
+    assert report['stock_value_delta'] == pytest.approx(-212.4)
+    assert schema.session().get(schema.Furniture, "chair-0").discount == 0.0
+
+
+def test_apply_writes_discounts_and_final_prices():
+    catalog_cache.get_snapshot()
+    # Later rules win where rules overlap
+    report = pricing.reprice(pricing.parse_rules([{"discount": 20}, {"model_nums": ["chair-1"], "discount": 0}]), apply=True)
+    assert (report['matched'], report['changed'], report['applied']) == (3, 2, 2)
+
+    items = catalog_cache.get_items()
+    for model_num in ("chair-0", "chair-1", "SF-3003"):
+        s = schema.session()
+        item = s.get(schema.Furniture, model_num)
+        assert item.final_price == item.calculate_final_price() == items[model_num]['final_price']
+        s.close()
+    assert (items["chair-0"]['discount'], items["chair-1"]['discount']) == (20.0, 0.0)
+
+
+@pytest.mark.parametrize(
+    "rules",
+    [
+        [],
+        [{"discount": 100}],
+        [{"discount": True}],
+        [{"discount": 5, "colour": "red"}],
+        [{"discount": 5, "attributes": {"material": "wood"}}],
+        [{"discount": 10, "category": ["Chair"]}],
+        [{"discount": 10, "max_price": "500"}],
+        [{"discount": 10, "min_final_price": True}],
+    ],
+)
+def test_malformed_rules_are_rejected(rules):
+    with pytest.raises(ValueError):
+        pricing.parse_rules(rules)
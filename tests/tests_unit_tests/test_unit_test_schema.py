@@ -0,0 +1,259 @@
+import sqlite3
+import pytest
+import schema
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import load_only
+
+
+@pytest.fixture
+def legacy_database(tmp_path):
+    """
+    Creates a database file with the furniture table as it was before the final_price column existed.
+    """
+    path = tmp_path / "legacy.db"
+    connection = sqlite3.connect(path)
+    connection.execute(
+        "CREATE TABLE furniture (model_num VARCHAR NOT NULL PRIMARY KEY, model_name VARCHAR NOT NULL, description VARCHAR, "
+        "price FLOAT NOT NULL, dimensions JSON, stock_quantity INTEGER NOT NULL, details JSON, category VARCHAR NOT NULL, "
+        "image_filename VARCHAR NOT NULL, discount FLOAT NOT NULL)"
+    )
+    connection.execute(
+        "INSERT INTO furniture VALUES ('BD-5005', 'DreamComfort', 'A bed', 1200.0, '{\"width\": 160}', 5, "
+        "'{\"mattress_type\": \"Memory Foam\"}', 'Bed', 'bed.jpg', 10.0)"
+    )
+    connection.commit()
+    connection.close()
+    yield path
+
+
+def test_create_upgrades_legacy_database(legacy_database):
+    """
+    Tests that opening an existing database adds the final_price column and the missing indexes, and backfills final_price.
+    """
+    schema.create(f"sqlite:///{legacy_database}", echo=False)
+
+    s = schema.session()
+    item = s.get(schema.Furniture, "BD-5005")
+    assert item.final_price == 1274.4
+    assert s.query(schema.Furniture.model_num).filter(schema.Furniture.details_mattress_type == "memory foam").all() == [("BD-5005",)]
+    s.close()
+
+    connection = sqlite3.connect(legacy_database)
+    indexes = {row[1] for row in connection.execute("PRAGMA index_list('furniture')")}
+    connection.close()
+    assert {
+        "ix_furniture_final_price_model_num",
+        "ix_furniture_category_price",
+        "ix_furniture_model_name",
+        "ix_furniture_details_material",
+    } <= indexes
+
+
+def test_create_indexes_legacy_database_for_search(legacy_database):
+    """
+    Tests that opening an existing database builds the full-text search index from the rows already stored.
+    """
+    schema.create(f"sqlite:///{legacy_database}", echo=False)
+
+    connection = sqlite3.connect(legacy_database)
+    rows = connection.execute("SELECT model_num FROM furniture_fts WHERE furniture_fts MATCH 'dream*'").fetchall()
+    connection.close()
+    assert rows == [("BD-5005",)]
+
+
+def test_final_price_maintained_on_write(tmp_path):
+    """
+    Tests that the stored final price is computed on insert and recomputed when the discount changes.
+    """
+    schema.create(f"sqlite:///{tmp_path / 'new.db'}", echo=False)
+    s = schema.session()
+    s.add(
+        schema.Furniture(
+            model_num='chair-0',
+            model_name='Yosef',
+            price=100.0,
+            category="Chair",
+            image_filename='chair.jpg',
+            stock_quantity=3,
+            discount=0.0,
+        )
+    )
+    s.commit()
+
+    item = s.get(schema.Furniture, 'chair-0')
+    assert item.final_price == 118.0
+
+    item.discount = 50.0
+    s.commit()
+    assert s.get(schema.Furniture, 'chair-0').final_price == 59.0
+    s.close()
+
+
+def test_to_dict_serializes_loaded_columns(tmp_path):
+    """
+    Tests that to_dict returns the loaded columns only, and that its JSON values are copies.
+    """
+    schema.create(f"sqlite:///{tmp_path / 'new.db'}", echo=False)
+    s = schema.session()
+    s.add(
+        schema.Furniture(
+            model_num='chair-0',
+            model_name='Yosef',
+            price=100.0,
+            category="Chair",
+            image_filename='chair.jpg',
+            stock_quantity=3,
+            discount=0.0,
+            details={'material': 'wood', 'tags': ['a']},
+        )
+    )
+    s.commit()
+    s.close()
+
+    s = schema.session()
+    item = s.get(schema.Furniture, 'chair-0')
+    result = item.to_dict()
+    assert list(result) == [
+        'model_num',
+        'model_name',
+        'description',
+        'price',
+        'dimensions',
+        'stock_quantity',
+        'details',
+        'category',
+        'image_filename',
+        'discount',
+        'final_price',
+    ]
+    result['details']['tags'].append('b')
+    assert item.details == {'material': 'wood', 'tags': ['a']}
+    s.close()
+
+    s = schema.session()
+    item = s.query(schema.Furniture).options(load_only(schema.Furniture.model_name)).one()
+    s.expire(item, ['model_name'])
+    assert item.to_dict() == {'model_num': 'chair-0'}
+    s.close()
+
+
+def test_read_session_uses_replica(tmp_path):
+    """
+    Tests that read sessions go to the read-only replica, which sees committed writes but cannot write.
+    """
+    path = tmp_path / 'primary.db'
+    schema.create(f"sqlite:///{path}", echo=False, read_database_url=f"sqlite:///file:{path}?mode=ro&uri=true")
+    s = schema.session()
+    s.add(schema.User(user_id=1, user_name='JaneSmith', role='user'))
+    s.commit()
+    s.close()
+
+    s = schema.read_session()
+    assert s.get_bind() is schema._read_engine is not schema._engine
+    assert [user.user_name for user in s.query(schema.User)] == ['JaneSmith']
+    s.add(schema.User(user_id=2, user_name='JohnDoe', role='user'))
+    with pytest.raises(OperationalError, match="readonly"):
+        s.commit()
+    s.close()
+
+
+@pytest.mark.parametrize(
+    "sql, expected_index",
+    [
+        ("SELECT * FROM furniture WHERE category = 'Chair' AND price < 500", "ix_furniture_category_price"),
+        ("SELECT * FROM furniture WHERE model_name = 'Yosef'", "ix_furniture_model_name"),
+        ('SELECT * FROM "order" WHERE user_id = 1002 ORDER BY creation_time DESC', "ix_order_user_id_creation_time"),
+        ('SELECT * FROM "order" WHERE status = \'PENDING\' ORDER BY creation_time DESC', "ix_order_status_creation_time"),
+        ('SELECT * FROM "order" ORDER BY creation_time DESC', "ix_order_creation_time"),
+        ("SELECT * FROM users WHERE email = 'janesmith@example.com'", "ix_users_email"),
+        (
+            "SELECT * FROM furniture WHERE (final_price, model_num) > (100.0, 'a') ORDER BY final_price, model_num LIMIT 3",
+            "ix_furniture_final_price_model_num",
+        ),
+        ("SELECT * FROM furniture WHERE details_material = 'Wood'", "ix_furniture_details_material"),
+        ("SELECT * FROM furniture WHERE dimensions_width <= 40", "ix_furniture_dimensions_width"),
+    ],
+)
+def test_listing_queries_use_indexes(tmp_path, sql, expected_index):
+    """
+    Tests that the queries behind the listing endpoints are answered from the declared indexes.
+    """
+    schema.create(f"sqlite:///{tmp_path / 'plans.db'}", echo=False)
+    with schema._engine.connect() as connection:
+        plan = " ".join(row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + sql))
+    assert expected_index in plan
+
+
+def test_request_session_is_shared_and_closed(tmp_path):
+    """
+    Tests that the controllers of one request share a session, and a read session, which are closed when the request ends.
+    """
+    import flask
+
+    schema.create(f"sqlite:///{tmp_path / 'new.db'}", echo=False)
+    app = flask.Flask(__name__)
+    schema.install(app)
+    with app.test_request_context():
+        s = schema.session()
+        assert schema.session() is s
+        assert s.query(schema.Furniture).all() == []
+        assert s.in_transaction()
+        read = schema.read_session()
+        assert schema.read_session() is read is not s
+        assert read.query(schema.User).all() == []
+        assert read.in_transaction()
+    assert not s.in_transaction()
+    assert not read.in_transaction()
+    assert schema.session() is not schema.session()
+    assert schema.read_session() is not schema.read_session()
+
+
+def test_transaction_commits_once_and_bumps_versions_after(tmp_path):
+    """
+    Tests that commits inside schema.transaction() are deferred to its end, with the version bumps,
+    and that a failing block rolls back the work of every controller called inside.
+    """
+    import flask
+    import source.controller.furniture_inventory as furniture_inventory
+    import source.controller.versions as versions
+
+    schema.create(f"sqlite:///{tmp_path / 'new.db'}", echo=False)
+    s = schema.session()
+    s.add(
+        schema.Furniture(
+            model_num='chair-0', model_name='Yosef', price=100.0, category="Chair", image_filename='chair.jpg', stock_quantity=3, discount=0.0
+        )
+    )
+    s.commit()
+    s.close()
+
+    app = flask.Flask(__name__)
+    schema.install(app)
+    with app.test_request_context():
+        version = versions.catalog()
+        with pytest.raises(RuntimeError):
+            with schema.transaction():
+                furniture_inventory.system_update_item_quantity('chair-0', -1)
+                assert versions.catalog() == version
+                raise RuntimeError("payment declined")
+
+        with schema.transaction():
+            furniture_inventory.system_update_item_quantity('chair-0', -2)
+        assert versions.catalog() > version
+
+    s = schema.new_session()
+    assert s.get(schema.Furniture, 'chair-0').stock_quantity == 1
+    s.close()
+
+
+def test_sqlite_profile_sets_pragmas_on_every_connection(tmp_path):
+    schema.create(f"sqlite:///{tmp_path / 'new.db'}", echo=False, sqlite_profile='performance')
+    for _ in range(2):
+        connection = schema._engine.raw_connection()
+        pragmas = {name: connection.execute(f"PRAGMA {name}").fetchone()[0] for name in ('journal_mode', 'synchronous', 'cache_size', 'busy_timeout')}
+        connection.close()
+        assert pragmas == {'journal_mode': 'wal', 'synchronous': 1, 'cache_size': -65536, 'busy_timeout': 5000}
+        schema._engine.dispose()
+
+    with pytest.raises(ValueError):
+        schema.create(f"sqlite:///{tmp_path / 'new.db'}", echo=False, sqlite_profile={'locking_mode': 'EXCLUSIVE'})
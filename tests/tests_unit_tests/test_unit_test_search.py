@@ -0,0 +1,97 @@
+import sqlite3
+import pytest
+import schema
+import source.controller.search as search
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "search.db"
+    schema.create(f"sqlite:///{path}", echo=False)
+    s = schema.session()
+    s.add_all(
+        [
+            schema.Furniture(
+                model_num="SF-3003",
+                model_name="LuxComfort",
+                description="A luxurious three-seater sofa.",
+                price=1200.0,
+                category="Sofa",
+                image_filename="sofa.jpg",
+                stock_quantity=5,
+                discount=10.0,
+                details={"upholstery": "Top-Grain Leather", "color": "Dark Gray"},
+            ),
+            schema.Furniture(
+                model_num="BD-5005",
+                model_name="DreamComfort",
+                description="A memory foam bed.",
+                price=1200.0,
+                category="Bed",
+                image_filename="bed.jpg",
+                stock_quantity=5,
+                discount=10.0,
+                details={"frame_material": "Solid Wood"},
+            ),
+        ]
+    )
+    s.commit()
+    s.close()
+    yield path
+
+
+def search_model_nums(query: str) -> list:
+    s = schema.session()
+    results = [item.model_num for item in search.search_items(s, search.match_expression(query), limit=10)]
+    s.close()
+    return results
+
+
+@pytest.mark.parametrize(
+    "query, expected",
+    [
+        ("leather", "\"leather\"*"),
+        ("Dark  gray!", "\"Dark\"* \"gray\"*"),
+        ('sofa" OR NEAR(', "\"sofa\"* \"OR\"* \"NEAR\"*"),
+        ("  ", None),
+    ],
+)
+def test_match_expression(query, expected):
+    """
+    Tests that user input is turned into quoted prefix terms, so FTS5 syntax in it is never interpreted.
+    """
+    assert search.match_expression(query) == expected
+
+
+def test_index_follows_writes(database):
+    """
+    Tests that the triggers keep the index in sync with inserts, updates of details and deletes.
+    """
+    assert search_model_nums("leather") == ["SF-3003"]
+    assert search_model_nums("dream") == ["BD-5005"]
+    assert search_model_nums("wood") == ["BD-5005"]
+
+    s = schema.session()
+    sofa = s.get(schema.Furniture, "SF-3003")
+    sofa.details = {"upholstery": "Velvet", "color": "Green"}
+    s.delete(s.get(schema.Furniture, "BD-5005"))
+    s.commit()
+    s.close()
+
+    assert search_model_nums("leather") == []
+    assert search_model_nums("velvet green") == ["SF-3003"]
+    assert search_model_nums("dream") == []
+
+
+def test_install_rebuilds_stale_index(database):
+    """
+    Tests that opening a database whose index is out of step with the furniture table rebuilds it.
+    """
+    connection = sqlite3.connect(database)
+    connection.execute("DELETE FROM furniture_fts")
+    connection.commit()
+    connection.close()
+    assert search_model_nums("leather") == []
+
+    schema.create(f"sqlite:///{database}", echo=False)
+    assert search_model_nums("leather") == ["SF-3003"]
@@ -0,0 +1,64 @@
+import json
+import flask
+import pytest
+import source.controller.streaming as streaming
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    app.json.sort_keys = False
+    return app
+
+
+def test_response_matches_jsonify(app, monkeypatch):
+    """
+    Tests that a streamed document is the JSON `flask.jsonify` would produce.
+
+    A tiny chunk size makes the body arrive in many chunks.
+    """
+    monkeypatch.setattr(streaming, "CHUNK_SIZE", 8)
+    items = {"b": {"price": 1.5, "tags": ["x", "ü"]}, "a": None, 3: {"nested": {"k": True}}}
+    with app.test_request_context():
+        expected = flask.jsonify({"items": items, "total": 3}).get_data(as_text=True)
+        response = streaming.response({"items": streaming.Members(iter(items.items())), "total": 3})
+        chunks = list(response.response)
+
+    assert len(chunks) > 1
+    # Byte for byte, with jsonify's compact separators, but for its trailing newline
+    assert "".join(chunks) == expected.rstrip("\n")
+    assert json.loads("".join(chunks)) == json.loads(expected)
+    assert list(json.loads("".join(chunks))["items"]) == ["b", "a", "3"]
+
+
+def test_response_empty_members(app):
+    with app.test_request_context():
+        response = streaming.response({"orders": streaming.Members(iter(()))})
+        assert "".join(response.response) == '{"orders":{}}'
+
+
+def test_rows_closes_session():
+    """Tests that the session is closed once the rows are consumed, or when the stream is abandoned."""
+
+    class Session:
+        closed = False
+
+        def expunge(self, row):
+            pass
+
+        def close(self):
+            self.closed = True
+
+    class Query:
+        def yield_per(self, count):
+            return iter(range(3))
+
+    session = Session()
+    assert list(streaming.rows(session, Query(), lambda row: (row, row * 2))) == [(0, 0), (1, 2), (2, 4)]
+    assert session.closed
+
+    session = Session()
+    rows = streaming.rows(session, Query(), lambda row: (row, row))
+    next(rows)
+    rows.close()
+    assert session.closed
@@ -47,7 +47,7 @@ class TestCheckoutService(unittest.TestCase):
         self.cart_patch = patch("source.controller.cart.system_get_all_user_cart_items")
         self.user_patch = patch("source.controller.user.get_user_details")
         self.order_patch = patch("source.controller.order.add_order")
-        self.inventory_patch = patch("source.controller.furniture_inventory.system_update_item_quantity")
+        self.inventory_patch = patch("source.controller.furniture_inventory.system_update_item_quantities")
 
         # Start patches
         self.mock_cart_controller = self.cart_patch.start()
@@ -102,19 +102,19 @@ class TestCheckoutService(unittest.TestCase):
     @patch("source.controller.cart.system_get_all_user_cart_items")
     @patch("source.controller.user.get_user_details")
     @patch("source.controller.order.add_order")
-    @patch("source.controller.furniture_inventory.system_update_item_quantity")
+    @patch("source.controller.furniture_inventory.system_update_item_quantities")
     @patch("schema.session")  # Mock database session
-    @patch("source.controller.cart.get_cart_item_full_details")  # Mock this function properly
-    def test_checkout_success(
-        self, mock_get_cart_item_details, mock_schema_session, mock_update_inventory, mock_add_order, mock_get_user, mock_get_cart
-    ) -> None:
+    def test_checkout_success(self, mock_schema_session, mock_update_inventory, mock_add_order, mock_get_user, mock_get_cart) -> None:
         """Test successful checkout process with all valid parameters."""
 
         # Mock the database session
         mock_schema_session.return_value = MagicMock()  # Prevent 'NoneType' error
 
         # Mock the cart response
-        mock_get_cart.return_value = {"carts": {1: [{"model_num": 1, "quantity": 2}, {"model_num": 2, "quantity": 1}]}, "total_price": 150.0}
+        mock_get_cart.return_value = {
+            "carts": {1: [{"model_num": 1, "quantity": 2, "stock_quantity": 10}, {"model_num": 2, "quantity": 1, "stock_quantity": 10}]},
+            "total_price": 150.0,
+        }
 
         # Mock the user response
         mock_get_user.return_value = {"user_name": "John Doe", "email": "johndoe@example.com"}
@@ -125,9 +125,6 @@ class TestCheckoutService(unittest.TestCase):
         # Mock payment processing
         self.mock_payment_strategy.process_payment.return_value = True
 
-        # Mock `get_cart_item_full_details` to return a valid object
-        mock_get_cart_item_details.side_effect = lambda model_num: {model_num: {"stock_quantity": 10, "discount": 0.1}}  # Simulating real structure
-
         # Execute checkout
         result = self.checkout_service.checkout(user_id=1, address="123 Main St")
 
@@ -299,20 +296,18 @@ class TestCheckoutService(unittest.TestCase):
         self.assertIn("Invalid address", str(context.exception.description))
 
     @patch("schema.session")  # Mock database session
-    @patch("source.controller.cart.delete_cart_item")  # Mock delete_cart_item function
+    @patch("source.controller.cart.delete_cart_items")  # Mock delete_cart_items function
     @patch("source.controller.cart.system_get_all_user_cart_items")  # Mock getting cart items
     @patch("source.controller.user.get_user_details")  # Mock getting user details
     @patch("source.controller.order.add_order")  # Mock order creation
-    @patch("source.controller.furniture_inventory.system_update_item_quantity")  # Mock inventory update
-    @patch("source.controller.cart.get_cart_item_full_details")  # FIX: Mock get_cart_item_full_details
+    @patch("source.controller.furniture_inventory.system_update_item_quantities")  # Mock inventory update
     def test_cart_items_deleted_after_checkout(
         self,
-        mock_get_cart_item_details,
         mock_update_inventory,
         mock_add_order,
         mock_get_user,
         mock_get_cart,
-        mock_delete_cart_item,
+        mock_delete_cart_items,
         mock_schema_session,
     ) -> None:
         """
@@ -320,7 +315,7 @@ class TestCheckoutService(unittest.TestCase):
 
         Expected Outcome:
         - The checkout process completes successfully.
-        - `delete_cart_item()` is called once for each item in the cart.
+        - `delete_cart_items()` is called once with every item in the cart.
         - The order is successfully placed.
         """
 
@@ -328,7 +323,10 @@ class TestCheckoutService(unittest.TestCase):
         mock_schema_session.return_value = MagicMock()
 
         # Mock cart contents
-        mock_get_cart.return_value = {"carts": {1: [{"model_num": 1, "quantity": 2}, {"model_num": 2, "quantity": 1}]}, "total_price": 150.0}
+        mock_get_cart.return_value = {
+            "carts": {1: [{"model_num": 1, "quantity": 2, "stock_quantity": 10}, {"model_num": 2, "quantity": 1, "stock_quantity": 10}]},
+            "total_price": 150.0,
+        }
 
         # Mock user details
         mock_get_user.return_value = {"user_name": "John Doe", "email": "johndoe@example.com"}
@@ -339,9 +337,6 @@ class TestCheckoutService(unittest.TestCase):
         # Mock successful payment processing
         self.mock_payment_strategy.process_payment.return_value = True
 
-        # FIX: Properly mock get_cart_item_full_details to return expected structure
-        mock_get_cart_item_details.side_effect = lambda model_num: {model_num: {"stock_quantity": 10, "discount": 0.1}}
-
         # Perform checkout
         result = self.checkout_service.checkout(user_id=1, address="123 Main St")
 
@@ -350,12 +345,25 @@ class TestCheckoutService(unittest.TestCase):
         self.assertEqual(result["order_id"], 1001)
         self.assertEqual(result["message"], "Order placed successfully.")
 
-        # Verify that delete_cart_item was called twice (once per item in cart)
-        self.assertEqual(mock_delete_cart_item.call_count, 2)
+        # Verify that the whole cart was removed with one call
+        mock_delete_cart_items.assert_called_once_with(mock_schema_session.return_value, 1, [1, 2])
+
+    @patch("source.controller.cart.system_get_all_user_cart_items")
+    def test_checkout_item_no_longer_sold(self, mock_get_cart) -> None:
+        """
+        Tests that a cart holding an item removed from the catalog is rejected with 409 before payment.
+        """
+        mock_get_cart.return_value = {
+            "carts": {1: [{"user_id": 1, "model_num": "gone-0", "quantity": 1, "stock_quantity": None}]},
+            "total_price": 0,
+        }
+
+        with self.assertRaises(HTTPException) as context:
+            self.checkout_service.checkout(user_id=1, address="123 Main St")
 
-        # Ensure delete_cart_item was called with correct parameters
-        mock_delete_cart_item.assert_any_call(mock_schema_session.return_value, {'user_id': 1, 'model_num': 1})
-        mock_delete_cart_item.assert_any_call(mock_schema_session.return_value, {'user_id': 1, 'model_num': 2})
+        self.assertEqual(context.exception.code, 409)
+        self.assertIn("gone-0 is no longer available", str(context.exception.description))
+        self.mock_payment_strategy.process_payment.assert_not_called()
 
     def tearDown(self) -> None:
         """